@@ -1,43 +1,232 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
+import os
+import json
+import logging
 import base64
-import time
+import hashlib
+import hmac
 import uuid
 from datetime import datetime, timedelta
-import undetected_chromedriver as uc
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import threading
+from log_config import configure_logging
+from browser_pool import (BrowserPool, start_login_browser, reset_browser, reattach_browser, end_browser,
+                          debugger_port, profile_dir, quit_quietly, live_driver_pids, BROWSER_PROFILE)
+from resource_monitor import ResourceMonitor, tag_browsers
+from browser_journal import BrowserJournal, journal_path
+from jobs import JobManager, STAGES
+from result_cache import AttendanceCache, PasswordFailures, WrongPassword, hash_password, roll_key
+from session_store import SessionStore
+from single_flight import SingleFlight
+from shards import SHARD_ID, SHARD_SOCKET, id_prefix
+from scraper.portal import ALL_SEMESTERS, BAD_CAPTCHA, BAD_PASSWORD, ACCOUNT_LOCKED
+from scraper.metrics import registry, span, timed
+
+configure_logging()
+log = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)
 
-active_sessions = {}
-SESSION_TIMEOUT = timedelta(minutes=5)
+PORT = int(os.environ.get("PORT", 5001))
+# FLASK_DEBUG=0 turns off the reloader and debugger (benchmarks, deployments)
+DEBUG = os.environ.get("FLASK_DEBUG", "1") != "0"
 
+# How long a captcha session waits for its submit
+SESSION_TIMEOUT = timedelta(seconds=int(os.environ.get("SESSION_TIMEOUT", 300)))
 
-def cleanup_expired_sessions():
-    while True:
-        try:
-            time.sleep(60)
-            now = datetime.now()
-            expired = [sid for sid, sess in list(active_sessions.items()) 
-                      if now - sess['created_at'] > SESSION_TIMEOUT]
-            
-            for session_id in expired:
-                try:
-                    active_sessions[session_id]['driver'].quit()
-                    del active_sessions[session_id]
-                    print(f"🧹 Expired: {session_id[:8]}...")
-                except:
-                    pass
-        except:
-            pass
+# "Keep me logged in": idle window for a logged-in session, and how many are kept
+LOGGED_IN_IDLE = timedelta(seconds=int(os.environ.get("LOGGED_IN_IDLE", 600)))
+MAX_PARKED_SESSIONS = int(os.environ.get("MAX_PARKED_SESSIONS", 4))
+
+# Hard cap on browsers held by sessions; requests beyond it get 503 + Retry-After
+MAX_LIVE_BROWSERS = int(os.environ.get("MAX_LIVE_BROWSERS", 8))
+
+# "selenium" drives a real Chrome, "http" replays the portal forms with requests.Session,
+# "hybrid" logs in with Chrome and hands the cookies to requests.Session for the rest
+SCRAPER_ENGINE = os.environ.get("SCRAPER_ENGINE", "selenium")
+
+# fast / default / conservative - see scraper/timing.py
+TIMING_PROFILE = os.environ.get("TIMING_PROFILE", "default")
+
+# Pre-warmed browsers parked on the login frame
+BROWSER_POOL_MIN = int(os.environ.get("BROWSER_POOL_MIN", 1))
+BROWSER_POOL_MAX = int(os.environ.get("BROWSER_POOL_MAX", 3))
+BROWSER_MAX_AGE = timedelta(seconds=int(os.environ.get("BROWSER_MAX_AGE", 240)))
+
+# Finished sessions hand their browser back for reuse until one of these is reached
+BROWSER_MAX_USES = int(os.environ.get("BROWSER_MAX_USES", 20))
+BROWSER_MAX_RSS_MB = int(os.environ.get("BROWSER_MAX_RSS_MB", 1024))
+
+# Resource monitor: sampling interval, how old an unowned Chrome tree must be
+# before it is killed, and the per-session memory ceiling (0 = none)
+RESOURCE_MONITOR_INTERVAL = int(os.environ.get("RESOURCE_MONITOR_INTERVAL", 15))
+ORPHAN_GRACE = int(os.environ.get("ORPHAN_GRACE", 120))
+SESSION_MAX_RSS_MB = int(os.environ.get("SESSION_MAX_RSS_MB", 1536))
+
+# Background scrapes - bounded so request threads never wait on Selenium
+MAX_SCRAPE_WORKERS = int(os.environ.get("MAX_SCRAPE_WORKERS", 4))
+SSE_KEEPALIVE = 15
+
+# Status codes for logins the portal refused (result['error_type'])
+LOGIN_ERROR_STATUS = {BAD_CAPTCHA: 401, BAD_PASSWORD: 401, ACCOUNT_LOCKED: 403}
+
+# Upper bound on (year, semester) pairs fetched on one login
+MAX_SEMESTERS_PER_REQUEST = 16
+
+# Job and session ids name their shard so router.py can send follow-ups back here
+scrape_jobs = JobManager(max_workers=MAX_SCRAPE_WORKERS, id_prefix=id_prefix())
+
+# Repeat dashboard views are served from here without a browser launch
+RESULT_CACHE_TTL = timedelta(seconds=int(os.environ.get("RESULT_CACHE_TTL", 900)))
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", 500))
+
+# Wrong passwords against cached results before a roll number is locked out of them
+MAX_PASSWORD_FAILURES = int(os.environ.get("MAX_PASSWORD_FAILURES", 5))
+PASSWORD_FAILURE_WINDOW = timedelta(seconds=int(os.environ.get("PASSWORD_FAILURE_WINDOW", 900)))
+
+attendance_cache = AttendanceCache(max_entries=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
+password_failures = PasswordFailures(max_failures=MAX_PASSWORD_FAILURES, window=PASSWORD_FAILURE_WINDOW)
+captcha_flights = SingleFlight()
+attendance_flights = SingleFlight()
+# Flight keys include the password, so they are keyed with a secret that dies with the process
+FLIGHT_KEY_SECRET = os.urandom(32)
+# A job's id is handed out again for as long as the job is kept
+job_flights = SingleFlight(window=scrape_jobs.retention.total_seconds())
+
+browser_pool = BrowserPool(
+    factory=lambda: start_login_browser(TIMING_PROFILE),
+    min_size=BROWSER_POOL_MIN,
+    max_size=BROWSER_POOL_MAX,
+    max_age=BROWSER_MAX_AGE,
+    reset=lambda driver, log_out: reset_browser(driver, TIMING_PROFILE, log_out),
+    max_uses=BROWSER_MAX_USES,
+    max_rss_mb=BROWSER_MAX_RSS_MB
+)
+
+
+# Session browsers survive a restart of this process - see restore_sessions()
+browser_journal = BrowserJournal(journal_path())
+
+
+def journal_browser(session_id, session):
+    """Write the session's browser to the journal so a restarted process can reattach to it"""
+    driver = session['driver']
+    browser_journal.record(
+        debugger_port(driver),
+        session_id=session_id,
+        roll_no=session['roll_no'],
+        created_at=session['created_at'].isoformat(),
+        pid=getattr(driver, 'browser_pid', None),
+        profile_dir=profile_dir(driver),
+        parked=bool(session.get('parked'))
+    )
 
 
-cleanup_thread = threading.Thread(target=cleanup_expired_sessions, daemon=True)
-cleanup_thread.start()
+def close_session(session):
+    """Release whatever the session holds - a browser goes back to the pool for reuse"""
+    if session.get('driver'):
+        browser_journal.forget(debugger_port(session['driver']))
+        browser_pool.recycle(session['driver'])
+    if session.get('login_state'):
+        session['login_state']['http'].close()
+
+
+session_store = SessionStore(
+    ttl=SESSION_TIMEOUT,
+    max_browsers=MAX_LIVE_BROWSERS,
+    max_parked=MAX_PARKED_SESSIONS,
+    on_expire=close_session
+)
+session_store.start()
+
+
+def end_oversized_session(session_id, rss_mb):
+    """Memory ceiling hit - end the session unless a scrape is using it right now"""
+    session = session_store.get(session_id)
+    if not session or not session['lock'].acquire(blocking=False):
+        return False
+    try:
+        release_session(session_id, session)
+    finally:
+        session['lock'].release()
+    return True
+
+
+# Browsers launched from here on carry this process's owner tag
+tag_browsers()
+resource_monitor = ResourceMonitor(
+    sessions=session_store.browsers,
+    owned_pids=live_driver_pids,
+    interval=RESOURCE_MONITOR_INTERVAL,
+    grace=ORPHAN_GRACE,
+    max_session_mb=SESSION_MAX_RSS_MB,
+    on_over_limit=end_oversized_session
+)
+
+
+# Live numbers for /api/metrics - read on every scrape
+registry.gauge('attendx_sessions', 'Sessions in the store, by kind',
+               lambda: [({'kind': 'live'}, session_store.stats()['live']),
+                        ({'kind': 'parked'}, session_store.stats()['parked'])])
+registry.gauge('attendx_session_browsers', 'Browsers held by sessions',
+               lambda: session_store.stats()['browsers'])
+registry.gauge('attendx_session_browsers_max', 'MAX_LIVE_BROWSERS', lambda: MAX_LIVE_BROWSERS)
+registry.gauge('attendx_pool_browsers', 'Browsers in the warm pool, by state',
+               lambda: [({'state': 'idle'}, browser_pool.stats()['idle']),
+                        ({'state': 'launching'}, browser_pool.stats()['launching']),
+                        ({'state': 'recycling'}, browser_pool.stats()['recycling'])])
+registry.gauge('attendx_chrome_processes', 'Chrome and chromedriver processes started by this server',
+               lambda: resource_monitor.stats().get('chrome_processes', 0))
+registry.gauge('attendx_chrome_rss_mb', 'RSS of all Chrome and chromedriver processes',
+               lambda: resource_monitor.stats().get('rss_mb', 0))
+registry.gauge('attendx_jobs', 'Scrape jobs kept in memory, by status',
+               lambda: [({'status': status}, count) for status, count in scrape_jobs.counts().items()])
+registry.gauge('attendx_cache_entries', 'Cached attendance results', lambda: attendance_cache.stats()['entries'])
+registry.gauge('attendx_cache_hits_total', 'Result cache hits', lambda: attendance_cache.stats()['hits'],
+               kind='counter')
+registry.gauge('attendx_cache_misses_total', 'Result cache misses', lambda: attendance_cache.stats()['misses'],
+               kind='counter')
+registry.gauge('attendx_coalesced_requests_total', 'Duplicate requests answered from another request, by endpoint',
+               lambda: [({'endpoint': 'captcha'}, captcha_flights.stats()['shared']),
+                        ({'endpoint': 'attendance'}, attendance_flights.stats()['shared']),
+                        ({'endpoint': 'jobs'}, job_flights.stats()['shared'])],
+               kind='counter')
+
+
+def new_session_id():
+    return id_prefix() + str(uuid.uuid4())
+
+
+def capacity():
+    """Free browser slots of this process - router.py places new logins by it"""
+    sessions = session_store.stats()
+    return {
+        "engine": SCRAPER_ENGINE,
+        "max_browsers": sessions['max_browsers'],
+        "browsers": sessions['browsers'],
+        "reserved": sessions['reserved'],
+        "free": max(0, sessions['max_browsers'] - sessions['browsers'] - sessions['reserved']),
+        "pool_idle": browser_pool.stats()['idle']
+    }
+
+
+def http_outcome(rv):
+    """Span outcome for a view's return value - 'ok' below 400, else http_<status>"""
+    status = rv[1] if isinstance(rv, tuple) else getattr(rv, 'status_code', 200)
+    return f'http_{status}' if status >= 400 else None
+
+
+def busy_response():
+    """503 with a Retry-After hint when every browser slot is taken"""
+    retry_after = session_store.retry_after()
+    log.info(f"🚦 At capacity ({MAX_LIVE_BROWSERS} browsers) - retry in {retry_after}s")
+    response = jsonify({
+        "success": False,
+        "error": "Server busy, please retry shortly",
+        "retry_after": retry_after
+    })
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 503
 
 
 @app.route('/', methods=['GET'])
@@ -45,14 +234,31 @@ def home():
     return jsonify({"name": "Attendance API", "version": "3.1 - Visible Browser"})
 
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text format: stage latency histograms, launches, sessions, pool"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/api/health', methods=['GET'])
 def health():
-    return jsonify({"status": "ok", "sessions": len(active_sessions)}), 200
+    return jsonify({
+        "status": "ok",
+        "shard": int(SHARD_ID) if SHARD_ID is not None else None,
+        "capacity": capacity(),
+        "sessions": session_store.stats(),
+        "pool": browser_pool.stats(),
+        "jobs": scrape_jobs.counts(),
+        "cache": attendance_cache.stats(),
+        "processes": resource_monitor.stats(),
+        "coalescing": {"captcha": captcha_flights.stats(), "attendance": attendance_flights.stats(),
+                       "jobs": job_flights.stats()}
+    }), 200
 
 
 @app.route('/api/captcha', methods=['POST'])
+@timed('api_captcha', outcome=http_outcome)
 def get_captcha():
-    driver = None
     try:
         data = request.get_json()
         roll_no = data.get('roll_no')
@@ -60,137 +266,818 @@ def get_captcha():
         if not roll_no:
             return jsonify({"success": False, "error": "roll_no required"}), 400
         
-        print(f"\n{'='*60}")
-        print(f"📸 CAPTCHA: {roll_no[:3]}***")
+        log.info(f"📸 CAPTCHA: {roll_no[:3]}***")
         
-        # Non-headless mode - browser will be visible
-        options = uc.ChromeOptions()
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        # REMOVED: --headless flag for maximum compatibility
-        options.add_argument("--window-size=1920,1080")
-        options.add_argument("--start-maximized")
-        
-        driver = uc.Chrome(options=options, version_main=144)
-        
-        wait = WebDriverWait(driver, 15)
-        
-        print("🌐 Loading...")
-        driver.get("https://www.imsnsit.org/imsnsit/")
-        time.sleep(2)
+        # A double-click from the same client shares the session still being opened
+        session_id, shared = captcha_flights.do(
+            (roll_key(roll_no), client_address()), lambda: open_captcha_session(roll_no))
+        if session_id is None:
+            return busy_response()
+        session = session_store.get(session_id)
+        if not session:
+            return jsonify({"success": False, "error": "Session expired"}), 400
+        if shared:
+            log.info(f"🔗 Duplicate CAPTCHA request - same session {session_id[:8]}...")
         
-        print("🔗 Login...")
-        login_link = wait.until(EC.element_to_be_clickable((By.PARTIAL_LINK_TEXT, "Student Login")))
-        login_link.click()
-        time.sleep(3)
+        return captcha_json(session_id, session, inline=data.get('inline'))
+            
+    except Exception as e:
+        log.error(f"❌ Error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+def client_address():
+    """The caller's address - behind router.py, the one it forwarded for"""
+    if SHARD_SOCKET:
+        return request.headers.get('X-Forwarded-For', '')
+    return request.remote_addr or ''
+
+
+def open_captcha_session(roll_no):
+    """New session showing a captcha; its id, or None when every browser slot is taken"""
+    if SCRAPER_ENGINE == 'http':
+        return open_captcha_session_http(roll_no)
+    
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from scraper.timing import wait_for
+    from scraper.captcha import read_captcha
+    
+    # A fresh login outranks a parked one - free the least recently used if needed
+    if not session_store.try_reserve_browser() and not (
+            session_store.evict_parked(browser=True) and session_store.try_reserve_browser()):
+        return None
+    reserved = True
+    driver = None
+    
+    try:
+        # Browser comes from the pool already parked on the login frame
+        log.info("🌐 Browser...")
+        with span('pool_acquire'):
+            driver = browser_pool.acquire()
         
-        print("🔄 Frame...")
-        wait.until(EC.frame_to_be_available_and_switch_to_it(0))
+        wait = wait_for(driver, TIMING_PROFILE, 'page_load')
         
-        print("📝 Roll...")
+        log.info("📝 Roll...")
         uid_input = wait.until(EC.presence_of_element_located((By.ID, "uid")))
         uid_input.clear()
         uid_input.send_keys(roll_no)
         
-        print("📸 CAPTCHA...")
-        captcha_img = wait.until(EC.presence_of_element_located((By.ID, "captchaimg")))
-        time.sleep(2)
-        
-        captcha_screenshot = captcha_img.screenshot_as_base64
-        print(f"✅ Done")
+        log.info("📸 CAPTCHA...")
+        captcha_bytes, content_type = read_captcha(driver, TIMING_PROFILE)
+        log.info(f"✅ Done ({len(captcha_bytes)} bytes, {content_type})")
         
-        session_id = str(uuid.uuid4())
+        session_id = new_session_id()
         
-        active_sessions[session_id] = {
+        session = session_store.add(session_id, {
+            'engine': SCRAPER_ENGINE,
             'driver': driver,
             'roll_no': roll_no,
             'created_at': datetime.now()
-        }
-        
-        print(f"✅ Session: {session_id[:8]}...")
-        print(f"👁️  Browser visible - keep window open!")
-        print(f"{'='*60}\n")
-        
-        return jsonify({
-            "success": True,
-            "captcha_base64": f"data:image/png;base64,{captcha_screenshot}",
-            "session_id": session_id,
-            "roll_no": roll_no
-        }), 200
+        }, browser=True)
+        reserved = False
+        set_captcha(session, captcha_bytes, content_type)
+        journal_browser(session_id, session)
+        
+        log.info(f"✅ Session: {session_id[:8]}...")
+        log.info("👁️  Browser visible - keep window open!")
+        return session_id
+    
+    except Exception:
+        if reserved:
+            session_store.cancel_reservation()
+        if driver:
+            # Kills the process tree itself if quit() fails; the monitor catches anything left
+            quit_quietly(driver)
+        raise
+
+
+def open_captcha_session_http(roll_no):
+    """Captcha step for the browser-free engine"""
+    from scraper.http_engine import start_http_login
+    
+    login_state, captcha_bytes, content_type = start_http_login(roll_no)
+    
+    session_id = new_session_id()
+    session = session_store.add(session_id, {
+        'engine': 'http',
+        'login_state': login_state,
+        'roll_no': roll_no,
+        'created_at': datetime.now()
+    })
+    set_captcha(session, captcha_bytes, content_type)
+    
+    log.info(f"✅ Session: {session_id[:8]}... (http)")
+    return session_id
+
+
+def set_captcha(session, captcha_bytes, content_type):
+    """Keep the latest captcha image on the session for GET /api/captcha/<id>.png"""
+    session['captcha'] = captcha_bytes
+    session['captcha_type'] = content_type
+    session['captcha_version'] = session.get('captcha_version', 0) + 1
+
+
+def captcha_fields(session_id, session, inline=False):
+    """
+    Session id plus the URL of the captcha image. The image itself is only
+    embedded (as a base64 data URI) when the client asks for inline.
+    """
+    body = {
+        "session_id": session_id,
+        "roll_no": session['roll_no'],
+        "captcha_url": f"/api/captcha/{session_id}.png?v={session['captcha_version']}"
+    }
+    if inline:
+        captcha_b64 = base64.b64encode(session['captcha']).decode('ascii')
+        body["captcha_base64"] = f"data:{session['captcha_type']};base64,{captcha_b64}"
+    return body
+
+
+def captcha_json(session_id, session, inline=False):
+    return jsonify({"success": True, **captcha_fields(session_id, session, inline)}), 200
+
+
+@app.route('/api/captcha/<session_id>.png', methods=['GET'])
+def get_captcha_image(session_id):
+    """Raw captcha bytes in the portal's own content type - never cached"""
+    session = session_store.get(session_id)
+    if not session or not session.get('captcha'):
+        return jsonify({"success": False, "error": "Session expired"}), 404
+    
+    return Response(
+        session['captcha'],
+        mimetype=session['captcha_type'],
+        headers={'Cache-Control': 'no-store, max-age=0', 'Pragma': 'no-cache'}
+    )
+
+
+@app.route('/api/captcha/<session_id>/refresh', methods=['POST'])
+@timed('api_captcha_refresh', outcome=http_outcome)
+def refresh_captcha(session_id):
+    """New captcha on the same session (after a typo) - no new browser or login page"""
+    session = session_store.get(session_id)
+    if not session or session.get('parked') or not session.get('captcha'):
+        return jsonify({"success": False, "error": "Session expired"}), 404
+    
+    if not session['lock'].acquire(blocking=False):
+        return jsonify({"success": False, "error": "Session is busy"}), 409
+    try:
+        if session.get('driver'):
+            from scraper.captcha import reload_captcha
             
+            captcha_bytes, content_type = reload_captcha(session['driver'], TIMING_PROFILE)
+        else:
+            from scraper.http_engine import reload_http_captcha
+            
+            captcha_bytes, content_type = reload_http_captcha(session['login_state'])
+        set_captcha(session, captcha_bytes, content_type)
+        # The user needs time to read the new one
+        session_store.touch(session_id)
+        log.info(f"🔄 CAPTCHA refreshed: {session_id[:8]}...")
+        return captcha_json(session_id, session, inline=(request.get_json(silent=True) or {}).get('inline'))
     except Exception as e:
-        print(f"❌ Error: {e}")
-        if driver:
-            try:
-                driver.quit()
-            except:
-                pass
+        log.error(f"❌ Error: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
+    finally:
+        session['lock'].release()
 
 
-@app.route('/api/attendance', methods=['POST'])
-def get_attendance():
-    session_id = None
+def parse_semesters(value):
+    """
+    The optional 'semesters' field: "all", or a list of {"year", "semester"}
+    objects / [year, semester] pairs. Returns None when absent.
+    """
+    if value is None:
+        return None
+    if value == ALL_SEMESTERS:
+        return ALL_SEMESTERS
+    if not isinstance(value, list) or not value:
+        raise ValueError('semesters must be "all" or a list of year/semester pairs')
+    if len(value) > MAX_SEMESTERS_PER_REQUEST:
+        raise ValueError(f'At most {MAX_SEMESTERS_PER_REQUEST} semesters per request')
+    
+    pairs = []
+    for item in value:
+        if isinstance(item, dict):
+            pair = (int(item.get('year', 0)), int(item.get('semester', 0)))
+        else:
+            year, semester = item
+            pair = (int(year), int(semester))
+        if min(pair) < 0:
+            raise ValueError('year/semester must not be negative')
+        if pair not in pairs:
+            pairs.append(pair)
+    return pairs
+
+
+def parse_attendance_request(data):
+    """Validate an attendance payload and claim its session; returns (args, error)"""
+    session_id = data.get('session_id')
+    password = data.get('password')
+    captcha = data.get('captcha')
+    
+    if not all([session_id, password, captcha]):
+        return None, (jsonify({"success": False, "error": "Missing fields"}), 400)
+    
     try:
-        data = request.get_json()
-        session_id = data.get('session_id')
-        password = data.get('password')
-        captcha = data.get('captcha')
-        year_idx = data.get('year', 0)
-        sem_idx = data.get('semester', 0)
+        semesters = parse_semesters(data.get('semesters'))
+    except (TypeError, ValueError) as e:
+        return None, (jsonify({"success": False, "error": f"Invalid semesters: {e}"}), 400)
+    
+    session = session_store.get(session_id)
+    if not session:
+        return None, (jsonify({"success": False, "error": "Session expired"}), 400)
+    
+    # Claim the session so the reaper and duplicate submits can't touch its browser
+    if not session['lock'].acquire(blocking=False):
+        return None, (jsonify({"success": False, "error": "Session is busy"}), 409)
+    
+    return {
+        'session_id': session_id,
+        'session': session,
+        'password': password,
+        'captcha': captcha,
+        'year_idx': data.get('year', 0),
+        'sem_idx': data.get('semester', 0),
+        'semesters': semesters,
+        'keep_logged_in': bool(data.get('keep_logged_in'))
+    }, None
+
+
+def cache_result(roll_no, password, year_idx, sem_idx, result):
+    """Cache a single-semester result, or each semester of a multi-semester one"""
+    if 'semesters' in result:
+        for entry in result['semesters']:
+            attendance_cache.put(roll_no, entry['year'], entry['semester'], password, entry)
+    else:
+        attendance_cache.put(roll_no, year_idx, sem_idx, password, result)
+
+
+def park_session(session_id, session, password):
+    """Keep a logged-in session for refreshes; only the same password may reuse it"""
+    session['salt'] = os.urandom(16)
+    session['password_hash'] = hash_password(password, session['salt'])
+    if not session_store.park(session_id, LOGGED_IN_IDLE):
+        return False
+    if session.get('driver'):
+        journal_browser(session_id, session)
+    log.info(f"🅿️  Kept logged in: {session_id[:8]}... ({int(LOGGED_IN_IDLE.total_seconds())}s idle)")
+    return True
+
+
+def offer_captcha_retry(session_id, session, result):
+    """
+    The portal refused the captcha: load a new one on the same session so
+    the user can try again without a new browser. Adds the captcha fields to
+    result; returns True if the session was kept.
+    """
+    try:
+        if session.get('driver'):
+            from scraper.captcha import retry_captcha
+            
+            captcha_bytes, content_type = retry_captcha(session['driver'], session['roll_no'], TIMING_PROFILE)
+        else:
+            from scraper.http_engine import reload_http_captcha
+            
+            captcha_bytes, content_type = reload_http_captcha(session['login_state'])
+    except Exception as e:
+        log.warning(f"⚠️  Could not load a new CAPTCHA: {e}")
+        return False
+    
+    set_captcha(session, captcha_bytes, content_type)
+    session_store.touch(session_id)
+    result.update(captcha_fields(session_id, session))
+    result['retry'] = True
+    log.info(f"🔁 Wrong CAPTCHA - new one on session {session_id[:8]}...")
+    return True
+
+
+def attendance_status(result):
+    """HTTP status for a scrape result - login refusals are the client's, not ours"""
+    if result.get('success'):
+        return 200
+    return LOGIN_ERROR_STATUS.get(result.get('error_type'), 500)
+
+
+def release_session(session_id, session):
+    """Drop a session from the store and close its browser / HTTP session"""
+    session_store.pop(session_id)
+    try:
+        close_session(session)
+        log.info(f"✅ Cleaned: {session_id[:8]}...")
+    except:
+        pass
+
+
+def run_attendance(session_id, session, password, captcha, year_idx, sem_idx, semesters=None,
+                   keep_logged_in=False, on_progress=None):
+    """
+    Scrape with the session's engine, then release the session.
+    With semesters every listed semester is read on the same login.
+    keep_logged_in parks the session after a successful login instead.
+    A wrong captcha keeps the session too, with a new captcha to retry.
+    """
+    roll_no = session['roll_no']
+    
+    log.info(f"📊 ATTENDANCE: {roll_no[:3]}*** | {captcha} | {session['engine']}")
+    
+    kept = False
+    try:
+        with span(f"scrape_{session['engine']}") as scrape_span:
+            if session['engine'] == 'hybrid':
+                result = run_hybrid(session_id, session, password, captcha, year_idx, sem_idx, semesters,
+                                    on_progress)
+            elif semesters is not None:
+                result = run_semesters(session, password, captcha, year_idx, semesters, on_progress)
+            elif session['engine'] == 'http':
+                from scraper.http_engine import scrape_attendance_with_session
+                
+                result = scrape_attendance_with_session(
+                    login_state=session['login_state'],
+                    password=password,
+                    captcha=captcha,
+                    year_idx=year_idx,
+                    semester_idx=sem_idx,
+                    on_progress=on_progress
+                )
+            else:
+                from scraper.scraper_with_driver import scrape_attendance_with_driver
+                
+                log.info("👁️  Watch browser window!")
+                result = scrape_attendance_with_driver(
+                    driver=session['driver'],
+                    password=password,
+                    captcha=captcha,
+                    year_idx=year_idx,
+                    semester_idx=sem_idx,
+                    timing=TIMING_PROFILE,
+                    on_progress=on_progress,
+                    roll_no=roll_no
+                )
+            if not result.get('success'):
+                scrape_span.outcome = 'failed'
         
-        if not all([session_id, password, captcha]):
-            return jsonify({"success": False, "error": "Missing fields"}), 400
+        cache_result(roll_no, password, year_idx, sem_idx, result)
+        if result.get('success'):
+            # The portal took this password behind its captcha - earlier misses no longer count
+            password_failures.clear(roll_no)
         
-        session = active_sessions.get(session_id)
-        if not session:
-            return jsonify({"success": False, "error": "Session expired"}), 400
+        if result.get('error_type') == BAD_CAPTCHA:
+            kept = offer_captcha_retry(session_id, session, result)
         
-        driver = session['driver']
-        roll_no = session['roll_no']
+        if keep_logged_in and result.get('success'):
+            kept = park_session(session_id, session, password)
+            if kept:
+                result['logged_in_for'] = int(LOGGED_IN_IDLE.total_seconds())
+        return result
+    finally:
+        if not kept:
+            release_session(session_id, session)
+        session['lock'].release()
+
+
+def run_hybrid(session_id, session, password, captcha, year_idx, sem_idx, semesters=None,
+               on_progress=None):
+    """
+    Log in with the session's browser, copy its cookies into a
+    requests.Session and quit Chrome straight away; the attendance pages are
+    then fetched over HTTP. Afterwards the session is an 'http' session.
+    """
+    from scraper.scraper_with_driver import login_with_driver
+    from scraper.http_engine import session_from_cookies, continue_attendance_with_session
+    
+    report = on_progress or (lambda stage: None)
+    driver = session['driver']
+    
+    failure = login_with_driver(driver, password, captcha, timing=TIMING_PROFILE)
+    if failure:
+        return failure
+    report('logged_in')
+    
+    login_state = {
+        'http': session_from_cookies(driver.get_cookies(), driver.execute_script("return navigator.userAgent")),
+        'roll_no': session['roll_no'],
+    }
+    student_url = driver.current_url
+    
+    # The browser's job is done - give it back before the slower page walk
+    session['driver'] = None
+    session['login_state'] = login_state
+    session['engine'] = 'http'
+    session_store.release_browser(session_id)
+    browser_journal.forget(debugger_port(driver))
+    # Cookies are wiped but the portal session stays - the HTTP half still needs it
+    browser_pool.recycle(driver, log_out=False)
+    log.info("🔌 Browser released after login - continuing over HTTP")
+    
+    return continue_attendance_with_session(
+        login_state=login_state,
+        student_url=student_url,
+        year_idx=year_idx,
+        semester_idx=sem_idx,
+        semesters=semesters,
+        on_progress=on_progress
+    )
+
+
+def run_refresh(session_id, session, password, year_idx, sem_idx, semesters=None):
+    """Scrape again on a parked, still logged-in session; it stays parked unless the login is gone"""
+    roll_no = session['roll_no']
+    log.info(f"♻️  REFRESH: {roll_no[:3]}*** | {session['engine']}")
+    
+    kept = False
+    try:
+        if session['engine'] == 'http':
+            from scraper.http_engine import refresh_attendance_with_session
+            
+            result = refresh_attendance_with_session(
+                login_state=session['login_state'],
+                year_idx=year_idx,
+                semester_idx=sem_idx,
+                semesters=semesters
+            )
+        else:
+            from scraper.scraper_with_driver import refresh_attendance_with_driver
+            
+            result = refresh_attendance_with_driver(
+                driver=session['driver'],
+                year_idx=year_idx,
+                semester_idx=sem_idx,
+                semesters=semesters,
+                timing=TIMING_PROFILE,
+                roll_no=roll_no
+            )
         
-        print(f"\n{'='*60}")
-        print(f"📊 ATTENDANCE: {roll_no[:3]}*** | {captcha}")
-        print(f"👁️  Watch browser window!")
-        print(f"{'='*60}")
+        cache_result(roll_no, password, year_idx, sem_idx, result)
         
-        from scraper.scraper_with_driver import scrape_attendance_with_driver
+        if not result.get('login_required'):
+            kept = session_store.park(session_id, LOGGED_IN_IDLE)
+            if kept:
+                result['logged_in_for'] = int(LOGGED_IN_IDLE.total_seconds())
+        return result
+    finally:
+        if not kept:
+            release_session(session_id, session)
+        session['lock'].release()
+
+
+def run_semesters(session, password, captcha, year_idx, semesters, on_progress=None):
+    """Multi-semester variant of the scrape in run_attendance - one login for all of them"""
+    if session['engine'] == 'http':
+        from scraper.http_engine import scrape_semesters_with_session
         
-        result = scrape_attendance_with_driver(
-            driver=driver,
+        return scrape_semesters_with_session(
+            login_state=session['login_state'],
             password=password,
             captcha=captcha,
+            semesters=semesters,
             year_idx=year_idx,
-            semester_idx=sem_idx
+            on_progress=on_progress
         )
+    
+    from scraper.scraper_with_driver import scrape_semesters_with_driver
+    
+    log.info("👁️  Watch browser window!")
+    return scrape_semesters_with_driver(
+        driver=session['driver'],
+        password=password,
+        captcha=captcha,
+        semesters=semesters,
+        year_idx=year_idx,
+        timing=TIMING_PROFILE,
+        on_progress=on_progress,
+        roll_no=session['roll_no']
+    )
+
+
+def job_stage_count(semesters):
+    """Stages a job will report: login + navigation once, select + parse per semester"""
+    if semesters is None or semesters == ALL_SEMESTERS:
+        return len(STAGES)
+    return 3 + 2 * len(semesters)
+
+
+def attendance_flight_key(data):
+    """Same session and the same submitted fields - the password only inside an HMAC"""
+    fields = [data.get(name) for name in ('session_id', 'password', 'captcha', 'year', 'semester',
+                                          'semesters', 'keep_logged_in')]
+    message = json.dumps(fields, sort_keys=True, default=str).encode('utf-8')
+    return hmac.new(FLIGHT_KEY_SECRET, message, hashlib.sha256).hexdigest()
+
+
+def submit_attendance(data):
+    """Claim the session and scrape; (result, status) as plain data so duplicates can share it"""
+    args, error = parse_attendance_request(data)
+    if error:
+        response, status = error
+        return response.get_json(), status
+    
+    result = run_attendance(**args)
+    return result, attendance_status(result)
+
+
+@app.route('/api/attendance', methods=['POST'])
+@timed('api_attendance', outcome=http_outcome)
+def get_attendance():
+    try:
+        data = request.get_json() or {}
+        # A duplicate submit waits for the scrape already running instead of getting 409
+        (result, status), shared = attendance_flights.do(attendance_flight_key(data),
+                                                         lambda: submit_attendance(data))
+        if shared:
+            log.info("🔗 Duplicate attendance submit - sharing the running scrape")
+        return jsonify(result), status
         
-        try:
-            print(f"⏸️  Browser closes in 3s...")
-            time.sleep(3)
-            del active_sessions[session_id]
-            driver.quit()
-            print(f"✅ Cleaned: {session_id[:8]}...")
-        except:
-            pass
+    except Exception as e:
+        log.error(f"❌ Error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+def wrong_password(roll_no):
+    """
+    Count a wrong password; True once the roll is locked out. Its cached
+    results and kept sessions stay - a stranger guessing can only get 429s
+    """
+    if not password_failures.fail(roll_no):
+        return False
+    log.warning(f"🔒 Too many wrong passwords for {roll_no[:3]}*** - answering 429 until the window ends")
+    return True
+
+
+def too_many_failures(roll_no):
+    retry_after = password_failures.retry_after(roll_no)
+    response = jsonify({
+        "success": False,
+        "error": "Too many wrong passwords - log in with the captcha",
+        "retry_after": retry_after
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+@app.route('/api/attendance/refresh', methods=['POST'])
+@timed('api_attendance_refresh', outcome=http_outcome)
+def refresh_attendance():
+    """
+    Re-read attendance on a session kept with keep_logged_in - no captcha.
+    401 with login_required when the session (or the portal login) is gone.
+    """
+    data = request.get_json() or {}
+    session_id = data.get('session_id')
+    password = data.get('password')
+    
+    if not session_id or not password:
+        return jsonify({"success": False, "error": "Missing fields"}), 400
+    
+    try:
+        semesters = parse_semesters(data.get('semesters'))
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": f"Invalid semesters: {e}"}), 400
+    
+    session = session_store.get(session_id)
+    if not session or not session.get('parked'):
+        return jsonify({"success": False, "error": "Not logged in", "login_required": True}), 401
+    
+    roll_no = session['roll_no']
+    if password_failures.retry_after(roll_no):
+        return too_many_failures(roll_no)
+    
+    if not hmac.compare_digest(session['password_hash'], hash_password(password, session['salt'])):
+        if wrong_password(roll_no):
+            return too_many_failures(roll_no)
+        return jsonify({"success": False, "error": "Not logged in", "login_required": True}), 401
+    
+    if not session['lock'].acquire(blocking=False):
+        return jsonify({"success": False, "error": "Session is busy"}), 409
+    
+    try:
+        result = run_refresh(session_id, session, password, data.get('year', 0), data.get('semester', 0),
+                             semesters)
+    except Exception as e:
+        log.error(f"❌ Error: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+    
+    if result.get('login_required'):
+        return jsonify(result), 401
+    return jsonify(result), 200 if result.get('success') else 500
+
+
+@app.route('/api/logout', methods=['POST'])
+def logout():
+    """Close a kept-logged-in session before its idle window runs out"""
+    data = request.get_json() or {}
+    session_id = data.get('session_id')
+    session = session_store.get(session_id) if session_id else None
+    if not session:
+        return jsonify({"success": True}), 200
+    
+    if not session['lock'].acquire(blocking=False):
+        return jsonify({"success": False, "error": "Session is busy"}), 409
+    try:
+        release_session(session_id, session)
+    finally:
+        session['lock'].release()
+    return jsonify({"success": True}), 200
+
+
+@app.route('/api/attendance/cached', methods=['POST'])
+@timed('api_attendance_cached', outcome=http_outcome)
+def get_cached_attendance():
+    """
+    Last successful result for (roll_no, year, semester) if it is still fresh
+    and the password matches the one used to fetch it. force_refresh skips the
+    cache so the client goes through captcha + login again.
+    """
+    data = request.get_json() or {}
+    roll_no = data.get('roll_no')
+    password = data.get('password')
+    
+    if not roll_no or not password:
+        return jsonify({"success": False, "error": "Missing fields"}), 400
+    
+    if data.get('force_refresh'):
+        return jsonify({"success": False, "cached": False, "error": "Refresh requested"}), 404
+    
+    if password_failures.retry_after(roll_no):
+        return too_many_failures(roll_no)
+    
+    try:
+        entry = attendance_cache.get(roll_no, data.get('year', 0), data.get('semester', 0), password)
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "Invalid year/semester"}), 400
+    except WrongPassword:
+        if wrong_password(roll_no):
+            return too_many_failures(roll_no)
+        entry = None
+    
+    if not entry:
+        return jsonify({"success": False, "cached": False, "error": "No cached result"}), 404
+    
+    log.info(f"⚡ Cache hit: {roll_no[:3]}*** ({entry['age_seconds']}s old)")
+    return jsonify({"success": True, "cached": True, **entry}), 200
+
+
+def queue_attendance_job(data):
+    """Claim the session and queue its scrape; (job id, error payload, status) as plain data"""
+    args, error = parse_attendance_request(data)
+    if error:
+        response, status = error
+        return None, response.get_json(), status
+    
+    try:
+        job = scrape_jobs.submit(run_attendance, total_stages=job_stage_count(args['semesters']), **args)
+    except Exception:
+        # The job never ran, so nothing else will release the session
+        args['session']['lock'].release()
+        raise
+    log.info(f"🧾 Job {job.id[:8]}... queued")
+    return job.id, None, 202
+
+
+def job_still_kept(queued):
+    return queued[0] is not None and scrape_jobs.get(queued[0]) is not None
+
+
+@app.route('/api/attendance/jobs', methods=['POST'])
+@timed('api_job_submit', outcome=http_outcome)
+def submit_attendance_job():
+    """Start a scrape in the background and return its job id immediately"""
+    try:
+        data = request.get_json() or {}
+        # LoginForm double-clicks and retries get the job the first submit started
+        (job_id, error, status), shared = job_flights.do(attendance_flight_key(data),
+                                                         lambda: queue_attendance_job(data),
+                                                         still_valid=job_still_kept)
+        if job_id is None:
+            return jsonify(error), status
+        job = scrape_jobs.get(job_id)
+        if job is None:
+            return jsonify({"success": False, "error": "Unknown job"}), 404
+        if shared:
+            log.info(f"🔗 Duplicate job submit - same job {job_id[:8]}...")
         
-        return jsonify(result), 200 if result.get('success') else 500
+        return jsonify({"success": True, "job_id": job.id, "status": job.status}), 202
         
     except Exception as e:
-        print(f"❌ Error: {e}")
-        if session_id and session_id in active_sessions:
-            try:
-                active_sessions[session_id]['driver'].quit()
-                del active_sessions[session_id]
-            except:
-                pass
+        log.error(f"❌ Error: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@app.route('/api/attendance/jobs/<job_id>', methods=['GET'])
+def get_attendance_job(job_id):
+    """Polling endpoint - current stage, and the result once finished"""
+    job = scrape_jobs.get(job_id)
+    if not job:
+        return jsonify({"success": False, "error": "Unknown job"}), 404
+    return jsonify({"success": True, **job.snapshot()}), 200
+
+
+@app.route('/api/attendance/jobs/<job_id>/events', methods=['GET'])
+def stream_attendance_job(job_id):
+    """Server-Sent Events: a 'progress' event per stage, then a final 'done' event"""
+    job = scrape_jobs.get(job_id)
+    if not job:
+        return jsonify({"success": False, "error": "Unknown job"}), 404
+    
+    def events():
+        version = -1
+        while True:
+            new_version = job.wait_for_change(version, timeout=SSE_KEEPALIVE)
+            if new_version == version:
+                yield ": keepalive\n\n"
+                continue
+            version = new_version
+            
+            snapshot = job.snapshot()
+            event = 'done' if job.finished else 'progress'
+            yield f"event: {event}\ndata: {json.dumps(snapshot)}\n\n"
+            if job.finished:
+                return
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def restore_sessions():
+    """
+    Take back the browsers a previous run of this process left in the
+    journal. A browser still showing the captcha of its session becomes that
+    session again (same session_id), so the student can carry on. Logged-in
+    ones go back to the pool, since the password check that guarded them is
+    gone. Browsers that cannot be reattached are killed.
+    """
+    entries = browser_journal.entries()
+    if not entries:
+        return
+    log.info(f"♻️  Reattaching to {len(entries)} browser(s) from {browser_journal.path}...")
+    from scraper.captcha import resume_captcha
+
+    restored = 0
+    for entry in entries:
+        port, pid, session_id = entry.get('port'), entry.get('pid'), entry.get('session_id')
+        browser_journal.forget(port)
+        try:
+            driver = reattach_browser(port, pid, entry.get('profile_dir'))
+        except Exception as e:
+            log.warning(f"⚠️  Browser on port {port} could not be reattached ({e}) - killing it")
+            end_browser(pid, port, entry.get('profile_dir'))
+            continue
+
+        created_at = datetime.fromisoformat(entry['created_at'])
+        captcha = None
+        if not entry.get('parked') and datetime.now() - created_at < SESSION_TIMEOUT:
+            try:
+                captcha = resume_captcha(driver, entry['roll_no'], TIMING_PROFILE)
+            except Exception as e:
+                log.warning(f"⚠️  Session {session_id[:8]}... lost its captcha page: {e}")
+
+        if captcha is None or not session_store.try_reserve_browser():
+            # No session to go back to - the pool logs it out and reuses it
+            if browser_pool.running:
+                browser_pool.recycle(driver)
+            else:
+                quit_quietly(driver)
+            continue
+
+        session = session_store.add(session_id, {
+            'engine': SCRAPER_ENGINE,
+            'driver': driver,
+            'roll_no': entry['roll_no'],
+            'created_at': created_at
+        }, browser=True)
+        set_captcha(session, *captcha)
+        journal_browser(session_id, session)
+        restored += 1
+
+    log.info(f"✅ {restored} session(s) restored")
+
+
 if __name__ == '__main__':
-    print("\n" + "="*60)
-    print("🎯 ATTENDANCE API v3.1 - VISIBLE BROWSER MODE")
-    print("="*60)
-    print("⚠️  Browser windows will be VISIBLE")
-    print("🌐 http://localhost:5001")
-    print("="*60 + "\n")
-    app.run(debug=True, port=5001, host='0.0.0.0')
\ No newline at end of file
+    if SHARD_SOCKET:
+        # A worker behind router.py, which prints the banner
+        log.info(f"🧩 Shard {SHARD_ID} serving on {SHARD_SOCKET}")
+    else:
+        print("\n" + "="*60)
+        print("🎯 ATTENDANCE API v3.1 - VISIBLE BROWSER MODE")
+        print("="*60)
+        if BROWSER_PROFILE == 'lean':
+            print("🪶 Lean headless browsers (BROWSER_PROFILE=lean)")
+        else:
+            print("⚠️  Browser windows will be VISIBLE")
+        print(f"🌐 http://localhost:{PORT}")
+        print("="*60 + "\n")
+    # With the debug reloader only the serving child warms the pool
+    if not DEBUG or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        if SCRAPER_ENGINE != 'http':
+            browser_pool.start()
+        restore_sessions()
+        resource_monitor.start()
+    if SHARD_SOCKET:
+        app.run(debug=False, host=f'unix://{SHARD_SOCKET}')
+    else:
+        app.run(debug=DEBUG, port=PORT, host='0.0.0.0')
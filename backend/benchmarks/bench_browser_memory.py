@@ -0,0 +1,84 @@
+"""
+Per-session browser memory: visible vs lean profile
+
+Launches --sessions browsers per BROWSER_PROFILE, parks each on the login
+frame (the state the pool and every waiting captcha session hold), and
+reports the memory of each Chrome process tree from /proc - RSS, which
+counts shared pages once per process, and PSS, which splits them fairly.
+Linux only. Run from backend/ (needs Chrome):
+
+    python benchmarks/bench_browser_memory.py [--sessions 4] [--mock]
+
+--mock parks the browsers on benchmarks/mock_portal.py instead of the real
+portal.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from proc_stats import tree_memory_mb, available_mb  # noqa: E402
+
+PROFILES = ['visible', 'lean']
+
+
+def measure(profile, sessions, settle):
+    from browser_pool import start_login_browser, quit_quietly
+
+    drivers, launch_seconds = [], []
+    try:
+        for _ in range(sessions):
+            started = time.perf_counter()
+            drivers.append(start_login_browser(profile=profile))
+            launch_seconds.append(time.perf_counter() - started)
+        # Let renderers finish loading before reading their memory
+        time.sleep(settle)
+        usage = [tree_memory_mb(driver.browser_pid) for driver in drivers]
+    finally:
+        for driver in drivers:
+            quit_quietly(driver)
+
+    return {
+        'rss': statistics.mean(rss for rss, _ in usage),
+        'pss': statistics.mean(pss for _, pss in usage),
+        'launch': statistics.mean(launch_seconds),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=3, help='browsers per profile')
+    parser.add_argument('--settle', type=float, default=3, help='seconds to wait before measuring')
+    parser.add_argument('--profiles', nargs='+', default=PROFILES, choices=PROFILES)
+    parser.add_argument('--mock', action='store_true', help='use benchmarks/mock_portal.py')
+    args = parser.parse_args()
+
+    portal = None
+    if args.mock:
+        from mock_portal import MockPortal
+        portal = MockPortal(port=0).start()
+        # Read by scraper.portal when browser_pool is first imported
+        os.environ['IMS_URL'] = portal.url
+
+    try:
+        results = {profile: measure(profile, args.sessions, args.settle) for profile in args.profiles}
+    finally:
+        if portal is not None:
+            portal.stop()
+
+    free = available_mb()
+    print(f"{'profile':<10}{'RSS MB':>10}{'PSS MB':>10}{'launch s':>10}{'fit in ' + format(free, '.0f') + ' MB':>18}")
+    for profile, result in results.items():
+        print(f"{profile:<10}{result['rss']:>10.0f}{result['pss']:>10.0f}{result['launch']:>10.2f}"
+              f"{int(free // result['pss']) if result['pss'] else 0:>18}")
+
+    if 'visible' in results and 'lean' in results and results['lean']['pss']:
+        print(f"📉 lean uses {results['visible']['pss'] / results['lean']['pss']:.1f}x less memory per session (PSS)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+End-to-end latency benchmark: captcha and attendance through app.py
+
+Starts benchmarks/mock_portal.py and app.py (pointed at it with IMS_URL),
+then runs --iterations logins - POST /api/captcha followed by
+POST /api/attendance with the mock's captcha - --concurrency at a time,
+and prints p50/p95/p99 per endpoint. Run from backend/:
+
+    python benchmarks/bench_e2e.py [--engine http] [--iterations 50] [--concurrency 4]
+                                   [--latency 80] [--jitter 40] [--login-latency 300]
+
+--api http://host:port benchmarks an API that is already running (it must
+have been started with IMS_URL pointing at a mock portal).
+
+--shards N starts router.py with N app.py workers instead of a single
+app.py - the multi-process deployment under the same load:
+
+    python benchmarks/bench_e2e.py --shards 4 --iterations 200 --concurrency 16
+"""
+import argparse
+import logging
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_portal import MockPortal, MOCK_CAPTCHA  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REQUEST_TIMEOUT = 180
+BUSY_RETRIES = 10
+
+
+def start_api(args, portal_url):
+    """app.py (or router.py and its workers) in its own process group, without the reloader"""
+    env = dict(os.environ,
+               IMS_URL=portal_url,
+               PORT=str(args.api_port),
+               FLASK_DEBUG='0',
+               SCRAPER_ENGINE=args.engine,
+               LOG_LEVEL=args.log_level)
+    script = 'app.py'
+    if args.shards:
+        script = 'router.py'
+        env['SHARDS'] = str(args.shards)
+    process = subprocess.Popen([sys.executable, script], cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL if args.log_level == 'OFF' else None,
+                               start_new_session=True)
+    api = f'http://127.0.0.1:{args.api_port}'
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"❌ {script} exited with code {process.returncode}")
+        try:
+            requests.get(f'{api}/api/health', timeout=2)
+            return process, api
+        except requests.RequestException:
+            time.sleep(0.2)
+    stop_api(process)
+    sys.exit(f"❌ {script} did not start within 60s")
+
+
+def stop_api(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=10)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def post(api, path, body):
+    """POST, waiting out 503 Retry-After like the frontend would; returns (seconds, response)"""
+    started = time.perf_counter()
+    for _ in range(BUSY_RETRIES):
+        response = requests.post(f'{api}{path}', json=body, timeout=REQUEST_TIMEOUT)
+        if response.status_code != 503:
+            break
+        time.sleep(float(response.headers.get('Retry-After', 1)))
+    return time.perf_counter() - started, response
+
+
+def one_login(api, iteration, semester):
+    """Timings of one captcha + attendance round trip, and the error if any"""
+    timings = {}
+    captcha_seconds, response = post(api, '/api/captcha', {'roll_no': f'2023UIT{iteration:04d}'})
+    timings['captcha'] = captcha_seconds
+    data = response.json()
+    if not data.get('success'):
+        return timings, f"captcha: {data.get('error', response.status_code)}"
+
+    attendance_seconds, response = post(api, '/api/attendance', {
+        'session_id': data['session_id'],
+        'password': 'benchmark',
+        'captcha': MOCK_CAPTCHA,
+        'year': 0,
+        'semester': semester,
+    })
+    timings['attendance'] = attendance_seconds
+    timings['total'] = captcha_seconds + attendance_seconds
+    data = response.json()
+    if not data.get('success'):
+        return timings, f"attendance: {data.get('error', response.status_code)}"
+    return timings, None
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def report(samples):
+    print(f"{'endpoint':<12}{'n':>5}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name in ('captcha', 'attendance', 'total'):
+        values = [timings[name] * 1000 for timings in samples if name in timings]
+        if not values:
+            continue
+        print(f"{name:<12}{len(values):>5}{statistics.mean(values):>10.0f}"
+              f"{percentile(values, 50):>10.0f}{percentile(values, 95):>10.0f}"
+              f"{percentile(values, 99):>10.0f}{max(values):>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--engine', default='http', choices=['selenium', 'http', 'hybrid'])
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--warmup', type=int, default=2, help='untimed logins first')
+    parser.add_argument('--semester', type=int, default=5, help='semester index to fetch')
+    parser.add_argument('--latency', type=float, default=50, help='mock portal ms per response')
+    parser.add_argument('--jitter', type=float, default=25, help='mock portal extra random ms')
+    parser.add_argument('--login-latency', type=float, default=200, help='mock portal extra ms on login')
+    parser.add_argument('--mock-port', type=int, default=5099)
+    parser.add_argument('--api-port', type=int, default=5002)
+    parser.add_argument('--api', help='benchmark an already running API instead of starting app.py')
+    parser.add_argument('--shards', type=int, default=0, help='start router.py with this many workers')
+    parser.add_argument('--log-level', default='OFF', help='LOG_LEVEL for the app.py under test')
+    args = parser.parse_args()
+
+    process = None
+    portal = None
+    if args.api:
+        api = args.api.rstrip('/')
+    else:
+        # One access-log line per portal request would drown the report
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        portal = MockPortal(port=args.mock_port, latency=args.latency / 1000,
+                            jitter=args.jitter / 1000, login_latency=args.login_latency / 1000).start()
+        process, api = start_api(args, portal.url)
+        print(f"🧪 {args.engine} engine{f', {args.shards} shards' if args.shards else ''} against {portal.url} "
+              f"({args.latency:.0f}±{args.jitter:.0f} ms, login +{args.login_latency:.0f} ms)")
+
+    try:
+        for iteration in range(args.warmup):
+            one_login(api, iteration, args.semester)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            runs = list(executor.map(lambda i: one_login(api, i, args.semester),
+                                     range(args.warmup, args.warmup + args.iterations)))
+        elapsed = time.perf_counter() - started
+    finally:
+        if process is not None:
+            stop_api(process)
+        if portal is not None:
+            portal.stop()
+
+    samples = [timings for timings, error in runs if error is None]
+    errors = [error for _, error in runs if error is not None]
+    print(f"⏱️  {args.iterations} logins, concurrency {args.concurrency}: "
+          f"{elapsed:.1f}s, {len(samples) / elapsed:.2f} logins/s, {len(errors)} failed")
+    report(samples)
+    for error in sorted(set(errors)):
+        print(f"❌ {errors.count(error)}x {error}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Parser benchmark: single-pass tokenizer vs the BeautifulSoup reference
+
+Checks that both parsers return identical records for every page in
+benchmarks/corpus/, then times them. The compact columns show what
+dom.COLLECT_ATTENDANCE_JS sends back instead of the page - the header and
+Overall rows as cell text plus the names map - and how long turning that into
+records takes. Run from backend/:
+
+    python benchmarks/bench_parser.py [--repeat 50]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper.utils import extract_attendance_table_bs4, extract_attendance_table_enhanced  # noqa: E402
+from scraper.attendance_parser import (extract_attendance_table_fast, parse_tables,  # noqa: E402
+                                       SUBJECT_CODE_RE)
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+
+def load_corpus():
+    pages = {}
+    for filename in sorted(os.listdir(CORPUS_DIR)):
+        if filename.endswith('.html'):
+            with open(os.path.join(CORPUS_DIR, filename), encoding='utf-8') as f:
+                pages[filename] = f.read()
+    return pages
+
+
+def compact(html):
+    """The structure COLLECT_ATTENDANCE_JS builds in the page, reduced the same way"""
+    tables, names = parse_tables(html)
+    reduced = []
+    for rows in tables:
+        kept, header = [], False
+        for cells in rows:
+            if any(SUBJECT_CODE_RE.match(text) for text in cells):
+                header = True
+                kept.append(cells)
+            elif header and cells and 'overall' in cells[0].lower():
+                kept.append(cells)
+        if len(kept) > 1:
+            reduced.append(kept)
+    return {'tables': reduced, 'names': names}
+
+
+def best_ms(fn, html, repeat):
+    timer = timeit.Timer(lambda: fn(html))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    pages = load_corpus()
+    if not pages:
+        sys.exit("No corpus pages - run benchmarks/make_corpus.py first")
+
+    print(f"{'page':<22}{'KB':>8}{'subjects':>10}{'bs4 ms':>10}{'fast ms':>10}{'speedup':>9}"
+          f"{'compact KB':>12}{'compact ms':>12}")
+    for filename, html in pages.items():
+        expected = extract_attendance_table_bs4(html)
+        actual = extract_attendance_table_fast(html)
+        if actual != expected:
+            sys.exit(f"❌ {filename}: parsers disagree\n  bs4:  {expected}\n  fast: {actual}")
+        reduced = compact(html)
+        if extract_attendance_table_enhanced(reduced) != expected:
+            sys.exit(f"❌ {filename}: compact table disagrees\n  bs4:     {expected}\n  compact: {reduced}")
+
+        bs4_ms = best_ms(extract_attendance_table_bs4, html, args.repeat)
+        fast_ms = best_ms(extract_attendance_table_fast, html, args.repeat)
+        compact_ms = best_ms(extract_attendance_table_enhanced, reduced, args.repeat)
+        print(f"{filename:<22}{len(html) / 1024:>8.1f}{len(actual):>10}"
+              f"{bs4_ms:>10.2f}{fast_ms:>10.2f}{bs4_ms / fast_ms:>8.1f}x"
+              f"{len(json.dumps(reduced)) / 1024:>12.1f}{compact_ms:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Startup benchmark: app.py import time, time to first /api/health, and
+(optionally) browser launch time with the shared patched chromedriver
+
+Each measurement runs in a fresh interpreter so module caches and the
+chromedriver memo start cold. Run from backend/:
+
+    python benchmarks/bench_startup.py [--runs 5] [--launch 3]
+
+--launch needs Chrome; the first launch also prepares the chromedriver
+cache if CHROMEDRIVER_CACHE_DIR is empty.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ['selenium', 'undetected_chromedriver', 'bs4', 'requests']
+
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import app
+elapsed = time.perf_counter() - started
+print(json.dumps({'seconds': elapsed, 'loaded': [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+LAUNCH_SCRIPT = """
+import json, time
+from browser_pool import launch_browser, quit_quietly
+started = time.perf_counter()
+driver = launch_browser()
+elapsed = time.perf_counter() - started
+quit_quietly(driver)
+print(json.dumps({'seconds': elapsed}))
+"""
+
+
+def run_script(script, env=None):
+    output = subprocess.run([sys.executable, '-c', script], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def time_to_health(env, port):
+    """Seconds from spawning app.py until /api/health answers"""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, 'app.py'], cwd=BACKEND_DIR,
+                               env=dict(env, PORT=str(port), FLASK_DEBUG='0'),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if process.poll() is not None:
+                sys.exit(f"❌ app.py exited with code {process.returncode}")
+            try:
+                requests.get(f'http://127.0.0.1:{port}/api/health', timeout=1)
+                return time.perf_counter() - started
+            except requests.RequestException:
+                time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def summary(values):
+    return f"min {min(values) * 1000:7.0f} ms   median {statistics.median(values) * 1000:7.0f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--launch', type=int, default=0, help='browser launches to time (needs Chrome)')
+    parser.add_argument('--port', type=int, default=5003)
+    args = parser.parse_args()
+
+    # Keep Chrome out of the import and health numbers
+    env = dict(os.environ, SCRAPER_ENGINE='http', LOG_LEVEL='OFF')
+
+    imports = [run_script(IMPORT_SCRIPT, env) for _ in range(args.runs)]
+    print(f"📦 import app        {summary([r['seconds'] for r in imports])}")
+    loaded = imports[-1]['loaded']
+    print(f"   heavy modules loaded at import: {', '.join(loaded) if loaded else 'none'}")
+
+    health = [time_to_health(env, args.port) for _ in range(args.runs)]
+    print(f"🩺 first /api/health {summary(health)}")
+
+    if args.launch:
+        launches = [run_script(LAUNCH_SCRIPT, dict(os.environ, LOG_LEVEL='OFF'))['seconds']
+                    for _ in range(args.launch)]
+        print(f"🌐 browser launch    {summary(launches)}   (first {launches[0] * 1000:.0f} ms)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Check: a password lockout cannot log a student out
+
+Starts benchmarks/mock_portal.py and app.py (http engine, short
+PASSWORD_FAILURE_WINDOW), logs a roll number in with keep_logged_in, then
+plays a stranger who knows only the roll number and the session id and
+guesses passwords against /api/attendance/cached and /refresh until the
+roll is locked. It fails unless both answer 429 while locked, the parked
+session is still there, and once the window ends the student's refresh
+and cached lookup both work again. Run from backend/:
+
+    python benchmarks/check_lockout.py [--window 5] [--max-failures 3]
+"""
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_portal import MockPortal, MOCK_CAPTCHA  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROLL_NO = '2023UIT00001'
+PASSWORD = 'student'
+
+
+def start_api(args, portal_url):
+    env = dict(os.environ,
+               IMS_URL=portal_url,
+               PORT=str(args.api_port),
+               FLASK_DEBUG='0',
+               SCRAPER_ENGINE='http',
+               LOG_LEVEL=args.log_level,
+               MAX_PASSWORD_FAILURES=str(args.max_failures),
+               PASSWORD_FAILURE_WINDOW=str(args.window))
+    process = subprocess.Popen([sys.executable, 'app.py'], cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL if args.log_level == 'OFF' else None)
+    api = f'http://127.0.0.1:{args.api_port}'
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"❌ app.py exited with code {process.returncode}")
+        try:
+            requests.get(f'{api}/api/health', timeout=2)
+            return process, api
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    sys.exit("❌ app.py did not start within 60s")
+
+
+def parked_sessions(api):
+    return requests.get(f'{api}/api/health', timeout=10).json()['sessions']['parked']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--window', type=int, default=5, help='PASSWORD_FAILURE_WINDOW for app.py')
+    parser.add_argument('--max-failures', type=int, default=3, help='MAX_PASSWORD_FAILURES for app.py')
+    parser.add_argument('--mock-port', type=int, default=5099)
+    parser.add_argument('--api-port', type=int, default=5005)
+    parser.add_argument('--log-level', default='OFF', help='LOG_LEVEL for the app.py under test')
+    args = parser.parse_args()
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    portal = MockPortal(port=args.mock_port).start()
+    process, api = start_api(args, portal.url)
+    failures = []
+
+    def expect(what, response, status):
+        ok = response.status_code == status
+        print(f"{'✅' if ok else '❌'} {what}: {response.status_code}"
+              + (f" (expected {status})" if not ok else ""))
+        if not ok:
+            failures.append(what)
+
+    def cached(password):
+        return requests.post(f'{api}/api/attendance/cached', timeout=30,
+                             json={'roll_no': ROLL_NO, 'password': password, 'year': 0, 'semester': 5})
+
+    def refresh(password):
+        return requests.post(f'{api}/api/attendance/refresh', timeout=60,
+                             json={'session_id': session_id, 'password': password, 'year': 0, 'semester': 5})
+
+    try:
+        session_id = requests.post(f'{api}/api/captcha', json={'roll_no': ROLL_NO},
+                                   timeout=60).json()['session_id']
+        login = requests.post(f'{api}/api/attendance', timeout=60,
+                              json={'session_id': session_id, 'password': PASSWORD, 'captcha': MOCK_CAPTCHA,
+                                    'year': 0, 'semester': 5, 'keep_logged_in': True})
+        expect("Login with keep_logged_in", login, 200)
+        parked = parked_sessions(api)
+
+        print(f"🔓 Guessing {args.max_failures} wrong passwords")
+        for attempt in range(args.max_failures):
+            (cached if attempt % 2 else refresh)('guess')
+        expect("Cached lookup while locked", cached(PASSWORD), 429)
+        expect("Refresh while locked", refresh(PASSWORD), 429)
+        if parked_sessions(api) != parked or parked == 0:
+            print(f"❌ Parked sessions went from {parked} to {parked_sessions(api)}")
+            failures.append("parked session kept")
+        else:
+            print(f"✅ Parked session kept ({parked} parked)")
+
+        print(f"⏳ Waiting {args.window + 1}s for the lockout window to end")
+        time.sleep(args.window + 1)
+        expect("Refresh after the window", refresh(PASSWORD), 200)
+        expect("Cached lookup after the window", cached(PASSWORD), 200)
+    finally:
+        process.kill()
+        process.wait(timeout=10)
+        portal.stop()
+
+    print("✅ Lockout left the student's session and cache alone" if not failures else "❌ Lockout check failed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
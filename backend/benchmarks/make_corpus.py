@@ -0,0 +1,141 @@
+"""
+Regenerates the saved portal pages in benchmarks/corpus/
+
+The pages follow the markup of the IMS "My Attendance" result frame: a layout
+table holding the year/semester form, the day-by-day table with the subject
+code header and the Overall rows, and a colspan cell listing SUBCODE-Name.
+Roll numbers and names are made up. Run from backend/:
+
+    python benchmarks/make_corpus.py
+"""
+import os
+import random
+from datetime import date, timedelta
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+SUBJECTS = [
+    ('ITITC601', 'Web Technology'),
+    ('ITITC602', 'Compiler Design'),
+    ('ITITC603', 'Information Security'),
+    ('ITITE604', 'Machine Learning'),
+    ('ITITE605', 'Cloud Computing'),
+    ('DNCS0603', 'Data Networks &amp; Communication'),
+    ('HSOE606', 'Professional Ethics'),
+    ('ITITC607', 'Software Engineering'),
+    ('ITITC608', 'Distributed Systems'),
+    ('ITITE609', 'Natural Language Processing'),
+    ('ITITE610', 'Computer Vision'),
+    ('MAOE611', 'Operations Research'),
+    ('ITITC612', 'Mobile Computing'),
+    ('ITITE613', 'Blockchain Technologies'),
+    ('ITITC614', 'Big Data Analytics'),
+    ('ITITE615', 'Internet of Things'),
+]
+
+PAGE_HEAD = """<!DOCTYPE HTML PUBLIC "-//W3C//DTD HTML 4.01 Transitional//EN">
+<html>
+<head>
+<meta http-equiv="Content-Type" content="text/html; charset=UTF-8">
+<title>My Attendance</title>
+<link rel="stylesheet" href="../css/ims.css" type="text/css">
+<script type="text/javascript">
+function doSubmit(f) { if (f.year.value == '') { alert('Select <year>'); return false; } return true; }
+</script>
+<style>td.plum_head { background: #dcdcff; } .pr { color: green; } .ab { color: red; }</style>
+</head>
+<body bgcolor="#FFFFFF">
+<table width="100%" border="0" cellspacing="0" cellpadding="0">
+<tr><td class="plum_head" align="center"><b>My Attendance</b></td></tr>
+<tr><td>
+<form name="attfrm" method="post" action="attendance.php" onsubmit="return doSubmit(this)">
+<input type="hidden" name="enc_token" value="9f2c1e0b7a">
+<table border="0" cellpadding="3">
+<tr>
+<td>Year</td>
+<td><select name="year"><option value="">--Select--</option><option value="2025-26" selected>2025-26</option><option value="2024-25">2024-25</option><option value="2023-24">2023-24</option></select></td>
+<td>Semester</td>
+<td><select name="sem"><option value="">--Select--</option>{sem_options}</select></td>
+<td><input type="submit" name="submit" value="Submit"> <input type="submit" name="mpdfx" value="Download PDF"></td>
+</tr>
+</table>
+</form>
+</td></tr>
+</table>
+"""
+
+PAGE_TAIL = """<p class="footer">Attendance shown is as marked by the faculty. &copy; NSUT</p>
+<!-- generated for the parser benchmark -->
+</body>
+</html>
+"""
+
+
+def _attendance_table(rng, subjects, days):
+    codes = [code for code, _ in subjects]
+    start = date(2025, 1, 6)
+
+    lines = ['<table border="1" cellspacing="0" cellpadding="2" class="plum_fieldbig">']
+    lines.append('<tr class="plum_head"><td><b>Days</b></td>' +
+                 ''.join(f'<td align="center"><b>{code}</b></td>' for code in codes) + '</tr>')
+
+    present = [0] * len(codes)
+    absent = [0] * len(codes)
+    for day in range(days):
+        cells = []
+        for idx in range(len(codes)):
+            roll = rng.random()
+            if roll < 0.55:
+                cells.append('<td>&nbsp;</td>')
+            elif roll < 0.9:
+                present[idx] += 1
+                cells.append('<td class="pr">P</td>')
+            else:
+                absent[idx] += 1
+                cells.append('<td class="ab">A</td>')
+        when = start + timedelta(days=day)
+        lines.append(f'<tr><td nowrap>{when:%d-%b-%Y}</td>' + ''.join(cells) + '</tr>')
+
+    total = [p + a for p, a in zip(present, absent)]
+    percent = [f'{(p / t * 100):.2f}' if t else '0.00' for p, t in zip(present, total)]
+    for label, values in (('Overall Class', total), ('Overall Absent', absent),
+                          ('Overall Present', present), ('Overall (%)', percent)):
+        lines.append(f'<tr><td><b>{label}</b></td>' +
+                     ''.join(f'<td align="center"><b>{value}</b></td>' for value in values) + '</tr>')
+
+    names = '<br>\n'.join(f'<b>{code}</b>-{name}' for code, name in subjects)
+    lines.append(f'<tr><td colspan="{len(codes) + 1}">{names}</td></tr>')
+    lines.append('</table>')
+    return '\n'.join(lines) + '\n'
+
+
+def make_page(seed, n_subjects, days, semester):
+    rng = random.Random(seed)
+    sem_options = ''.join(
+        f'<option value="{n}"{" selected" if n == semester else ""}>{n}</option>' for n in range(1, 9))
+    return (PAGE_HEAD.replace('{sem_options}', sem_options) +
+            _attendance_table(rng, SUBJECTS[:n_subjects], days) +
+            PAGE_TAIL)
+
+
+CORPUS = {
+    # Early in the semester, few subjects
+    'small.html': dict(seed=1, n_subjects=3, days=12, semester=1),
+    # Typical end-of-semester page
+    'typical.html': dict(seed=2, n_subjects=7, days=90, semester=6),
+    # Many electives and a long semester
+    'many_subjects.html': dict(seed=3, n_subjects=16, days=160, semester=8),
+}
+
+
+def main():
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    for filename, params in CORPUS.items():
+        html = make_page(**params)
+        with open(os.path.join(CORPUS_DIR, filename), 'w', encoding='utf-8') as f:
+            f.write(html)
+        print(f"📝 {filename}: {len(html) / 1024:.1f} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+Local stand-in for the IMS portal, for end-to-end benchmarks
+
+Serves the pages both engines walk through, with the same structure as
+the real portal:
+
+    /imsnsit/                  landing page with the "Student Login" link
+    /imsnsit/login.htm         frameset whose first frame holds the login form
+    /imsnsit/student.htm       banner / top / contents / data frameset
+    top                        "My Activities" -> contents
+    contents                   hitarea tree: Attendance -> "My Attendance" -> data
+    data                       year/semester form, then the day-by-day table
+
+Every password is accepted; the captcha answer is MOCK_CAPTCHA (12345).
+Each response is delayed by --latency ms plus up to --jitter ms, and the
+login POST by --login-latency ms on top, to mimic a slow portal. Run from
+backend/:
+
+    python benchmarks/mock_portal.py [--port 5099] [--latency 80] [--jitter 40]
+
+then start the API against it with IMS_URL=http://127.0.0.1:5099/imsnsit/.
+"""
+import argparse
+import os
+import random
+import secrets
+import struct
+import sys
+import threading
+import time
+import zlib
+
+from flask import Flask, request, redirect, make_response
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from make_corpus import PAGE_HEAD, PAGE_TAIL, SUBJECTS, _attendance_table  # noqa: E402
+
+MOCK_CAPTCHA = os.environ.get("MOCK_CAPTCHA", "12345")
+COOKIE = 'PHPSESSID'
+SEMESTERS = 8
+
+LANDING = """<html><head><title>IMS NSUT</title></head><body>
+<table><tr><td><a href="login.htm" target="_top">Student Login</a></td>
+<td><a href="#">Faculty Login</a></td></tr></table>
+</body></html>"""
+
+LOGIN_FRAMESET = """<html><head><title>Student Login</title></head>
+<frameset rows="100%,*" border="0">
+<frame name="login" src="login_form.php">
+<frame name="blank" src="about:blank">
+</frameset></html>"""
+
+LOGIN_FORM = """<html><body>
+<form name="loginfrm" method="post" action="login.php" target="_top">
+<input type="hidden" name="enc" value="{token}">
+<table>
+<tr><td>Roll No</td><td><input type="text" id="uid" name="uid" value=""></td></tr>
+<tr><td>Password</td><td><input type="password" id="pwd" name="pwd"></td></tr>
+<tr><td><img id="captchaimg" src="captcha.php" width="120" height="40"></td>
+<td><input type="text" id="cap" name="cap"></td></tr>
+<tr><td colspan="2"><input type="submit" name="login" value="Login"></td></tr>
+</table>
+{message}
+</form>
+</body></html>"""
+
+STUDENT_FRAMESET = """<html><head><title>Student</title></head>
+<frameset rows="60,40,*" border="0">
+<frame name="banner" src="banner.php">
+<frame name="top" src="top.php">
+<frameset cols="220,*">
+<frame name="contents" src="about:blank">
+<frame name="data" src="about:blank">
+</frameset>
+</frameset></html>"""
+
+BANNER = "<html><body><b>Integrated Management System</b></body></html>"
+
+TOP = """<html><body>
+<a href="activities.php" target="contents">My Activities</a> |
+<a href="logout.php" target="_top">Logout</a>
+</body></html>"""
+
+# Same markup and class flip as the portal's jQuery treeview
+ACTIVITIES = """<html><head><script>
+function toggle(hitarea) {
+    var list = hitarea.parentNode.getElementsByTagName('ul')[0];
+    var open = hitarea.className.indexOf('expandable-hitarea') !== -1;
+    hitarea.className = 'hitarea ' + (open ? 'collapsable-hitarea' : 'expandable-hitarea');
+    list.style.display = open ? 'block' : 'none';
+}
+</script></head><body>
+<ul class="treeview">
+<li><div class="hitarea expandable-hitarea" onclick="toggle(this)"></div><span>Profile</span>
+<ul style="display:none"><li><a href="#">View Profile</a></li></ul></li>
+<li><div class="hitarea expandable-hitarea" onclick="toggle(this)"></div><span>Attendance</span>
+<ul style="display:none"><li><a href="attendance.php" target="data">My Attendance</a></li></ul></li>
+</ul>
+</body></html>"""
+
+
+def captcha_png(width=120, height=40):
+    """A small grey-noise PNG - the engines only pass the bytes through"""
+    rng = random.Random()
+    rows = b''.join(b'\x00' + bytes(rng.randrange(140, 256) for _ in range(width))
+                    for _ in range(height))
+
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body) & 0xffffffff)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) +
+            chunk(b'IDAT', zlib.compress(rows)) + chunk(b'IEND', b''))
+
+
+def attendance_page(year_idx=None, semester=None):
+    """The data frame: the form, plus the table once a semester was submitted"""
+    sem_options = ''.join(
+        f'<option value="{n}"{" selected" if n == semester else ""}>{n}</option>'
+        for n in range(1, SEMESTERS + 1))
+    html = PAGE_HEAD.replace('{sem_options}', sem_options)
+    if semester:
+        # Stable per (year, semester) so repeated runs parse the same data
+        rng = random.Random(year_idx * 100 + semester)
+        html += _attendance_table(rng, SUBJECTS[:5 + semester % 4], days=20 + semester * 10)
+    return html + PAGE_TAIL
+
+
+def create_app(latency=0.0, jitter=0.0, login_latency=0.0):
+    """Flask app serving the mock portal; delays are in seconds"""
+    portal = Flask(__name__)
+    logged_in = set()
+    lock = threading.Lock()
+
+    def is_logged_in():
+        with lock:
+            return request.cookies.get(COOKIE) in logged_in
+
+    @portal.before_request
+    def slow_down():
+        delay = latency + random.uniform(0, jitter)
+        if delay:
+            time.sleep(delay)
+
+    @portal.route('/imsnsit/')
+    def landing():
+        response = make_response(LANDING)
+        if COOKIE not in request.cookies:
+            response.set_cookie(COOKIE, secrets.token_hex(16), path='/imsnsit/')
+        return response
+
+    @portal.route('/imsnsit/login.htm')
+    def login_frameset():
+        return LOGIN_FRAMESET
+
+    @portal.route('/imsnsit/login_form.php')
+    def login_form():
+        return LOGIN_FORM.format(token=secrets.token_hex(4), message='')
+
+    @portal.route('/imsnsit/captcha.php')
+    def captcha():
+        response = make_response(captcha_png())
+        response.headers['Content-Type'] = 'image/png'
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    @portal.route('/imsnsit/login.php', methods=['POST'])
+    def login():
+        if login_latency:
+            time.sleep(login_latency)
+        session_id = request.cookies.get(COOKIE)
+        if not session_id or not request.form.get('uid') or not request.form.get('pwd'):
+            message = '<font color="red">Invalid login</font>'
+        elif request.form.get('cap') != MOCK_CAPTCHA:
+            message = '<font color="red">Invalid captcha code</font>'
+        else:
+            with lock:
+                logged_in.add(session_id)
+            return redirect('student.htm')
+        return LOGIN_FORM.format(token=secrets.token_hex(4), message=message)
+
+    @portal.route('/imsnsit/logout.php')
+    def logout():
+        with lock:
+            logged_in.discard(request.cookies.get(COOKIE))
+        return redirect('./')
+
+    @portal.route('/imsnsit/student.htm')
+    def student():
+        if not is_logged_in():
+            return redirect('./')
+        return STUDENT_FRAMESET
+
+    @portal.route('/imsnsit/banner.php')
+    def banner():
+        return BANNER
+
+    @portal.route('/imsnsit/top.php')
+    def top():
+        return TOP if is_logged_in() else LANDING
+
+    @portal.route('/imsnsit/activities.php')
+    def activities():
+        return ACTIVITIES if is_logged_in() else LANDING
+
+    @portal.route('/imsnsit/attendance.php', methods=['GET', 'POST'])
+    def attendance():
+        if not is_logged_in():
+            return LANDING
+        if request.method == 'GET':
+            return attendance_page()
+
+        years = ['2025-26', '2024-25', '2023-24']
+        year = request.form.get('year', '')
+        semester = request.form.get('sem', '')
+        if year not in years or not semester.isdigit():
+            return attendance_page()
+        return attendance_page(years.index(year), int(semester))
+
+    return portal
+
+
+class MockPortal:
+    """Mock portal on a background thread - url is the IMS_URL to use"""
+
+    def __init__(self, host='127.0.0.1', port=5099, **delays):
+        self._server = make_server(host, port, create_app(**delays), threaded=True)
+        self.url = f'http://{host}:{self._server.server_port}/imsnsit/'
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5099)
+    parser.add_argument('--latency', type=float, default=float(os.environ.get("MOCK_LATENCY", 0)),
+                        help='ms added to every response')
+    parser.add_argument('--jitter', type=float, default=0, help='extra random ms, 0..jitter')
+    parser.add_argument('--login-latency', type=float, default=0, help='extra ms on the login POST')
+    args = parser.parse_args()
+
+    portal = MockPortal(args.host, args.port, latency=args.latency / 1000,
+                        jitter=args.jitter / 1000, login_latency=args.login_latency / 1000)
+    print(f"🧪 Mock portal on {portal.url} (captcha {MOCK_CAPTCHA})")
+    portal.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        portal.stop()
+
+
+if __name__ == '__main__':
+    main()
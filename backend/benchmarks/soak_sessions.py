@@ -0,0 +1,292 @@
+"""
+Soak test: thousands of sessions, and no Chrome left behind
+
+Starts benchmarks/mock_portal.py and app.py with a short SESSION_TIMEOUT,
+ORPHAN_GRACE and RESOURCE_MONITOR_INTERVAL, then runs --sessions logins,
+--concurrency at a time, that end in every way a student can end one:
+
+- complete    captcha, then attendance
+- abandon     captcha, never submitted - the session expires
+- wrong       a wrong captcha first, then the retry (or abandoned)
+- logout      keep_logged_in, then POST /api/logout
+
+One session runs first; if it fails (no Chrome, say) the soak stops there.
+Afterwards it waits for the sessions to drain, restarts app.py without
+letting it shut its browsers down (what a crash or deploy does), plants
+a stub tree tagged like a leftover browser (a shell named chrome-stub with
+sleeping children) and checks that the new process reaps all of it. It
+fails if any Chrome process tagged for this server is not owned by the API
+in the end, if the stub tree survives, or if a browser engine never had a
+tagged Chrome running at all. Linux
+only. Run from backend/ (needs Chrome unless --engine http):
+
+    python benchmarks/soak_sessions.py [--sessions 2000] [--concurrency 8] [--engine selenium]
+"""
+import argparse
+import collections
+import logging
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_portal import MockPortal, MOCK_CAPTCHA  # noqa: E402
+from proc_stats import processes, environ, kill_tree, pid_alive, process_tree  # noqa: E402
+from resource_monitor import OWNER_ENV, owner_tag  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REQUEST_TIMEOUT = 180
+# Abandoned sessions hold their browser until SESSION_TIMEOUT, so 503s can last a while
+BUSY_DEADLINE = 300
+OUTCOMES = ['complete', 'abandon', 'wrong', 'logout']
+
+
+def start_api(args, portal_url):
+    env = dict(os.environ,
+               IMS_URL=portal_url,
+               PORT=str(args.api_port),
+               FLASK_DEBUG='0',
+               SCRAPER_ENGINE=args.engine,
+               LOG_LEVEL=args.log_level,
+               SESSION_TIMEOUT=str(args.session_timeout),
+               ORPHAN_GRACE=str(args.grace),
+               RESOURCE_MONITOR_INTERVAL=str(args.interval))
+    process = subprocess.Popen([sys.executable, 'app.py'], cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL if args.log_level == 'OFF' else None,
+                               start_new_session=True)
+    api = f'http://127.0.0.1:{args.api_port}'
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"❌ app.py exited with code {process.returncode}")
+        try:
+            requests.get(f'{api}/api/health', timeout=2)
+            return process, api
+        except requests.RequestException:
+            time.sleep(0.2)
+    stop_api(process)
+    sys.exit("❌ app.py did not start within 60s")
+
+
+def stop_api(process):
+    """SIGKILL only app.py - its browsers are in other process groups and stay behind"""
+    try:
+        process.kill()
+        process.wait(timeout=10)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        pass
+
+
+def post(api, path, body):
+    """POST, waiting out 503 Retry-After for up to BUSY_DEADLINE"""
+    deadline = time.monotonic() + BUSY_DEADLINE
+    while True:
+        response = requests.post(f'{api}{path}', json=body, timeout=REQUEST_TIMEOUT)
+        if response.status_code != 503 or time.monotonic() > deadline:
+            return response
+        time.sleep(float(response.headers.get('Retry-After', 1)))
+
+
+def one_session(api, number, outcome):
+    """Drive one session to `outcome`; the error if it went wrong"""
+    data = post(api, '/api/captcha', {'roll_no': f'2023UIT{number:05d}'}).json()
+    if not data.get('success'):
+        return f"captcha: {data.get('error')}"
+    session_id = data['session_id']
+    if outcome == 'abandon':
+        return None
+
+    submit = {'session_id': session_id, 'password': 'soak', 'captcha': MOCK_CAPTCHA,
+              'year': 0, 'semester': 5, 'keep_logged_in': outcome == 'logout'}
+    if outcome == 'wrong':
+        data = post(api, '/api/attendance', dict(submit, captcha='00000')).json()
+        if data.get('success'):
+            return "attendance: wrong captcha accepted"
+        # Half of the students give up on the new captcha
+        if not data.get('retry') or random.random() < 0.5:
+            return None
+
+    data = post(api, '/api/attendance', submit).json()
+    if not data.get('success'):
+        return f"attendance: {data.get('error')}"
+    if outcome == 'logout':
+        data = post(api, '/api/logout', {'session_id': session_id}).json()
+        if not data.get('success'):
+            return f"logout: {data.get('error')}"
+    return None
+
+
+def tagged_roots(tag):
+    """Roots of the Chrome/chromedriver trees carrying this server's owner tag"""
+    tagged = {pid: proc for pid, proc in processes('chro').items() if environ(pid).get(OWNER_ENV) == tag}
+    return {pid: proc for pid, proc in tagged.items() if proc['ppid'] not in tagged}, len(tagged)
+
+
+def start_stub_tree(tag, workdir, children=2):
+    """
+    A stand-in for a browser left behind: a shell named chrome-stub with
+    sleeping children, carrying the owner tag and detached from this
+    process so it is not ours to reap. Its pids, root first
+    """
+    shell = os.path.join(workdir, 'chrome-stub')
+    child = os.path.join(workdir, 'chrome-stub-child')
+    os.symlink(shutil.which('sh'), shell)
+    os.symlink(shutil.which('sleep'), child)
+    script = f'{child} 3600 & ' * children + 'wait'
+    launcher = subprocess.run(['sh', '-c', f"{shell} -c '{script}' >/dev/null 2>&1 & echo $!"],
+                              env=dict(os.environ, **{OWNER_ENV: tag}), capture_output=True, text=True,
+                              check=True)
+    root = int(launcher.stdout)
+    deadline = time.monotonic() + 10
+    while len(process_tree(root)) <= children and time.monotonic() < deadline:
+        time.sleep(0.1)
+    return process_tree(root)
+
+
+def health(api):
+    return requests.get(f'{api}/api/health', timeout=10).json()
+
+
+def wait_for(api, condition, timeout, what):
+    """Poll /api/health until condition(health) holds; the last health seen"""
+    deadline = time.monotonic() + timeout
+    while True:
+        data = health(api)
+        if condition(data):
+            return data
+        if time.monotonic() > deadline:
+            print(f"⚠️  Gave up waiting for {what} after {timeout:.0f}s")
+            return data
+        time.sleep(1)
+
+
+def watch_peak(tag, stop, peak):
+    """Most tagged processes seen at once, sampled from /proc until stop is set"""
+    while not stop.wait(0.5):
+        _, count = tagged_roots(tag)
+        peak['processes'] = max(peak['processes'], count)
+
+
+def settled(data):
+    """No sessions, and a sample taken since then found every tree owned"""
+    processes_seen = data.get('processes', {})
+    return (data['sessions']['live'] == 0
+            and processes_seen.get('sampled_seconds_ago') is not None
+            and processes_seen.get('unowned_trees') == 0
+            and processes_seen.get('trees') == processes_seen.get('owned_trees'))
+
+
+def check(api, tag, args):
+    """Let the monitor catch up, then compare its view with /proc; True if nothing is left over"""
+    data = wait_for(api, settled, args.session_timeout + args.grace + 10 * args.interval, 'sessions to drain')
+    roots, count = tagged_roots(tag)
+    stats = data.get('processes', {})
+    print(f"   sessions {data['sessions']['live']}, pool {data.get('pool', {}).get('idle', '-')} idle, "
+          f"{count} tagged processes in {len(roots)} trees; monitor: {stats.get('owned_trees')} owned, "
+          f"{stats.get('unowned_trees')} unowned, {stats.get('reaped')} reaped, {stats.get('rss_mb')} MB")
+    return settled(data) and len(roots) == stats.get('owned_trees')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--engine', default='selenium', choices=['selenium', 'http', 'hybrid'])
+    parser.add_argument('--sessions', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--session-timeout', type=int, default=10, help='SESSION_TIMEOUT for app.py')
+    parser.add_argument('--grace', type=int, default=10, help='ORPHAN_GRACE for app.py')
+    parser.add_argument('--interval', type=int, default=2, help='RESOURCE_MONITOR_INTERVAL for app.py')
+    parser.add_argument('--latency', type=float, default=20, help='mock portal ms per response')
+    parser.add_argument('--mock-port', type=int, default=5099)
+    parser.add_argument('--api-port', type=int, default=5003)
+    parser.add_argument('--log-level', default='OFF', help='LOG_LEVEL for the app.py under test')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if not os.path.isdir('/proc'):
+        sys.exit("❌ Needs /proc (Linux)")
+    random.seed(args.seed)
+    tag = owner_tag(port=args.api_port, shard_id=None)
+    outcomes = [random.choice(OUTCOMES) for _ in range(args.sessions)]
+
+    # One access-log line per portal request would drown the report
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    portal = MockPortal(port=args.mock_port, latency=args.latency / 1000).start()
+    process, api = start_api(args, portal.url)
+    print(f"🧪 {args.sessions} sessions, {args.engine} engine, concurrency {args.concurrency} "
+          f"against {portal.url} (owner tag {tag})")
+    ok = False
+    stop = threading.Event()
+    peak = {'processes': 0}
+    stub = []
+    workdir = tempfile.mkdtemp(prefix='attendx-soak-')
+    try:
+        error = one_session(api, 0, 'complete')
+        if error:
+            sys.exit(f"❌ The first session failed ({error}) - not starting the soak")
+
+        threading.Thread(target=watch_peak, args=(tag, stop, peak), daemon=True).start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            errors = list(executor.map(lambda run: one_session(api, *run), enumerate(outcomes, start=1)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        counts = collections.Counter(outcomes)
+        print(f"⏱️  {elapsed:.0f}s, {args.sessions / elapsed:.1f} sessions/s "
+              f"({', '.join(f'{counts[name]} {name}' for name in OUTCOMES)})")
+        failed = [error for error in errors if error]
+        for error in sorted(set(failed)):
+            print(f"❌ {failed.count(error)}x {error}")
+        print(f"📈 At most {peak['processes']} tagged Chrome/chromedriver processes at once")
+        exercised = args.engine == 'http' or peak['processes'] > 0
+        if not exercised:
+            print("❌ No browser was ever running - the reaper was not exercised")
+
+        print("🔎 After the sessions drained:")
+        drained = check(api, tag, args)
+
+        # A crash or deploy: the old process goes, its pool browsers stay
+        stop_api(process)
+        left, _ = tagged_roots(tag)
+        stub = start_stub_tree(tag, workdir)
+        print(f"💥 Killed app.py with {len(left)} browser trees still running, planted a stub tree "
+              f"of {len(stub)} processes - restarting")
+        process, api = start_api(args, portal.url)
+        print("🔎 After the restart:")
+        restarted = check(api, tag, args)
+        survivors = [pid for pid in stub if pid_alive(pid)]
+        if survivors:
+            print(f"❌ {len(survivors)} of the stub tree's {len(stub)} processes survived the restart")
+        else:
+            print(f"✅ The stub tree's {len(stub)} processes were reaped")
+        ok = drained and restarted and exercised and len(stub) > 1 and not survivors and not failed
+    finally:
+        stop.set()
+        stop_api(process)
+        portal.stop()
+        leftovers, count = tagged_roots(tag)
+        for pid in leftovers:
+            kill_tree(pid)
+        if leftovers:
+            print(f"🧹 Killed {count} processes of the last run's pool")
+        if stub and pid_alive(stub[0]):
+            kill_tree(stub[0])
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("✅ No processes left behind" if ok else "❌ Soak failed")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
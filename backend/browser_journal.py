@@ -0,0 +1,82 @@
+"""
+On-disk journal of the browsers held by sessions
+
+Chrome outlives the API process that started it: a deploy or a reloader
+restart used to orphan every browser a student was typing a captcha into.
+Each session browser is written here with its remote-debugging port and pid,
+so the next process can reattach to it through debuggerAddress (see
+app.restore_sessions) or kill it when it cannot.
+
+One JSON file per process - BROWSER_JOURNAL_PATH, with the shard id added
+under router.py - keyed by debugging port.
+"""
+import json
+import logging
+import os
+import threading
+from shards import SHARD_ID
+
+log = logging.getLogger(__name__)
+
+DEFAULT_JOURNAL_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'attendx', 'browsers.json')
+
+
+def journal_path():
+    path = os.environ.get('BROWSER_JOURNAL_PATH', DEFAULT_JOURNAL_PATH)
+    if SHARD_ID is not None:
+        root, ext = os.path.splitext(path)
+        path = f"{root}-s{SHARD_ID}{ext}"
+    return path
+
+
+class BrowserJournal:
+    def __init__(self, path=None):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning(f"⚠️  Ignoring browser journal {self.path}: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.warning(f"⚠️  Could not save browser journal: {e}")
+
+    def record(self, port, **entry):
+        """Add or update the browser on debugging port `port`"""
+        if not port:
+            return
+        with self._lock:
+            current = self._entries.setdefault(str(port), {'port': port})
+            current.update(entry)
+            self._save()
+
+    def forget(self, port):
+        if not port:
+            return
+        with self._lock:
+            if self._entries.pop(str(port), None) is not None:
+                self._save()
+
+    def entries(self):
+        with self._lock:
+            return [dict(entry) for entry in self._entries.values()]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
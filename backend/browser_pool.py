@@ -0,0 +1,516 @@
+"""
+Pool of pre-warmed Chrome instances parked on the IMS login frame
+
+undetected_chromedriver and Selenium are imported on the first launch, so
+importing the pool (and app.py) stays cheap for the HTTP engine, health
+checks and cache hits.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import deque
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+from driver_cache import patched_driver_path
+from proc_stats import tree_memory_mb, cmdline, pid_alive, kill_tree
+from scraper.portal import IMS_URL
+from scraper.metrics import registry, timed
+
+log = logging.getLogger(__name__)
+
+CHROME_VERSION = 144
+
+# "visible" - the maximised window the portal has always seen
+# "lean"    - headless, small window, no extras, static assets blocked (see LEAN_BLOCKED_URLS)
+BROWSER_PROFILE = os.environ.get("BROWSER_PROFILE", "visible")
+
+# Lean profiles live here and are deleted on quit - tmpfs keeps them off the disk
+BROWSER_PROFILE_DIR = os.environ.get("BROWSER_PROFILE_DIR", "/dev/shm" if os.path.isdir("/dev/shm") else None)
+
+LEAN_ARGUMENTS = [
+    "--window-size=800,600",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--disable-default-apps",
+    "--disable-component-update",
+    "--disable-gpu",
+    "--disable-features=Translate,OptimizationHints,MediaRouter",
+    "--mute-audio",
+    "--no-first-run",
+]
+
+# Network.setBlockedURLs patterns. The captcha is served by a script URL, not
+# a static image file, so it is not matched by the image patterns.
+LEAN_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.ico", "*.webp",
+    "*.css",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+]
+
+registry.describe('attendx_browser_launches_total', 'Chrome processes started, by profile')
+registry.inc('attendx_browser_launches_total', 0, profile=BROWSER_PROFILE)
+registry.describe('attendx_pool_acquire_total', 'Browsers handed out, by source (warm pool or cold start)')
+registry.describe('attendx_browser_recycles_total',
+                  'Browsers returned after a session, by outcome (reused, retired, failed, pool_full)')
+
+# Finds the portal's logout link in whichever frame it is in
+LOGOUT_LINK_JS = """
+for (const link of document.querySelectorAll('a[href]')) {
+    if (/log\\s*out|sign\\s*out/i.test(link.innerText || '')) {
+        return link.href;
+    }
+}
+return null;
+"""
+
+
+# Every browser this process started or reattached and has not quit yet.
+# The resource monitor kills tagged Chrome trees that are not in here.
+_live_drivers = set()
+_live_lock = threading.Lock()
+
+
+def _track(driver):
+    with _live_lock:
+        _live_drivers.add(driver)
+    return driver
+
+
+def driver_pids(driver):
+    """Root pids of a driver's processes - Chrome itself and its chromedriver"""
+    pids = [getattr(driver, 'browser_pid', None)]
+    service = getattr(driver, 'service', None)
+    process = getattr(service, 'process', None)
+    pids.append(getattr(process, 'pid', None))
+    return [pid for pid in pids if pid]
+
+
+def live_driver_pids():
+    with _live_lock:
+        drivers = list(_live_drivers)
+    return {pid for driver in drivers for pid in driver_pids(driver)}
+
+
+def _driver_executable():
+    """The shared patched chromedriver, or None to let uc patch its own copy"""
+    try:
+        return patched_driver_path(CHROME_VERSION)
+    except Exception as e:
+        log.warning(f"⚠️  chromedriver cache unavailable ({e}) - uc will patch its own")
+        return None
+
+
+@timed('browser_launch')
+def launch_browser(profile=None):
+    """Start Chrome with the settings the portal tolerates, in the BROWSER_PROFILE mode"""
+    import undetected_chromedriver as uc
+
+    profile = profile or BROWSER_PROFILE
+    registry.inc('attendx_browser_launches_total', profile=profile)
+    executable = _driver_executable()
+    options = uc.ChromeOptions()
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+
+    if profile != 'lean':
+        # Non-headless mode - browser will be visible
+        options.add_argument("--window-size=1920,1080")
+        options.add_argument("--start-maximized")
+        return _track(uc.Chrome(options=options, version_main=CHROME_VERSION, driver_executable_path=executable))
+
+    for argument in LEAN_ARGUMENTS:
+        options.add_argument(argument)
+    user_data_dir = tempfile.mkdtemp(prefix='attendx-profile-', dir=BROWSER_PROFILE_DIR)
+    try:
+        driver = uc.Chrome(options=options, version_main=CHROME_VERSION, driver_executable_path=executable,
+                           headless=True, user_data_dir=user_data_dir)
+    except Exception:
+        shutil.rmtree(user_data_dir, ignore_errors=True)
+        raise
+    # uc keeps a profile dir it was given; this one is ours to delete on quit()
+    driver.keep_user_data_dir = False
+    _track(driver)
+
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': LEAN_BLOCKED_URLS})
+    except Exception:
+        quit_quietly(driver)
+        raise
+    return driver
+
+
+def debugger_port(driver):
+    """Remote-debugging port of the driver's Chrome - what reattach_browser() needs"""
+    address = (driver.capabilities.get('goog:chromeOptions') or {}).get('debuggerAddress') or ''
+    host, _, port = address.rpartition(':')
+    return int(port) if host and port.isdigit() else None
+
+
+def profile_dir(driver):
+    """The profile directory to delete with the browser, if it is a throwaway one"""
+    if getattr(driver, 'keep_user_data_dir', True):
+        return None
+    return getattr(driver, 'user_data_dir', None)
+
+
+def is_browser_process(pid, port):
+    """pid still runs the Chrome started with --remote-debugging-port=port (pids get reused)"""
+    return f"--remote-debugging-port={port}" in cmdline(pid)
+
+
+@timed('browser_reattach')
+def reattach_browser(port, pid, user_data_dir=None):
+    """
+    A new chromedriver session on a Chrome left running by an earlier
+    process, through debuggerAddress. Raises if that Chrome is gone.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    if not pid_alive(pid) or not is_browser_process(pid, port):
+        raise RuntimeError(f'Chrome {pid} on port {port} is not running')
+
+    options = webdriver.ChromeOptions()
+    options.debugger_address = f"127.0.0.1:{port}"
+    executable = _driver_executable()
+    driver = webdriver.Chrome(service=Service(executable) if executable else Service(), options=options)
+
+    # chromedriver did not start this Chrome, so its quit() leaves it running - see quit_quietly
+    driver.reattached = True
+    driver.browser_pid = pid
+    driver.user_data_dir = user_data_dir
+    driver.keep_user_data_dir = user_data_dir is None
+    return _track(driver)
+
+
+def end_browser(pid, port, user_data_dir=None):
+    """Kill a Chrome by pid (only if it is still the one on port) and delete its throwaway profile"""
+    if pid and is_browser_process(pid, port):
+        kill_tree(pid)
+    if user_data_dir:
+        shutil.rmtree(user_data_dir, ignore_errors=True)
+
+
+@timed('portal_load')
+def open_login_frame(driver, timing=None):
+    """Load the portal and leave the driver inside the login frame with #uid ready"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from scraper.timing import wait_for
+
+    wait = wait_for(driver, timing, 'page_load')
+
+    driver.get(IMS_URL)
+
+    login_link = wait.until(EC.element_to_be_clickable((By.PARTIAL_LINK_TEXT, "Student Login")))
+    login_link.click()
+
+    wait.until(EC.frame_to_be_available_and_switch_to_it(0))
+    wait.until(EC.presence_of_element_located((By.ID, "uid")))
+
+
+def start_login_browser(timing=None, profile=None):
+    """Cold start: launch Chrome and park it on the login frame"""
+    driver = launch_browser(profile)
+    try:
+        open_login_frame(driver, timing)
+    except Exception:
+        quit_quietly(driver)
+        raise
+    return driver
+
+
+def _log_out(driver):
+    """Follow the portal's logout link if a logged-in page is showing"""
+    from scraper.navigator import switch_to, MAIN_CONTENT
+
+    for frame_name in [MAIN_CONTENT, 'top', 'banner', 'contents', 'data']:
+        try:
+            switch_to(driver, frame_name)
+            href = driver.execute_script(LOGOUT_LINK_JS)
+        except Exception:
+            continue
+        if href and not href.lower().startswith('javascript:'):
+            driver.switch_to.default_content()
+            driver.get(href)
+            return True
+    driver.switch_to.default_content()
+    return False
+
+
+def reset_browser(driver, timing=None, log_out=True):
+    """
+    Make a used browser safe for the next user: log the portal out, wipe
+    cookies, storage and cache, close extra windows and park it on the
+    login frame again. log_out=False leaves the portal session alive for
+    whoever else holds its cookies (the hybrid engine's HTTP half).
+    """
+    portal = urlsplit(IMS_URL)
+
+    if log_out:
+        _log_out(driver)
+    driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+    driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+    driver.execute_cdp_cmd('Storage.clearDataForOrigin',
+                           {'origin': f'{portal.scheme}://{portal.netloc}', 'storageTypes': 'all'})
+
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+
+    open_login_frame(driver, timing)
+
+
+def browser_rss_mb(driver):
+    """RSS of the whole Chrome process tree, 0 when it cannot be read"""
+    return tree_memory_mb(getattr(driver, 'browser_pid', None))[0]
+
+
+def is_parked_on_login(driver):
+    """Health check - the browser answers and the login form is still there"""
+    from selenium.webdriver.common.by import By
+
+    try:
+        return len(driver.find_elements(By.ID, "uid")) > 0
+    except Exception:
+        return False
+
+
+def quit_quietly(driver):
+    with _live_lock:
+        _live_drivers.discard(driver)
+    try:
+        driver.quit()
+    except Exception:
+        pass
+    if getattr(driver, 'reattached', False):
+        end_browser(driver.browser_pid, debugger_port(driver), profile_dir(driver))
+
+
+class BrowserPool:
+    """
+    Keeps between min_size and max_size idle browsers ready on the login frame.
+    A background thread refills the pool, retires browsers older than max_age
+    and drops the ones that fail the health check.
+
+    Refill only launches up to min_size. Browsers whose session ended come
+    back through recycle() and are kept up to max_size, so the pool grows
+    past min_size only after a burst of sessions ends and shrinks back as
+    those browsers age out. The same thread resets them, until a browser has
+    served max_uses sessions or its process tree grows past max_rss_mb. Only
+    then is it quit. _launch_one() applies min_size and _park() max_size.
+    """
+
+    def __init__(self, factory=start_login_browser, min_size=1, max_size=3,
+                 max_age=timedelta(minutes=4), check_interval=10,
+                 reset=reset_browser, max_uses=20, max_rss_mb=0):
+        self.factory = factory
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size)
+        self.max_age = max_age
+        self.check_interval = check_interval
+        self.reset = reset
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+
+        self._idle = deque()
+        self._returned = deque()
+        # Sessions served per browser; entries vanish with the driver object
+        self._uses = weakref.WeakKeyDictionary()
+        self._launching = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the background refill thread (idempotent)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._maintain, daemon=True)
+            self._thread.start()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def acquire(self):
+        """Take a warm browser, or cold start one when the pool is empty"""
+        self.start()
+
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                driver, created_at = self._idle.popleft()
+
+            if self._is_expired(created_at) or not is_parked_on_login(driver):
+                quit_quietly(driver)
+                continue
+
+            self._wake.set()
+            self._count_use(driver)
+            registry.inc('attendx_pool_acquire_total', source='warm')
+            log.info(f"♻️  Pool hit ({self.idle_count()} idle left)")
+            return driver
+
+        self._wake.set()
+        registry.inc('attendx_pool_acquire_total', source='cold')
+        log.info("🥶 Pool empty - cold starting browser")
+        driver = self.factory()
+        self._count_use(driver)
+        return driver
+
+    def recycle(self, driver, log_out=True):
+        """Take back a browser whose session is over; it is reset and reused, or quit"""
+        with self._lock:
+            self._returned.append((driver, log_out))
+        self._wake.set()
+
+    def idle_count(self):
+        with self._lock:
+            return len(self._idle)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "idle": len(self._idle),
+                "launching": self._launching,
+                "recycling": len(self._returned),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "max_uses": self.max_uses,
+            }
+
+    def shutdown(self):
+        """Quit every idle and returned browser"""
+        with self._lock:
+            drivers = [driver for driver, _ in self._idle] + [driver for driver, _ in self._returned]
+            self._idle.clear()
+            self._returned.clear()
+        for driver in drivers:
+            quit_quietly(driver)
+
+    def _is_expired(self, created_at):
+        return datetime.now() - created_at > self.max_age
+
+    def _count_use(self, driver):
+        with self._lock:
+            self._uses[driver] = self._uses.get(driver, 0) + 1
+
+    def _retire_reason(self, driver):
+        """Why a returned browser should be quit instead of reused, or None"""
+        with self._lock:
+            uses = self._uses.get(driver, self.max_uses)
+        if uses >= self.max_uses:
+            return f"{uses} sessions served"
+        if self.max_rss_mb:
+            rss = browser_rss_mb(driver)
+            if rss > self.max_rss_mb:
+                return f"{rss:.0f} MB RSS"
+        return None
+
+    def _recycle_one(self, driver, log_out):
+        reason = self._retire_reason(driver)
+        if reason:
+            log.info(f"🪦 Retiring browser ({reason})")
+            quit_quietly(driver)
+            registry.inc('attendx_browser_recycles_total', outcome='retired')
+            return
+
+        try:
+            self.reset(driver, log_out=log_out)
+            healthy = is_parked_on_login(driver)
+        except Exception as e:
+            log.warning(f"⚠️  Browser reset failed: {e}")
+            healthy = False
+        if not healthy:
+            quit_quietly(driver)
+            registry.inc('attendx_browser_recycles_total', outcome='failed')
+            return
+
+        # Parked afresh - max_age counts from the reset
+        if not self._park(driver):
+            quit_quietly(driver)
+            registry.inc('attendx_browser_recycles_total', outcome='pool_full')
+            return
+        registry.inc('attendx_browser_recycles_total', outcome='reused')
+        log.info(f"♻️  Browser recycled ({self.idle_count()} idle)")
+
+    def _recycle_returned(self):
+        while True:
+            with self._lock:
+                if not self._returned:
+                    return
+                driver, log_out = self._returned.popleft()
+            self._recycle_one(driver, log_out)
+
+    def _park(self, driver):
+        """Add a browser to the idle pool unless it already holds max_size; False if full"""
+        with self._lock:
+            if len(self._idle) >= self.max_size:
+                return False
+            self._idle.append((driver, datetime.now()))
+            return True
+
+    def _evict_unhealthy(self):
+        """Check idle browsers one at a time, so acquire() still finds the others warm"""
+        with self._lock:
+            candidates = [driver for driver, _ in self._idle]
+
+        for driver in candidates:
+            with self._lock:
+                entry = next((item for item in self._idle if item[0] is driver), None)
+                if entry is None:
+                    # Handed out by acquire() in the meantime
+                    continue
+                self._idle.remove(entry)
+
+            if self._is_expired(entry[1]) or not is_parked_on_login(driver):
+                log.info("🧹 Retiring pooled browser")
+                quit_quietly(driver)
+                continue
+
+            with self._lock:
+                # Back in its place - the idle pool is ordered oldest first
+                position = next((index for index, (_, created_at) in enumerate(self._idle)
+                                 if created_at > entry[1]), len(self._idle))
+                self._idle.insert(position, entry)
+
+    def _launch_one(self):
+        with self._lock:
+            if len(self._idle) + self._launching >= self.min_size:
+                return False
+            self._launching += 1
+        try:
+            driver = self.factory()
+        except Exception as e:
+            log.error(f"❌ Pool launch failed: {e}")
+            return False
+        finally:
+            with self._lock:
+                self._launching -= 1
+
+        if not self._park(driver):
+            quit_quietly(driver)
+        return True
+
+    def _maintain(self):
+        while True:
+            try:
+                self._recycle_returned()
+                self._evict_unhealthy()
+                while self._launch_one():
+                    pass
+            except Exception as e:
+                log.warning(f"⚠️  Pool maintenance error: {e}")
+            self._wake.wait(self.check_interval)
+            self._wake.clear()
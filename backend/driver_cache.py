@@ -0,0 +1,104 @@
+"""
+One patched chromedriver per Chrome major version, shared by every worker
+
+uc.Chrome() on its own downloads and re-patches chromedriver on every
+launch, into a single file that concurrent launches overwrite. Here the
+binary is downloaded and patched once into
+
+    CHROMEDRIVER_CACHE_DIR/<major>/undetected_chromedriver
+
+under a file lock, moved into place atomically, and then passed to
+uc.Chrome(driver_executable_path=...), which uses a patched binary as-is.
+"""
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows - the in-process lock still applies
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+CHROMEDRIVER_CACHE_DIR = os.environ.get(
+    "CHROMEDRIVER_CACHE_DIR", os.path.join(os.path.expanduser('~'), '.cache', 'attendx', 'chromedriver'))
+
+DRIVER_NAME = 'undetected_chromedriver.exe' if os.name == 'nt' else 'undetected_chromedriver'
+
+_prepared = {}
+_lock = threading.Lock()
+
+
+class _FileLock:
+    """flock on a file next to the binary - serialises workers and processes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a')
+        if fcntl:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+def _is_patched(path):
+    try:
+        with open(path, 'rb') as f:
+            return b'undetected chromedriver' in f.read()
+    except OSError:
+        return False
+
+
+def _download_and_patch(path, version_main):
+    """Fetch chromedriver for version_main and patch it, staged next to path"""
+    from undetected_chromedriver.patcher import Patcher
+
+    staging = f"{path}.{os.getpid()}.tmp"
+    # A custom path stops the Patcher from deleting the binary when it is collected
+    patcher = Patcher(executable_path=staging, version_main=version_main)
+    patcher.zip_path = f"{staging}-zip"
+
+    try:
+        release = patcher.fetch_release_number()
+        patcher.version_main = release.version[0]
+        patcher.version_full = release
+        patcher.unzip_package(patcher.fetch_package())
+        patcher.patch_exe()
+        if not _is_patched(staging):
+            raise RuntimeError(f'Could not patch chromedriver {release.vstring}')
+        os.replace(staging, path)
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+    return release.vstring
+
+
+def patched_driver_path(version_main):
+    """Path of the patched chromedriver for a Chrome major version, preparing it on first use"""
+    with _lock:
+        if version_main in _prepared:
+            return _prepared[version_main]
+
+        directory = os.path.join(CHROMEDRIVER_CACHE_DIR, str(version_main))
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, DRIVER_NAME)
+
+        # Another worker may be downloading right now - wait for it and reuse its binary
+        with _FileLock(os.path.join(directory, '.lock')):
+            if not _is_patched(path):
+                started = time.perf_counter()
+                log.info(f"⬇️  Preparing chromedriver {version_main}...")
+                full_version = _download_and_patch(path, version_main)
+                log.info(f"✅ chromedriver {full_version} cached in {time.perf_counter() - started:.1f}s")
+
+        _prepared[version_main] = path
+        return path
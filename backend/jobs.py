@@ -0,0 +1,133 @@
+"""
+Background scrape jobs with stage progress
+"""
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+log = logging.getLogger(__name__)
+
+# Stages reported by the scrapers through their on_progress callback
+STAGES = [
+    'logged_in',
+    'activities_opened',
+    'attendance_opened',
+    'semester_selected',
+    'parsed',
+]
+
+
+class Job:
+    """One scrape run; waiters are woken on every progress/state change"""
+
+    def __init__(self, total_stages=None, id_prefix=''):
+        self.id = id_prefix + str(uuid.uuid4())
+        self.total_stages = total_stages or len(STAGES)
+        self.status = 'queued'
+        self.stage = None
+        self.stages = []
+        self.result = None
+        self.created_at = datetime.now()
+        self.finished_at = None
+        self.version = 0
+        self._changed = threading.Condition()
+
+    def _touch(self):
+        self.version += 1
+        self._changed.notify_all()
+
+    def set_running(self):
+        with self._changed:
+            self.status = 'running'
+            self._touch()
+
+    def progress(self, stage):
+        with self._changed:
+            self.stage = stage
+            self.stages.append({'stage': stage, 'at': datetime.now().isoformat()})
+            self._touch()
+
+    def finish(self, result):
+        with self._changed:
+            self.result = result
+            self.status = 'done' if result.get('success') else 'failed'
+            self.finished_at = datetime.now()
+            self._touch()
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def wait_for_change(self, seen_version, timeout):
+        """Block until version moves past seen_version (or timeout); returns the new version"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != seen_version, timeout)
+            return self.version
+
+    def snapshot(self):
+        with self._changed:
+            return {
+                'job_id': self.id,
+                'status': self.status,
+                'stage': self.stage,
+                'progress': min(len(self.stages), self.total_stages),
+                'total_stages': self.total_stages,
+                'stages': list(self.stages),
+                'result': self.result,
+            }
+
+
+class JobManager:
+    """Runs scrape functions on a bounded executor and keeps recent jobs around"""
+
+    def __init__(self, max_workers=4, retention=timedelta(minutes=5), id_prefix=''):
+        """id_prefix: start of every job id - the owning shard under router.py"""
+        self.retention = retention
+        self.id_prefix = id_prefix
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scrape')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, total_stages=None, **kwargs):
+        """
+        Queue fn(*args, on_progress=..., **kwargs); fn must return the usual
+        {'success': ...} result dict. total_stages overrides len(STAGES) for
+        runs that report some stages more than once.
+        """
+        self._purge()
+        job = Job(total_stages, self.id_prefix)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def counts(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+        for job in jobs:
+            counts[job.status] += 1
+        return counts
+
+    def _run(self, job, fn, args, kwargs):
+        job.set_running()
+        try:
+            result = fn(*args, on_progress=job.progress, **kwargs)
+        except Exception as e:
+            log.error(f"❌ Job {job.id[:8]} crashed: {e}")
+            result = {'success': False, 'error': str(e)}
+        job.finish(result)
+
+    def _purge(self):
+        cutoff = datetime.now() - self.retention
+        with self._lock:
+            stale = [job_id for job_id, job in self._jobs.items()
+                     if job.finished and job.finished_at < cutoff]
+            for job_id in stale:
+                del self._jobs[job_id]
@@ -0,0 +1,168 @@
+"""
+Process trees, their memory and CPU, read from /proc (Linux)
+
+Chrome is a tree of processes - browser, GPU, network service and one
+renderer per site - so one pid's RSS says little. RSS counts shared pages
+once per process; PSS splits them between the processes sharing them.
+"""
+import os
+import signal
+import time
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+PAGE_KB = (os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096) // 1024
+
+
+def _children():
+    """pid -> list of child pids, from /proc/<pid>/stat"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces; ppid follows the closing paren
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def processes(comm_filter=None):
+    """
+    pid -> {'ppid', 'comm', 'cpu_ticks' (user + system), 'start_ticks' (since
+    boot), 'rss_kb'} for every process, or only those whose command name
+    contains comm_filter - one read of /proc/<pid>/stat each
+    """
+    table = {}
+    if not os.path.isdir('/proc'):
+        return table
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                head, _, rest = f.read().rpartition(')')
+        except OSError:
+            continue
+        comm = head.partition('(')[2]
+        if comm_filter and comm_filter not in comm.lower():
+            continue
+        fields = rest.split()
+        try:
+            table[int(entry)] = {
+                'ppid': int(fields[1]),
+                'comm': comm,
+                'cpu_ticks': int(fields[11]) + int(fields[12]),
+                'start_ticks': int(fields[19]),
+                'rss_kb': int(fields[21]) * PAGE_KB,
+            }
+        except (IndexError, ValueError):
+            continue
+    return table
+
+
+def environ(pid):
+    """Environment a process was started with, {} when unreadable"""
+    try:
+        with open(f'/proc/{pid}/environ', 'rb') as f:
+            data = f.read()
+    except OSError:
+        return {}
+    env = {}
+    for item in data.split(b'\0'):
+        key, sep, value = item.decode('utf-8', 'replace').partition('=')
+        if sep:
+            env[key] = value
+    return env
+
+
+def uptime_seconds():
+    try:
+        with open('/proc/uptime') as f:
+            return float(f.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return 0.0
+
+
+def process_tree(pid):
+    """pid and every descendant pid"""
+    children = _children()
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children.get(current, []))
+    return tree
+
+
+def kb_field(path, field):
+    """A 'Field:  123 kB' value from a /proc file, 0 when unreadable"""
+    try:
+        with open(path) as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def tree_memory_mb(pid):
+    """(rss, pss) in MB summed over a process and all its descendants; (0, 0) off Linux"""
+    if not pid or not os.path.isdir('/proc'):
+        return 0, 0
+    rss = pss = 0
+    for member in process_tree(pid):
+        rss += kb_field(f'/proc/{member}/status', 'VmRSS')
+        pss += kb_field(f'/proc/{member}/smaps_rollup', 'Pss')
+    return rss / 1024, pss / 1024
+
+
+def available_mb():
+    return kb_field('/proc/meminfo', 'MemAvailable') / 1024
+
+
+def cmdline(pid):
+    """Arguments of a running process, [] when it is gone or unreadable"""
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            return [arg.decode('utf-8', 'replace') for arg in f.read().split(b'\0') if arg]
+    except OSError:
+        return []
+
+
+def pid_alive(pid):
+    """False once a process is gone or a zombie - it has exited, only its parent has not reaped it"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rpartition(')')[2].split()[0] != 'Z'
+    except (OSError, IndexError):
+        return True
+
+
+def kill_tree(pid, grace=3):
+    """SIGTERM a process and its descendants, SIGKILL whatever is left after grace seconds"""
+    members = process_tree(pid) if os.path.isdir('/proc') else [pid]
+    for member in members:
+        try:
+            os.kill(member, signal.SIGTERM)
+        except OSError:
+            pass
+
+    deadline = time.monotonic() + grace
+    while time.monotonic() < deadline and any(pid_alive(member) for member in members):
+        time.sleep(0.1)
+
+    for member in members:
+        try:
+            os.kill(member, signal.SIGKILL)
+        except OSError:
+            pass
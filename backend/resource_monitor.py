@@ -0,0 +1,166 @@
+"""
+Chrome process accounting and the orphan reaper
+
+Every Chrome and chromedriver this process starts inherits OWNER_ENV (set
+by tag_browsers()), so its whole process tree can be found in /proc even
+after driver.quit() failed, a launch died halfway or an earlier run of the
+API exited. Every interval the monitor:
+
+- samples RSS and CPU of each session's browser tree
+- ends sessions whose browser grew past max_session_mb
+- kills tagged trees that no live driver owns once they are older than
+  grace (younger ones may still be launching)
+
+Linux only; elsewhere the monitor reports nothing and reaps nothing.
+"""
+import logging
+import os
+import threading
+import time
+from proc_stats import processes, environ, uptime_seconds, kill_tree, CLOCK_TICKS
+from shards import SHARD_ID
+from scraper.metrics import registry
+
+log = logging.getLogger(__name__)
+
+OWNER_ENV = 'ATTENDX_BROWSER_OWNER'
+
+registry.describe('attendx_orphans_reaped_total', 'Chrome/chromedriver trees killed because nothing owned them')
+registry.describe('attendx_sessions_over_memory_total', 'Sessions ended for exceeding SESSION_MAX_RSS_MB')
+
+
+def owner_tag(port=None, shard_id=SHARD_ID):
+    """Stable across restarts of the same server (and shard), distinct between servers"""
+    tag = f"port-{port or os.environ.get('PORT', '5001')}"
+    return f"{tag}-s{shard_id}" if shard_id is not None else tag
+
+
+def tag_browsers():
+    """Mark every browser this process launches from now on"""
+    os.environ[OWNER_ENV] = owner_tag()
+
+
+class ResourceMonitor:
+
+    def __init__(self, sessions, owned_pids, interval=15, grace=120, max_session_mb=0, on_over_limit=None):
+        """
+        sessions: () -> [(session_id, driver)] for sessions holding a browser
+        owned_pids: () -> pids of every browser and chromedriver still in use
+        on_over_limit: called with (session_id, rss_mb) for a session past max_session_mb
+        """
+        self.sessions = sessions
+        self.owned_pids = owned_pids
+        self.interval = interval
+        self.grace = grace
+        self.max_session_mb = max_session_mb
+        self.on_over_limit = on_over_limit
+        self.tag = owner_tag()
+
+        self._cpu = {}
+        self._stats = {}
+        self._reaped = 0
+        self._over_limit = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start the sampling thread (idempotent)"""
+        with self._lock:
+            if self._thread is not None or not os.path.isdir('/proc'):
+                return
+            self._thread = threading.Thread(target=self._run, name='resource-monitor', daemon=True)
+            self._thread.start()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, reaped=self._reaped, over_limit=self._over_limit,
+                         max_session_mb=self.max_session_mb)
+        sampled_at = stats.pop('sampled_at', None)
+        stats['sampled_seconds_ago'] = round(time.monotonic() - sampled_at, 1) if sampled_at else None
+        return stats
+
+    def _run(self):
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                log.error(f"❌ Resource monitor: {e}")
+            time.sleep(self.interval)
+
+    def _tagged(self):
+        """Our Chrome/chromedriver processes - command names all contain 'chro'"""
+        table = processes('chro')
+        return {pid: proc for pid, proc in table.items()
+                if pid != os.getpid() and environ(pid).get(OWNER_ENV) == self.tag}
+
+    def sample(self):
+        now = time.monotonic()
+        tagged = self._tagged()
+        children = {}
+        for pid, proc in tagged.items():
+            children.setdefault(proc['ppid'], []).append(pid)
+
+        def tree(root):
+            members, stack = [], [root]
+            while stack:
+                pid = stack.pop()
+                if pid in tagged:
+                    members.append(pid)
+                stack.extend(children.get(pid, []))
+            return members
+
+        roots = [pid for pid, proc in tagged.items() if proc['ppid'] not in tagged]
+        owned = self.owned_pids()
+
+        # Per-session memory and CPU
+        sessions = {}
+        cpu = {}
+        for session_id, driver in self.sessions():
+            members = tree(getattr(driver, 'browser_pid', None))
+            rss_mb = sum(tagged[pid]['rss_kb'] for pid in members) / 1024
+            ticks = sum(tagged[pid]['cpu_ticks'] for pid in members)
+            cpu[session_id] = (ticks, now)
+            previous = self._cpu.get(session_id)
+            cpu_percent = 0.0
+            if previous and now > previous[1]:
+                cpu_percent = max(0.0, (ticks - previous[0]) / CLOCK_TICKS / (now - previous[1]) * 100)
+            sessions[session_id[:8]] = {'processes': len(members), 'rss_mb': round(rss_mb, 1),
+                                        'cpu_percent': round(cpu_percent, 1)}
+            if self.max_session_mb and rss_mb > self.max_session_mb and self.on_over_limit:
+                log.warning(f"🐘 Session {session_id[:8]}... browser uses {rss_mb:.0f} MB "
+                            f"(limit {self.max_session_mb}) - ending it")
+                if self.on_over_limit(session_id, rss_mb):
+                    registry.inc('attendx_sessions_over_memory_total')
+                    with self._lock:
+                        self._over_limit += 1
+
+        # Orphans - old enough that they are not a launch in progress
+        uptime = uptime_seconds()
+        reaped = 0
+        pending = 0
+        for root in roots:
+            if root in owned:
+                continue
+            age = uptime - tagged[root]['start_ticks'] / CLOCK_TICKS
+            if age < self.grace:
+                pending += 1
+                continue
+            log.warning(f"🧟 Killing orphaned {tagged[root]['comm']} tree {root} "
+                        f"({len(tree(root))} processes, {age:.0f}s old)")
+            kill_tree(root)
+            registry.inc('attendx_orphans_reaped_total')
+            reaped += 1
+
+        with self._lock:
+            self._cpu = cpu
+            self._reaped += reaped
+            self._stats = {
+                'chrome_processes': len(tagged),
+                'trees': len(roots),
+                'owned_trees': sum(1 for root in roots if root in owned),
+                'unowned_trees': pending,
+                'rss_mb': round(sum(proc['rss_kb'] for proc in tagged.values()) / 1024, 1),
+                'sessions': sessions,
+                'sampled_at': now,
+            }
+        return reaped
@@ -0,0 +1,141 @@
+"""
+In-process LRU cache of successful attendance results
+"""
+import hashlib
+import hmac
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+HASH_ITERATIONS = 100_000
+
+
+def hash_password(password, salt):
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, HASH_ITERATIONS)
+
+
+def roll_key(roll_no):
+    return roll_no.strip().upper()
+
+
+class WrongPassword(Exception):
+    """A cached result exists for this student but the password does not match it"""
+
+
+class PasswordFailures:
+    """
+    Wrong passwords per roll number. The cache and parked sessions check a
+    password without the portal's captcha or lockout, so after max_failures
+    within window a roll number is locked out of them until the window ends.
+    """
+
+    def __init__(self, max_failures=5, window=timedelta(minutes=15)):
+        self.max_failures = max_failures
+        self.window = window
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    def _current(self, key):
+        entry = self._failures.get(key)
+        if entry is not None and datetime.now() - entry[1] > self.window:
+            del self._failures[key]
+            entry = None
+        return entry
+
+    def retry_after(self, roll_no):
+        """Seconds until a locked roll number may try again, 0 if it is not locked"""
+        with self._lock:
+            entry = self._current(roll_key(roll_no))
+        if entry is None or entry[0] < self.max_failures:
+            return 0
+        return max(1, int((entry[1] + self.window - datetime.now()).total_seconds()))
+
+    def fail(self, roll_no):
+        """Count a wrong password; True once the roll number is locked"""
+        key = roll_key(roll_no)
+        with self._lock:
+            entry = self._current(key)
+            count, first_at = entry if entry is not None else (0, datetime.now())
+            self._failures[key] = (count + 1, first_at)
+            return count + 1 >= self.max_failures
+
+    def clear(self, roll_no):
+        with self._lock:
+            self._failures.pop(roll_key(roll_no), None)
+
+
+class AttendanceCache:
+    """
+    Results keyed on (roll_no, year, semester), bounded by max_entries with
+    least-recently-used eviction. Entries expire after ttl and are only
+    returned to a caller who presents the password that produced them.
+    """
+
+    def __init__(self, max_entries=500, ttl=timedelta(minutes=15)):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(roll_no, year, semester):
+        return (roll_key(roll_no), int(year), int(semester))
+
+    def put(self, roll_no, year, semester, password, result):
+        """Store a successful scrape result"""
+        if not result.get('success'):
+            return
+        salt = os.urandom(16)
+        entry = {
+            'data': result['data'],
+            'total_subjects': result.get('total_subjects', len(result['data'])),
+            'salt': salt,
+            'password_hash': hash_password(password, salt),
+            'stored_at': datetime.now(),
+        }
+        key = self.key(roll_no, year, semester)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, roll_no, year, semester, password):
+        """Fresh entry for this student, None if there is none; WrongPassword if the password does not match"""
+        key = self.key(roll_no, year, semester)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and datetime.now() - entry['stored_at'] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        # Hash outside the lock - it is the slow part
+        if entry is None:
+            self.misses += 1
+            return None
+        if not hmac.compare_digest(entry['password_hash'], hash_password(password, entry['salt'])):
+            self.misses += 1
+            raise WrongPassword()
+
+        self.hits += 1
+        return {
+            'data': entry['data'],
+            'total_subjects': entry['total_subjects'],
+            'age_seconds': int((datetime.now() - entry['stored_at']).total_seconds()),
+        }
+
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        return {
+            'entries': size,
+            'max_entries': self.max_entries,
+            'ttl_seconds': int(self.ttl.total_seconds()),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
@@ -0,0 +1,383 @@
+"""
+Multi-process deployment: a front router and one app.py worker per shard
+
+Each live browser belongs to the process that launched it, so a single
+app.py has to coordinate every browser on its own. Here SHARDS workers each
+own their browsers, sessions and jobs, and serve on a Unix socket. The
+router listens on PORT and:
+
+- sends POST /api/captcha to the shard its roll number hashes to, so
+  duplicate requests meet in one worker's coalescing; on 503 it tries the
+  other workers, most free browser slots first
+- sends every request that carries a session or job id to the shard named
+  in the id (see shards.py)
+- asks every worker for /api/attendance/cached, since results are cached by
+  the worker that fetched them
+- merges /api/health (per-shard capacity) and /api/metrics (shard label)
+
+A worker that exits is started again; only its own sessions are lost.
+
+    SHARDS=4 SCRAPER_ENGINE=http python router.py
+
+BROWSER_POOL_MIN/MAX and MAX_LIVE_BROWSERS apply to each worker.
+"""
+import http.client
+import json
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from flask import Flask, request, jsonify, Response, stream_with_context
+from flask_cors import CORS
+from log_config import configure_logging
+from shards import UnixHTTPConnection, shard_of, socket_path
+
+configure_logging()
+log = logging.getLogger(__name__)
+
+PORT = int(os.environ.get("PORT", 5001))
+SHARDS = int(os.environ.get("SHARDS", 2))
+# Worker sockets; a fresh temporary directory by default
+SHARD_SOCKET_DIR = os.environ.get("SHARD_SOCKET_DIR")
+
+# Long enough for a multi-semester scrape
+FORWARD_TIMEOUT = 600
+# How often the router refreshes its view of free slots between placements
+CAPACITY_INTERVAL = 2
+STARTUP_TIMEOUT = 60
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+HOP_BY_HOP = frozenset(['connection', 'keep-alive', 'proxy-connection', 'te', 'trailer',
+                        'transfer-encoding', 'upgrade', 'content-length', 'host'])
+
+app = Flask(__name__)
+CORS(app)
+
+
+class Worker:
+    """One app.py process serving a shard on its Unix socket"""
+
+    def __init__(self, shard_id, socket_dir):
+        self.shard_id = shard_id
+        self.socket = socket_path(socket_dir, shard_id)
+        self.process = None
+        self.restarts = 0
+        # Free browser slots as last seen; placements count down between polls
+        self.free = 0
+        self.up = False
+
+    def start(self):
+        env = dict(os.environ,
+                   SHARD_ID=str(self.shard_id),
+                   SHARD_SOCKET=self.socket,
+                   FLASK_DEBUG='0')
+        self.process = subprocess.Popen([sys.executable, 'app.py'], cwd=BACKEND_DIR, env=env)
+        log.info(f"🧩 Shard {self.shard_id} started (pid {self.process.pid})")
+
+    def stop(self):
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+    def request(self, method, path, body=None, headers=None, timeout=FORWARD_TIMEOUT):
+        """(connection, response) - the caller closes the connection"""
+        conn = UnixHTTPConnection(self.socket, timeout=timeout)
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            return conn, conn.getresponse()
+        except Exception:
+            conn.close()
+            raise
+
+    def health(self, timeout=5):
+        """The worker's /api/health, or None if it does not answer"""
+        try:
+            conn, response = self.request('GET', '/api/health', timeout=timeout)
+        except (OSError, http.client.HTTPException):
+            self.up = False
+            return None
+        try:
+            data = json.loads(response.read())
+        except ValueError:
+            data = None
+        finally:
+            conn.close()
+        self.up = data is not None
+        if data:
+            self.free = data.get('capacity', {}).get('free', 0)
+        return data
+
+
+workers = []
+_placement_lock = threading.Lock()
+_next_shard = 0
+_stopping = threading.Event()
+
+
+def placement_order():
+    """Workers by free slots, most first; ties rotate so logins spread out"""
+    global _next_shard
+    with _placement_lock:
+        start = _next_shard
+        _next_shard = (_next_shard + 1) % len(workers)
+        rotated = workers[start:] + workers[:start]
+        return sorted((worker for worker in rotated if worker.up), key=lambda worker: -worker.free)
+
+
+def home_worker(roll_no):
+    """The worker a roll number's captcha requests go to first - the same one every time"""
+    key = (roll_no or '').strip().upper().encode('utf-8')
+    return workers[zlib.crc32(key) % len(workers)]
+
+
+def worker_for(identifier):
+    """Owner of a session/job id; ids without a shard go to shard 0, which answers with the usual error"""
+    shard = shard_of(identifier)
+    if shard is None or shard >= len(workers):
+        return workers[0]
+    return workers[shard]
+
+
+def busy_response():
+    """503 the frontend already retries on - as the workers send it at capacity"""
+    response = jsonify({"success": False, "error": "Server busy, please retry shortly", "retry_after": 1})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+
+def forward(worker):
+    """Pass the current request to a worker and its response back"""
+    path = request.path
+    if request.query_string:
+        path += '?' + request.query_string.decode('latin-1')
+    headers = {key: value for key, value in request.headers.items() if key.lower() not in HOP_BY_HOP}
+    headers['X-Forwarded-For'] = request.remote_addr or ''
+
+    try:
+        conn, upstream = worker.request(request.method, path, body=request.get_data(), headers=headers)
+    except (OSError, http.client.HTTPException) as e:
+        log.warning(f"⚠️  Shard {worker.shard_id} unavailable: {e}")
+        worker.up = False
+        return busy_response()
+
+    response_headers = [(key, value) for key, value in upstream.getheaders() if key.lower() not in HOP_BY_HOP]
+
+    if upstream.getheader('Content-Type', '').startswith('text/event-stream'):
+        def stream():
+            try:
+                while True:
+                    chunk = upstream.read1(65536)
+                    if not chunk:
+                        return
+                    yield chunk
+            finally:
+                conn.close()
+        return Response(stream_with_context(stream()), status=upstream.status, headers=response_headers)
+
+    try:
+        content = upstream.read()
+    finally:
+        conn.close()
+    return Response(content, status=upstream.status, headers=response_headers)
+
+
+def session_from_body():
+    data = request.get_json(silent=True) or {}
+    return data.get('session_id')
+
+
+@app.route('/api/captcha', methods=['POST'])
+def place_captcha():
+    """New login: the roll number's home worker, then the one with the most free browser slots on 503"""
+    data = request.get_json(silent=True) or {}
+    roll_no = data.get('roll_no') if isinstance(data.get('roll_no'), str) else None
+    order = placement_order()
+    if roll_no:
+        home = home_worker(roll_no)
+        if home.up:
+            order = [home] + [worker for worker in order if worker is not home]
+
+    response = None
+    for worker in order:
+        response = forward(worker)
+        if response.status_code != 503:
+            if response.status_code == 200:
+                with _placement_lock:
+                    worker.free = max(0, worker.free - 1)
+            return response
+        with _placement_lock:
+            worker.free = 0
+    return response if response is not None else busy_response()
+
+
+@app.route('/api/captcha/<session_id>.png', methods=['GET'])
+@app.route('/api/captcha/<session_id>/refresh', methods=['POST'])
+def session_in_path(session_id):
+    return forward(worker_for(session_id))
+
+
+@app.route('/api/attendance', methods=['POST'])
+@app.route('/api/attendance/refresh', methods=['POST'])
+@app.route('/api/attendance/jobs', methods=['POST'])
+@app.route('/api/logout', methods=['POST'])
+def session_in_body():
+    return forward(worker_for(session_from_body()))
+
+
+@app.route('/api/attendance/jobs/<job_id>', methods=['GET'])
+@app.route('/api/attendance/jobs/<job_id>/events', methods=['GET'])
+def job_in_path(job_id):
+    return forward(worker_for(job_id))
+
+
+@app.route('/api/attendance/cached', methods=['POST'])
+def cached_anywhere():
+    """Whichever worker fetched the result has it cached; a lockout on any of them wins over a miss"""
+    response = None
+    locked = None
+    for worker in workers:
+        response = forward(worker)
+        if response.status_code == 200:
+            return response
+        if response.status_code == 429:
+            locked = response
+    return locked or response
+
+
+@app.route('/api/health', methods=['GET'])
+def health():
+    shards = []
+    for worker in workers:
+        data = worker.health()
+        entry = {"shard": worker.shard_id, "status": "ok" if data else "down",
+                 "pid": worker.process.pid if worker.process else None, "restarts": worker.restarts}
+        if data:
+            entry.update({key: data[key] for key in ('capacity', 'sessions', 'pool', 'jobs') if key in data})
+        shards.append(entry)
+
+    up = [entry for entry in shards if entry['status'] == 'ok']
+    return jsonify({
+        "status": "ok" if len(up) == len(shards) else "degraded" if up else "down",
+        "capacity": {
+            "max_browsers": sum(entry['capacity']['max_browsers'] for entry in up),
+            "browsers": sum(entry['capacity']['browsers'] for entry in up),
+            "free": sum(entry['capacity']['free'] for entry in up),
+        },
+        "shards": shards
+    }), 200 if up else 503
+
+
+def label_metrics(text, shard_id, families):
+    """Add shard="<id>" to every sample and file it under its metric family"""
+    family = None
+    for line in text.splitlines():
+        if not line:
+            continue
+        if line.startswith('#'):
+            parts = line.split(' ', 3)
+            if len(parts) >= 3:
+                family = families.setdefault(parts[2], {'header': [], 'samples': []})
+                if line not in family['header']:
+                    family['header'].append(line)
+            continue
+        if family is None:
+            continue
+        series, value = line.rsplit(' ', 1)
+        if '{' in series:
+            series = series.replace('{', f'{{shard="{shard_id}",', 1)
+        else:
+            series += f'{{shard="{shard_id}"}}'
+        family['samples'].append(f'{series} {value}')
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    families = {}
+    for worker in workers:
+        try:
+            conn, response = worker.request('GET', '/api/metrics', timeout=5)
+        except (OSError, http.client.HTTPException):
+            continue
+        try:
+            label_metrics(response.read().decode('utf-8'), worker.shard_id, families)
+        finally:
+            conn.close()
+    lines = []
+    for family in families.values():
+        lines.extend(family['header'])
+        lines.extend(family['samples'])
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/', methods=['GET'])
+def home():
+    return forward(workers[0])
+
+
+def supervise():
+    """Restart workers that exit and keep the free-slot counts fresh"""
+    while not _stopping.wait(CAPACITY_INTERVAL):
+        for worker in workers:
+            if worker.process.poll() is not None and not _stopping.is_set():
+                log.error(f"❌ Shard {worker.shard_id} exited with code {worker.process.returncode} - restarting")
+                worker.up = False
+                worker.restarts += 1
+                worker.start()
+            worker.health(timeout=2)
+
+
+def wait_until_up(deadline):
+    pending = list(workers)
+    while pending:
+        if time.monotonic() > deadline:
+            sys.exit(f"❌ Shards {[w.shard_id for w in pending]} did not start within {STARTUP_TIMEOUT}s")
+        for worker in list(pending):
+            if worker.process.poll() is not None:
+                sys.exit(f"❌ Shard {worker.shard_id} exited with code {worker.process.returncode}")
+            if worker.health(timeout=2):
+                pending.remove(worker)
+        time.sleep(0.1)
+
+
+def main():
+    socket_dir = SHARD_SOCKET_DIR or tempfile.mkdtemp(prefix='attendx-shards-')
+    os.makedirs(socket_dir, exist_ok=True)
+    workers.extend(Worker(shard_id, socket_dir) for shard_id in range(SHARDS))
+
+    # SIGTERM unwinds through the finally below so the workers go too
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for worker in workers:
+            worker.start()
+        wait_until_up(time.monotonic() + STARTUP_TIMEOUT)
+        threading.Thread(target=supervise, name='shard-supervisor', daemon=True).start()
+
+        print("\n" + "="*60)
+        print(f"🧩 ATTENDANCE API - {SHARDS} SHARDS")
+        print("="*60)
+        print(f"🌐 http://localhost:{PORT}")
+        print(f"🔌 Workers on {socket_dir}")
+        print("="*60 + "\n")
+        app.run(debug=False, port=PORT, host='0.0.0.0', threaded=True)
+    finally:
+        _stopping.set()
+        for worker in workers:
+            worker.stop()
+        if not SHARD_SOCKET_DIR:
+            shutil.rmtree(socket_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+"""
+Single-pass attendance table parser
+
+Streams the page through html.parser's tokenizer once, collecting the cell
+text of every table row and the "SUBCODE-Subject Name" lines of colspan cells
+as it goes. No tree is built. Output is identical to the BeautifulSoup based
+extract_attendance_table_bs4 in utils.py, which is kept as the reference.
+"""
+import re
+from html.parser import HTMLParser
+
+# 2-5 uppercase letters + 3-4 digits, e.g. ITITC601, DNCS0603
+SUBJECT_CODE_RE = re.compile(r'^[A-Z]{2,5}\d{3,4}$')
+SUBJECT_NAME_RE = re.compile(r'^([A-Z]{2,5}\d{3,4})\s*-\s*(.+)$')
+
+# Tags BeautifulSoup's html.parser builder treats as empty (never pushed)
+VOID_TAGS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link',
+    'menuitem', 'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound',
+    'command', 'frame', 'image', 'isindex', 'nextid', 'spacer',
+])
+RAW_TEXT_TAGS = frozenset(['script', 'style'])
+
+
+def _escape_minimal(text):
+    # decode_contents() re-escapes text this way; the bs4 parser matched names on it
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+class _TableTokenizer(HTMLParser):
+    """
+    Tracks the open element stack the way bs4 does (an end tag closes
+    everything up to the nearest matching open tag, unclosed cells nest), so
+    nested tables and sloppy markup give the same rows as find_all().
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        # Each table: {'rows': [[cell_parts, ...], ...], 'name_cells': [lines, ...]}
+        self.tables = []
+
+        self._stack = []
+        self._open_tables = []
+        self._open_rows = []
+        self._open_cells = []
+        self._open_name_cells = []
+        self._raw_text_depth = 0
+        self._pending = []
+
+    def _flush(self):
+        """Handle one text run - bs4 also merges data between two markup events"""
+        if not self._pending:
+            return
+        data = ''.join(self._pending)
+        self._pending = []
+
+        if self._open_cells and not self._raw_text_depth:
+            stripped = data.strip()
+            if stripped:
+                for parts in self._open_cells:
+                    parts.append(stripped)
+
+        if self._open_name_cells:
+            text = data if self._raw_text_depth else _escape_minimal(data)
+            for lines in self._open_name_cells:
+                lines[-1].append(text)
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in VOID_TAGS:
+            if tag == 'br':
+                for lines in self._open_name_cells:
+                    lines.append([])
+            return
+
+        pushed = []
+        if tag == 'table':
+            table = {'rows': [], 'name_cells': []}
+            self.tables.append(table)
+            self._open_tables.append(table)
+            pushed.append(self._open_tables)
+        elif tag == 'tr':
+            row = []
+            for table in self._open_tables:
+                table['rows'].append(row)
+            self._open_rows.append(row)
+            pushed.append(self._open_rows)
+        elif tag == 'td' or tag == 'th':
+            parts = []
+            for row in self._open_rows:
+                row.append(parts)
+            self._open_cells.append(parts)
+            pushed.append(self._open_cells)
+
+            if tag == 'td' and self._open_tables and any(name == 'colspan' for name, _ in attrs):
+                lines = [[]]
+                for table in self._open_tables:
+                    table['name_cells'].append(lines)
+                self._open_name_cells.append(lines)
+                pushed.append(self._open_name_cells)
+        elif tag in RAW_TEXT_TAGS:
+            self._raw_text_depth += 1
+
+        self._stack.append((tag, pushed))
+
+    def handle_endtag(self, tag):
+        self._flush()
+        for depth in range(len(self._stack) - 1, -1, -1):
+            if self._stack[depth][0] == tag:
+                break
+        else:
+            return
+
+        while len(self._stack) > depth:
+            open_tag, pushed = self._stack.pop()
+            for open_list in pushed:
+                open_list.pop()
+            if open_tag in RAW_TEXT_TAGS:
+                self._raw_text_depth -= 1
+
+    def handle_data(self, data):
+        self._pending.append(data)
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def parse_tables(html):
+    """
+    Tokenize once and return (tables, subject_names_map) where tables is a
+    list of tables, each a list of rows, each a list of cell texts.
+    """
+    tokenizer = _TableTokenizer()
+    tokenizer.feed(html)
+    tokenizer.close()
+
+    subject_names_map = {}
+    tables = []
+    for table in tokenizer.tables:
+        for lines in table['name_cells']:
+            for line in lines:
+                match = SUBJECT_NAME_RE.match(''.join(line).strip())
+                if match:
+                    subject_names_map[match.group(1).strip()] = match.group(2).strip()
+        tables.append([[''.join(parts) for parts in row] for row in table['rows']])
+
+    return tables, subject_names_map
+
+
+def _percentage(present, total_classes):
+    return round((present / total_classes * 100), 2) if total_classes > 0 else 0
+
+
+def attendance_from_tables(tables, subject_names_map):
+    """Turn rows of cell text into the attendance records the API returns"""
+    attendance_data = []
+
+    for rows in tables:
+        # Header row: first row with a subject code; codes skip the "Days" column
+        subject_codes = []
+        header_row_idx = -1
+        for row_idx, cell_texts in enumerate(rows):
+            if any(SUBJECT_CODE_RE.match(text) for text in cell_texts):
+                header_row_idx = row_idx
+                subject_codes = [text for text in cell_texts[1:] if SUBJECT_CODE_RE.match(text)]
+                break
+
+        if not subject_codes:
+            continue
+
+        overall_class_row = None
+        overall_absent_row = None
+        overall_present_row = None
+        overall_percent_row = None
+
+        for cell_texts in rows[header_row_idx + 1:]:
+            if not cell_texts:
+                continue
+
+            first_cell = cell_texts[0].lower()
+            if 'overall' in first_cell and 'class' in first_cell:
+                overall_class_row = cell_texts
+            elif 'overall' in first_cell and 'absent' in first_cell:
+                overall_absent_row = cell_texts
+            elif 'overall' in first_cell and 'present' in first_cell:
+                overall_present_row = cell_texts
+            elif 'overall' in first_cell and '%' in first_cell:
+                overall_percent_row = cell_texts
+
+        if not (overall_class_row and overall_absent_row and overall_present_row):
+            continue
+
+        for idx, subject_code in enumerate(subject_codes):
+            cell_idx = idx + 1
+            try:
+                total_classes = int(overall_class_row[cell_idx]) if cell_idx < len(overall_class_row) else 0
+                absent = int(overall_absent_row[cell_idx]) if cell_idx < len(overall_absent_row) else 0
+                present = int(overall_present_row[cell_idx]) if cell_idx < len(overall_present_row) else 0
+            except ValueError:
+                continue
+
+            # Prefer the portal's own percentage when it parses
+            if overall_percent_row and cell_idx < len(overall_percent_row):
+                try:
+                    percentage = float(overall_percent_row[cell_idx].replace('%', '').strip())
+                except ValueError:
+                    percentage = _percentage(present, total_classes)
+            else:
+                percentage = _percentage(present, total_classes)
+
+            attendance_data.append({
+                'Subject Code': subject_code,
+                'Subject Name': subject_names_map.get(subject_code, subject_code),
+                'Classes Present': present,
+                'Classes Absent': absent,
+                'Total Classes': total_classes,
+                'Attendance %': percentage
+            })
+
+    return attendance_data
+
+
+def extract_attendance_table_fast(html):
+    return attendance_from_tables(*parse_tables(html))
@@ -0,0 +1,103 @@
+"""
+Captcha image bytes straight from the portal
+
+The <img id="captchaimg"> is re-fetched inside the page, so the request
+carries the browser's own cookies and comes back in the server's original
+encoding. An element screenshot is only the fallback.
+"""
+import base64
+import logging
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from .timing import get_timing, wait_for, image_loaded
+from .metrics import timed
+
+log = logging.getLogger(__name__)
+
+FETCH_IMAGE_JS = """
+const img = arguments[0];
+const done = arguments[arguments.length - 1];
+// force-cache: reuse the bytes the <img> already downloaded when possible
+fetch(img.currentSrc || img.src, {credentials: 'include', cache: 'force-cache'})
+    .then(r => r.ok ? r.blob() : Promise.reject(new Error('HTTP ' + r.status)))
+    .then(blob => {
+        const reader = new FileReader();
+        reader.onload = () => done({type: blob.type, data: reader.result.split(',')[1]});
+        reader.onerror = () => done({error: 'could not read image'});
+        reader.readAsDataURL(blob);
+    })
+    .catch(e => done({error: String(e)}));
+"""
+
+RELOAD_IMAGE_JS = """
+const img = arguments[0];
+const src = img.getAttribute('src').replace(/[?&]_=\\d+$/, '');
+img.src = src + (src.indexOf('?') === -1 ? '?' : '&') + '_=' + Date.now();
+return img.src;
+"""
+
+
+def image_bytes(driver, img, timing=None):
+    """(bytes, content_type) of a loaded <img>, via in-page fetch or a screenshot"""
+    driver.set_script_timeout(get_timing(timing)['step'])
+    try:
+        fetched = driver.execute_async_script(FETCH_IMAGE_JS, img)
+    except Exception as e:
+        fetched = {'error': str(e)}
+
+    if fetched and fetched.get('data'):
+        return base64.b64decode(fetched['data']), fetched.get('type') or 'image/png'
+
+    log.warning("⚠️  Captcha fetch failed (%s) - using a screenshot",
+                fetched.get('error') if fetched else 'no result')
+    return img.screenshot_as_png, 'image/png'
+
+
+@timed('captcha_image')
+def read_captcha(driver, timing=None):
+    """Wait for the captcha in the current (login) frame and return (bytes, content_type)"""
+    wait = wait_for(driver, timing, 'page_load')
+    img = wait.until(EC.presence_of_element_located((By.ID, "captchaimg")))
+    wait.until(image_loaded(img))
+    return image_bytes(driver, img, timing)
+
+
+@timed('captcha_reload')
+def reload_captcha(driver, timing=None):
+    """Ask the portal for a new captcha on the same login page; returns (bytes, content_type)"""
+    driver.switch_to.default_content()
+    wait_for(driver, timing, 'page_load').until(EC.frame_to_be_available_and_switch_to_it(0))
+
+    img = driver.find_element(By.ID, "captchaimg")
+    new_src = driver.execute_script(RELOAD_IMAGE_JS, img)
+    wait_for(driver, timing).until(lambda d: d.execute_script(
+        "return arguments[0].src === arguments[1] && arguments[0].complete"
+        " && arguments[0].naturalWidth > 0;", img, new_src))
+    return image_bytes(driver, img, timing)
+
+
+def retry_captcha(driver, roll_no, timing=None):
+    """
+    After the portal refused a captcha: fresh captcha on the same login
+    frame, with the roll number typed again if the reload cleared it.
+    Returns (bytes, content_type).
+    """
+    captcha = reload_captcha(driver, timing)
+    uid_input = driver.find_element(By.ID, "uid")
+    if not uid_input.get_attribute("value"):
+        uid_input.send_keys(roll_no)
+    return captcha
+
+
+def resume_captcha(driver, roll_no, timing=None):
+    """
+    The captcha already on screen in a reattached browser, as
+    (bytes, content_type) - None when the browser has left the login form
+    of roll_no
+    """
+    driver.switch_to.default_content()
+    wait_for(driver, timing).until(EC.frame_to_be_available_and_switch_to_it(0))
+    uid_inputs = driver.find_elements(By.ID, "uid")
+    if not uid_inputs or uid_inputs[0].get_attribute("value") != roll_no:
+        return None
+    return read_captcha(driver, timing)
@@ -0,0 +1,159 @@
+"""
+Batched DOM inspection - one execute_script call per frame
+
+Instead of a WebDriver round trip per .text / get_attribute / Select.options,
+the scripts below collect every candidate element together with the
+attributes we match on. Matching happens in Python and only the final click
+or selection goes back to the browser.
+"""
+
+COLLECT_ELEMENTS_JS = """
+const selectors = arguments[0];
+const withHtml = arguments[1];
+const out = [];
+for (const selector of selectors) {
+    for (const el of document.querySelectorAll(selector)) {
+        const info = {
+            element: el,
+            tag: el.tagName.toLowerCase(),
+            id: el.id || '',
+            name: el.getAttribute('name') || '',
+            type: (el.getAttribute('type') || '').toLowerCase(),
+            value: el.value === undefined ? (el.getAttribute('value') || '') : String(el.value),
+            cls: el.getAttribute('class') || '',
+            text: (el.innerText || '').trim()
+        };
+        if (withHtml) {
+            info.html = el.innerHTML;
+        }
+        if (info.tag === 'select') {
+            info.options = Array.from(el.options).map(o => ({value: o.value, text: (o.text || '').trim()}));
+        }
+        out.push(info);
+    }
+}
+return out;
+"""
+
+COLLECT_TREE_JS = """
+const near = [];
+const all = [];
+const labels = document.evaluate(
+    "//*[contains(text(), 'Attendance') or contains(text(), 'ATTENDANCE')]",
+    document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+for (let i = 0; i < labels.snapshotLength; i++) {
+    const parent = labels.snapshotItem(i).parentElement;
+    if (!parent) continue;
+    for (const hitarea of parent.getElementsByClassName('hitarea')) {
+        near.push({element: hitarea, cls: hitarea.getAttribute('class') || ''});
+    }
+}
+for (const hitarea of document.getElementsByClassName('hitarea')) {
+    const parent = hitarea.parentElement;
+    all.push({
+        element: hitarea,
+        cls: hitarea.getAttribute('class') || '',
+        parent_text: parent ? (parent.innerText || '').trim() : ''
+    });
+}
+return {near: near, all: all};
+"""
+
+SELECT_INDEX_JS = """
+const select = arguments[0];
+select.selectedIndex = arguments[1];
+select.dispatchEvent(new Event('input', {bubbles: true}));
+select.dispatchEvent(new Event('change', {bubbles: true}));
+return select.options[select.selectedIndex].text;
+"""
+
+# The attendance table reduced in the page: for each table with a subject-code
+# row, that row and the Overall rows as cell text (stripped text nodes joined,
+# as the parsers do), plus the SUBCODE-Name lines of colspan cells. The
+# day-by-day rows never leave the browser.
+COLLECT_ATTENDANCE_JS = """
+const CODE = /^[A-Z]{2,5}\\d{3,4}$/;
+const NAME = /^([A-Z]{2,5}\\d{3,4})\\s*-\\s*(.+)$/;
+const cellText = (cell) => {
+    const parts = [];
+    const walker = document.createTreeWalker(cell, NodeFilter.SHOW_TEXT);
+    for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+        const parent = node.parentElement;
+        if (parent && parent.closest('script, style')) continue;
+        const text = node.nodeValue.trim();
+        if (text) parts.push(text);
+    }
+    return parts.join('');
+};
+const tables = [];
+const names = {};
+for (const table of document.querySelectorAll('table')) {
+    for (const cell of table.querySelectorAll('td[colspan]')) {
+        for (const line of cell.innerHTML.split(/<br\\s*\\/?>/i)) {
+            const match = line.replace(/<[^>]+>/g, '').trim().match(NAME);
+            if (match) names[match[1].trim()] = match[2].trim();
+        }
+    }
+    const rows = [];
+    let header = false;
+    for (const row of table.querySelectorAll('tr')) {
+        const cells = Array.from(row.querySelectorAll('td, th'), cellText);
+        if (cells.some(text => CODE.test(text))) {
+            header = true;
+            rows.push(cells);
+        } else if (header && cells.length && cells[0].toLowerCase().includes('overall')) {
+            rows.push(cells);
+        }
+    }
+    if (rows.length > 1) tables.push(rows);
+}
+return {tables: tables, names: names};
+"""
+
+# The top-level page URL and the current URL of every named frame
+FRAME_URLS_JS = """
+const urls = {'': location.href};
+for (const frame of document.querySelectorAll('frame[name], iframe[name]')) {
+    try {
+        urls[frame.name] = frame.contentWindow.location.href;
+    } catch (e) {
+        urls[frame.name] = frame.src;
+    }
+}
+return urls;
+"""
+
+
+def query_elements(driver, *selectors, with_html=False):
+    """
+    Every element matching the CSS selectors (in selector order) in the
+    current frame, as dicts: element, tag, id, name, type, value, cls, text,
+    plus html when with_html and options for <select>s
+    """
+    return driver.execute_script(COLLECT_ELEMENTS_JS, list(selectors), with_html) or []
+
+
+def query_tree_hitareas(driver):
+    """
+    Tree hitareas in the current frame: 'near' holds the ones under the parent
+    of an "Attendance" label, 'all' every hitarea with its parent's text
+    """
+    return driver.execute_script(COLLECT_TREE_JS) or {'near': [], 'all': []}
+
+
+def select_by_index(driver, select_element, index):
+    """Select an option and fire change handlers; returns the option text"""
+    return driver.execute_script(SELECT_INDEX_JS, select_element, index)
+
+
+def query_attendance_table(driver):
+    """
+    Compact attendance table of the current frame - {'tables': [rows of
+    cell text], 'names': {code: name}} - for extract_attendance_table_enhanced
+    """
+    return driver.execute_script(COLLECT_ATTENDANCE_JS) or {'tables': [], 'names': {}}
+
+
+def frame_urls(driver):
+    """{frame name: URL} for the current document, '' being the document itself"""
+    return driver.execute_script(FRAME_URLS_JS) or {}
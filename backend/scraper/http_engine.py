@@ -0,0 +1,496 @@
+"""
+Browser-free engine - logs in and fetches attendance with plain HTTP requests
+"""
+import logging
+import re
+import requests
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from .portal import (IMS_URL, USER_AGENT, ALL_SEMESTERS, LOGIN_ERRORS, classify_login_error, login_message,
+                     text_lines)
+from .utils import extract_attendance_table_enhanced, combine_semester_results
+from .metrics import span, timed, found_outcome
+
+log = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = 15
+
+YEAR_KEYWORDS = ['year', 'yr', 'academic', 'session']
+SEMESTER_KEYWORDS = ['sem', 'semester', 'term', 'part']
+SKIP_BUTTON_WORDS = ['pdf', 'download', 'export', 'print', 'mpdfx']
+
+STUDENT_PAGE_RE = re.compile(r'''["']([^"']*student\.htm[^"']*)["']''', re.IGNORECASE)
+
+
+def new_http_session():
+    """requests.Session with browser-like headers"""
+    http = requests.Session()
+    http.headers.update({
+        'User-Agent': USER_AGENT,
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.9',
+    })
+    return http
+
+
+def session_from_cookies(cookies, user_agent=None):
+    """
+    requests.Session carrying a browser's cookies (driver.get_cookies()
+    format), so a login done in Chrome can continue over HTTP
+    """
+    http = new_http_session()
+    if user_agent:
+        http.headers['User-Agent'] = user_agent
+    for cookie in cookies:
+        http.cookies.set(cookie['name'], cookie['value'],
+                         domain=cookie.get('domain', ''), path=cookie.get('path', '/'))
+    return http
+
+
+def _get(http, url, referer=None):
+    headers = {'Referer': referer} if referer else {}
+    response = http.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response
+
+
+def _soup(response):
+    return BeautifulSoup(response.text, 'html.parser')
+
+
+def _find_link(soup, base_url, keywords, exact_match=False):
+    """Absolute href of the first <a> whose text matches one of the keywords"""
+    for link in soup.find_all('a', href=True):
+        href = link['href'].strip()
+        if not href or href.lower().startswith('javascript:') or href == '#':
+            continue
+
+        link_text = link.get_text(strip=True)
+        if exact_match:
+            matched = link_text in keywords
+        else:
+            matched = any(keyword.lower() in link_text.lower() for keyword in keywords)
+
+        if matched:
+            return urljoin(base_url, href)
+    return None
+
+
+def _frame_urls(soup, base_url):
+    """Absolute src of every frame/iframe, keyed by frame name (or index)"""
+    frames = {}
+    for idx, frame in enumerate(soup.find_all(['frame', 'iframe'])):
+        src = frame.get('src')
+        if src:
+            frames[frame.get('name') or str(idx)] = urljoin(base_url, src)
+    return frames
+
+
+def _form_fields(form):
+    """Default name/value pairs of a form, the way a browser would submit them"""
+    fields = {}
+    for field in form.find_all('input'):
+        name = field.get('name')
+        field_type = (field.get('type') or 'text').lower()
+        if not name or field_type in ('submit', 'button', 'image', 'reset'):
+            continue
+        if field_type in ('checkbox', 'radio') and not field.has_attr('checked'):
+            continue
+        fields[name] = field.get('value', '')
+
+    for select in form.find_all('select'):
+        name = select.get('name')
+        if not name:
+            continue
+        options = select.find_all('option')
+        chosen = select.find('option', selected=True) or (options[0] if options else None)
+        if chosen is not None:
+            fields[name] = chosen.get('value', chosen.get_text(strip=True))
+
+    for textarea in form.find_all('textarea'):
+        if textarea.get('name'):
+            fields[textarea['name']] = textarea.get_text()
+    return fields
+
+
+def _submit(http, form, page_url, fields):
+    action = urljoin(page_url, form.get('action') or page_url)
+    headers = {'Referer': page_url}
+    if (form.get('method') or 'get').lower() == 'post':
+        response = http.post(action, data=fields, headers=headers, timeout=REQUEST_TIMEOUT)
+    else:
+        response = http.get(action, params=fields, headers=headers, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response
+
+
+def resolve_option_index(options, idx):
+    """Skip a blank / "Select..." placeholder, same as the Selenium engine"""
+    if options:
+        first = options[0]
+        if first.get('value', '') == '' or 'select' in first.get_text(strip=True).lower():
+            return idx + 1
+    return idx
+
+
+@timed('http_captcha')
+def start_http_login(roll_no, portal_url=IMS_URL):
+    """
+    Open the login form over HTTP and download its captcha.
+    Returns the login state needed by scrape_attendance_with_session plus
+    the captcha image bytes and content type.
+    """
+    http = new_http_session()
+
+    landing = _get(http, portal_url)
+    login_url = _find_link(_soup(landing), landing.url, ['Student Login'])
+    if not login_url:
+        raise RuntimeError('Could not find Student Login link')
+
+    login_page = _get(http, login_url, referer=landing.url)
+    login_soup = _soup(login_page)
+    form_url = login_page.url
+
+    # The form normally sits inside the first frame of the login page
+    if not login_soup.find('input', id='uid'):
+        frames = list(_frame_urls(login_soup, login_page.url).values())
+        if not frames:
+            raise RuntimeError('Login frame not found')
+        frame_page = _get(http, frames[0], referer=login_page.url)
+        login_soup = _soup(frame_page)
+        form_url = frame_page.url
+
+    login_state = {'http': http, 'roll_no': roll_no}
+    error = _read_login_form(login_state, login_soup, form_url)
+    if error:
+        raise RuntimeError(error)
+    captcha_bytes, content_type = reload_http_captcha(login_state)
+    return login_state, captcha_bytes, content_type
+
+
+def _read_login_form(login_state, soup, form_url):
+    """Store the login form, its captcha URL and its text on login_state; returns an error or None"""
+    uid_input = soup.find('input', id='uid')
+    form = uid_input.find_parent('form') if uid_input else None
+    if form is None:
+        return 'Login form not found'
+
+    captcha_img = soup.find('img', id='captchaimg')
+    if captcha_img is None or not captcha_img.get('src'):
+        return 'CAPTCHA image not found'
+
+    login_button = form.find('input', attrs={'name': 'login'})
+    login_state.update({
+        'form': form,
+        'form_url': form_url,
+        'captcha_url': urljoin(form_url, captcha_img['src']),
+        'login_value': login_button.get('value', '') if login_button else '',
+    })
+    # Baseline for spotting the portal's error message after a failed login -
+    # taken from the untouched form, not from a page already showing an error
+    login_state.setdefault('form_lines', text_lines(soup.get_text('\n')))
+    return None
+
+
+def reload_http_captcha(login_state):
+    """Download a (new) captcha for the login form; returns (bytes, content_type)"""
+    response = _get(login_state['http'], login_state['captcha_url'], referer=login_state['form_url'])
+    return response.content, response.headers.get('Content-Type', 'image/png').split(';')[0]
+
+
+def _open_student_page(http, response):
+    """Follow the post-login redirect (HTTP or scripted) to student.htm"""
+    if 'student.htm' in response.url:
+        return response
+
+    match = STUDENT_PAGE_RE.search(response.text)
+    if match:
+        return _get(http, urljoin(response.url, match.group(1)), referer=response.url)
+    return None
+
+
+@timed('http_open_attendance', outcome=found_outcome)
+def _open_my_attendance(http, student_page):
+    """Walk the frameset: My Activities -> My Attendance"""
+    pages = [student_page]
+    for frame_url in _frame_urls(_soup(student_page), student_page.url).values():
+        try:
+            pages.append(_get(http, frame_url, referer=student_page.url))
+        except requests.RequestException:
+            continue
+
+    # My Attendance may already be linked from one of the frames
+    for page in pages:
+        url = _find_link(_soup(page), page.url, ['My Attendance'], exact_match=True)
+        if url:
+            return _get(http, url, referer=page.url)
+
+    for page in pages:
+        activities_url = _find_link(_soup(page), page.url, ['activit'])
+        if not activities_url:
+            continue
+        activities = _get(http, activities_url, referer=page.url)
+        url = _find_link(_soup(activities), activities.url, ['My Attendance'], exact_match=True)
+        if url:
+            return _get(http, url, referer=activities.url)
+    return None
+
+
+def _pick_selects(selects):
+    """(year_select, semester_select) by name, falling back to position"""
+    def select_name(select):
+        return (select.get('name') or select.get('id') or '').lower()
+
+    year = next((s for s in selects if any(k in select_name(s) for k in YEAR_KEYWORDS)), None)
+    if year is None and selects:
+        year = selects[0]
+
+    semester = next((s for s in selects if s is not year and
+                     any(k in select_name(s) for k in SEMESTER_KEYWORDS)), None)
+    if semester is None:
+        semester = next((s for s in selects if s is not year), None)
+    return year, semester
+
+
+def _submit_button(form):
+    """The real submit button, skipping PDF/download ones"""
+    for button in form.find_all(['input', 'button']):
+        button_type = (button.get('type') or '').lower()
+        button_value = (button.get('value') or '').lower()
+        button_name = (button.get('name') or '').lower()
+
+        if any(skip in button_value or skip in button_name for skip in SKIP_BUTTON_WORDS):
+            continue
+        if button_type == 'submit' and 'submit' in button_name:
+            return button
+    return None
+
+
+@timed('http_select_semester', outcome=found_outcome)
+def _submit_semester_form(http, attendance_page, year_idx, semester_idx):
+    soup = _soup(attendance_page)
+
+    for form in soup.find_all('form'):
+        selects = form.find_all('select')
+        if not selects:
+            continue
+
+        year_select, semester_select = _pick_selects(selects)
+        if year_select is None or semester_select is None:
+            continue
+
+        fields = _form_fields(form)
+        for select, idx in ((year_select, year_idx), (semester_select, semester_idx)):
+            options = select.find_all('option')
+            actual_idx = resolve_option_index(options, idx)
+            if actual_idx >= len(options):
+                return None
+            option = options[actual_idx]
+            fields[select.get('name')] = option.get('value', option.get_text(strip=True))
+
+        button = _submit_button(form)
+        if button is not None:
+            fields[button.get('name')] = button.get('value', '')
+
+        return _submit(http, form, attendance_page.url, fields)
+    return None
+
+
+def _count_semesters(attendance_page):
+    """How many real options the semester dropdown offers (0 if not found)"""
+    for form in _soup(attendance_page).find_all('form'):
+        _, semester_select = _pick_selects(form.find_all('select'))
+        if semester_select is not None:
+            options = semester_select.find_all('option')
+            return len(options) - resolve_option_index(options, 0)
+    return 0
+
+
+def _login_refused(login_state, response):
+    """
+    Failure result for a login that did not reach student.htm, typed from
+    the portal's message. A login form in the response replaces the stored
+    one, so a retry posts its fresh hidden fields.
+    """
+    soup = _soup(response)
+    message = login_message(login_state.get('form_lines', []), soup.get_text('\n'))
+    error_type = classify_login_error(message)
+    if soup.find('input', id='uid'):
+        _read_login_form(login_state, soup, response.url)
+
+    if not error_type:
+        return {'success': False, 'error': 'Login failed - wrong page'}
+    log.warning(f"❌ Portal refused login ({error_type}): {message}")
+    return {'success': False, 'error': LOGIN_ERRORS[error_type], 'error_type': error_type}
+
+
+def _login_and_open_attendance(login_state, password, captcha, report):
+    """Submit the login form and open My Attendance; returns (attendance_page, failure result)"""
+    http = login_state['http']
+
+    log.info("🔐 Logging in over HTTP...")
+    fields = _form_fields(login_state['form'])
+    fields.update({
+        'uid': login_state['roll_no'],
+        'pwd': password,
+        'cap': captcha,
+        'login': login_state['login_value'],
+    })
+    with span('http_login') as login_span:
+        response = _submit(http, login_state['form'], login_state['form_url'], fields)
+        student_page = _open_student_page(http, response)
+        if student_page is None:
+            login_span.outcome = 'failed'
+            return None, _login_refused(login_state, response)
+    log.info("✅ LOGIN SUCCESSFUL!")
+    report('logged_in')
+
+    attendance_page, error = _open_attendance(login_state, student_page, report)
+    return attendance_page, ({'success': False, 'error': error} if error else None)
+
+
+def _open_attendance(login_state, student_page, report):
+    """My Attendance from the logged-in student page; returns (attendance_page, error)"""
+    attendance_page = _open_my_attendance(login_state['http'], student_page)
+    if attendance_page is None:
+        return None, 'Could not find My Attendance'
+    log.info("✅ Opened My Attendance")
+    # Lets a later refresh go straight back to the form on the same cookies
+    login_state['attendance_url'] = attendance_page.url
+    # My Activities is not a separate request when the frames link straight to it
+    report('activities_opened')
+    report('attendance_opened')
+    return attendance_page, None
+
+
+def _fetch_semester(http, attendance_page, year_idx, semester_idx, report):
+    """Submit the semester form from attendance_page and parse the result"""
+    result_page = _submit_semester_form(http, attendance_page, year_idx, semester_idx)
+    if result_page is None:
+        return {'success': False, 'error': 'Could not select year/semester'}
+    report('semester_selected')
+
+    all_attendance = extract_attendance_table_enhanced(result_page.text, debug=False)
+    if not all_attendance:
+        return {'success': False, 'error': 'No attendance data found'}
+
+    log.info(f"🎉 Success! {len(all_attendance)} subjects")
+    report('parsed')
+
+    return {
+        'success': True,
+        'data': all_attendance,
+        'total_subjects': len(all_attendance)
+    }
+
+
+def scrape_attendance_with_session(login_state, password, captcha, year_idx=0, semester_idx=0,
+                                   on_progress=None):
+    """
+    HTTP counterpart of scrape_attendance_with_driver - same return contract
+    and the same on_progress stages
+    """
+    report = on_progress or (lambda stage: None)
+    try:
+        attendance_page, failure = _login_and_open_attendance(login_state, password, captcha, report)
+        if failure:
+            return failure
+
+        return _fetch_semester(login_state['http'], attendance_page, year_idx, semester_idx, report)
+
+    except Exception as e:
+        log.error(f"❌ Error: {e}")
+        return {'success': False, 'error': f'Error: {str(e)}'}
+
+
+def _fetch_semesters(http, attendance_page, semesters, year_idx, report):
+    """Submit the semester form once per pair, or for every semester with ALL_SEMESTERS"""
+    if semesters == ALL_SEMESTERS:
+        count = _count_semesters(attendance_page)
+        log.info(f"📚 {count} semesters available for year index {year_idx}")
+        semesters = [(year_idx, semester_idx) for semester_idx in range(count)]
+        if not semesters:
+            return {'success': False, 'error': 'No semesters available'}
+
+    results = []
+    for year, semester in semesters:
+        try:
+            result = _fetch_semester(http, attendance_page, year, semester, report)
+        except Exception as e:
+            log.error(f"❌ Error: {e}")
+            result = {'success': False, 'error': f'Error: {str(e)}'}
+        results.append({'year': year, 'semester': semester, **result})
+
+    return combine_semester_results(results)
+
+
+def scrape_semesters_with_session(login_state, password, captcha, semesters, year_idx=0,
+                                  on_progress=None):
+    """
+    HTTP counterpart of scrape_semesters_with_driver - one login, then the
+    semester form is submitted once per (year_idx, semester_idx) pair
+    """
+    report = on_progress or (lambda stage: None)
+    try:
+        attendance_page, failure = _login_and_open_attendance(login_state, password, captcha, report)
+        if failure:
+            return failure
+
+        return _fetch_semesters(login_state['http'], attendance_page, semesters, year_idx, report)
+
+    except Exception as e:
+        log.error(f"❌ Error: {e}")
+        return {'success': False, 'error': f'Error: {str(e)}'}
+
+
+def continue_attendance_with_session(login_state, student_url, year_idx=0, semester_idx=0,
+                                    semesters=None, on_progress=None):
+    """
+    Pick up after a login done in the browser (hybrid engine): open My
+    Attendance over HTTP on the copied cookies and read one semester, or
+    the semesters list like scrape_semesters_with_session
+    """
+    report = on_progress or (lambda stage: None)
+    try:
+        http = login_state['http']
+        student_page = _get(http, student_url)
+
+        attendance_page, error = _open_attendance(login_state, student_page, report)
+        if error:
+            return {'success': False, 'error': error}
+
+        if semesters is not None:
+            return _fetch_semesters(http, attendance_page, semesters, year_idx, report)
+        return _fetch_semester(http, attendance_page, year_idx, semester_idx, report)
+
+    except Exception as e:
+        log.error(f"❌ Error: {e}")
+        return {'success': False, 'error': f'Error: {str(e)}'}
+
+
+def refresh_attendance_with_session(login_state, year_idx=0, semester_idx=0, semesters=None):
+    """
+    Read attendance again on cookies that are still logged in - reloads the
+    My Attendance form and submits it, no captcha or login form
+    """
+    report = lambda stage: None
+    try:
+        http = login_state['http']
+        attendance_url = login_state.get('attendance_url')
+        if not attendance_url:
+            return {'success': False, 'error': 'Not logged in', 'login_required': True}
+
+        log.info("♻️  Reusing logged-in HTTP session...")
+        attendance_page = _get(http, attendance_url)
+        # Logged out portals bounce back to the login form
+        soup = _soup(attendance_page)
+        if soup.find('input', id='uid') or not soup.find('select'):
+            return {'success': False, 'error': 'Portal session expired', 'login_required': True}
+
+        if semesters is not None:
+            return _fetch_semesters(http, attendance_page, semesters, year_idx, report)
+        return _fetch_semester(http, attendance_page, year_idx, semester_idx, report)
+
+    except Exception as e:
+        log.error(f"❌ Error: {e}")
+        return {'success': False, 'error': f'Error: {str(e)}'}
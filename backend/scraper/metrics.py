@@ -0,0 +1,181 @@
+"""
+In-process latency histograms and counters, exported as Prometheus text
+
+    with span('login') as s:
+        ...
+        s.outcome = 'wrong_page'     # default 'ok', or 'error' on an exception
+
+    @timed('parse_table', outcome=found_outcome)
+    def extract(...): ...
+
+Every span feeds attendx_span_seconds{span, outcome}. Gauges are read from
+callbacks at scrape time, so live numbers (sessions, pool) are never stale.
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds - from a quick DOM query up to a slow exam-season login
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+SPAN_METRIC = 'attendx_span_seconds'
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    pairs = ','.join('{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                     for key, value in labels)
+    return '{' + pairs + '}'
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.total += 1
+        self.sum += value
+        for idx, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[idx] += 1
+                break
+
+
+class Registry:
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = []
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def gauge(self, name, help_text, read, kind='gauge'):
+        """
+        read() returns a number, or a list of (labels dict, number) for a
+        labelled gauge; it is called on every render. kind='counter' for
+        totals kept elsewhere (e.g. cache hits).
+        """
+        self.describe(name, help_text)
+        with self._lock:
+            self._gauges.append((name, read, kind))
+
+    def render(self):
+        """Everything in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = {key: (list(h.counts), h.total, h.sum) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+            gauges = list(self._gauges)
+
+        lines = []
+
+        def header(name, kind):
+            if name in self._help:
+                lines.append(f'# HELP {name} {self._help[name]}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        seen = set()
+        for (name, labels), (counts, total, value_sum) in sorted(histograms.items()):
+            if name not in seen:
+                header(name, 'histogram')
+                seen.add(name)
+            cumulative = 0
+            for bound, count in zip(BUCKETS, counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{_label_text(labels + (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_bucket{_label_text(labels + (("le", "+Inf"),))} {total}')
+            lines.append(f'{name}_sum{_label_text(labels)} {value_sum:.6f}')
+            lines.append(f'{name}_count{_label_text(labels)} {total}')
+
+        for (name, labels), value in sorted(counters.items()):
+            if name not in seen:
+                header(name, 'counter')
+                seen.add(name)
+            lines.append(f'{name}{_label_text(labels)} {value}')
+
+        for name, read, kind in gauges:
+            try:
+                value = read()
+            except Exception:
+                continue
+            header(name, kind)
+            if isinstance(value, list):
+                for labels, number in value:
+                    lines.append(f'{name}{_label_text(tuple(sorted(labels.items())))} {number}')
+            else:
+                lines.append(f'{name} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+registry.describe(SPAN_METRIC, 'Duration of named scrape/request stages')
+
+
+class _Span:
+    def __init__(self, name):
+        self.name = name
+        self.outcome = 'ok'
+
+
+@contextmanager
+def span(name):
+    """Time a block into attendx_span_seconds{span=name, outcome=...}"""
+    current = _Span(name)
+    started = time.perf_counter()
+    try:
+        yield current
+    except Exception:
+        current.outcome = 'error'
+        raise
+    finally:
+        registry.observe(SPAN_METRIC, time.perf_counter() - started, span=name, outcome=current.outcome)
+
+
+def timed(name, outcome=None):
+    """
+    Decorator form of span(). outcome(return_value) may return a label
+    (e.g. 'failed') to use instead of 'ok'.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name) as current:
+                result = fn(*args, **kwargs)
+                label = outcome(result) if outcome else None
+                if label:
+                    current.outcome = label
+                return result
+        return wrapper
+    return decorate
+
+
+# --- outcome helpers for the repo's return conventions ---
+
+def error_outcome(error):
+    """Helpers that return an error message or None"""
+    return 'failed' if error else None
+
+
+def found_outcome(found):
+    """Booleans, lists and optional values - empty means nothing was found"""
+    return None if found else 'not_found'
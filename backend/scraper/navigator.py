@@ -0,0 +1,154 @@
+"""
+Frame-location memory shared by the navigation helpers
+
+The portal always puts the same things in the same frames, but the helpers
+used to probe frames blindly in a fixed order. FrameMemory remembers which
+frame held each target last time, so the next scan starts there and only
+falls back to the other frames when the learned one misses. The map is kept
+on disk so it survives restarts.
+
+It also records the URL a target's frame loaded (the My Attendance form), so
+later sessions can load it straight into that frame instead of clicking
+their way there. Only the path and the names of its query parameters are
+kept, in memory: the values are one student's session tokens. rebuild_url()
+fills every parameter in from the new session's own URLs, or gives up.
+"""
+import json
+import logging
+import os
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+log = logging.getLogger(__name__)
+
+# Navigation targets
+MY_ACTIVITIES = 'my_activities'
+ATTENDANCE_TREE = 'attendance_tree'
+MY_ATTENDANCE = 'my_attendance'
+SEMESTER_FORM = 'semester_form'
+ATTENDANCE_TABLE = 'attendance_table'
+
+# Pseudo-frame for the top-level document
+MAIN_CONTENT = None
+
+DEFAULT_MEMORY_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'attendx', 'frame_memory.json')
+
+
+class FrameMemory:
+    def __init__(self, path=None):
+        self.path = path
+        self._frames = {}
+        # target -> {'frame': frame name, 'url': URL the frame loaded, query values blanked}
+        # - never saved
+        self._urls = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning("⚠️  Ignoring frame memory %s: %s", self.path, e)
+            return
+        # Older files hold the frame map alone, or recorded URLs too - rewritten without them
+        if 'frames' in saved:
+            self._frames = saved['frames']
+            if 'urls' in saved:
+                self._save()
+        else:
+            self._frames = saved
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'frames': self._frames}, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            log.warning("⚠️  Could not save frame memory: %s", e)
+
+    def order(self, target, frame_names):
+        """frame_names with the learned frame for target moved to the front"""
+        with self._lock:
+            if target not in self._frames:
+                return list(frame_names)
+            learned = self._frames[target]
+        if learned not in frame_names:
+            return list(frame_names)
+        return [learned] + [name for name in frame_names if name != learned]
+
+    def learn(self, target, frame_name):
+        with self._lock:
+            if target in self._frames and self._frames[target] == frame_name:
+                return
+            self._frames[target] = frame_name
+            self._save()
+        log.info("🧭 Learned: %s -> %s", target, frame_name or 'main content')
+
+    def url(self, target):
+        """(frame name, URL with blank query values) recorded for target, or None"""
+        with self._lock:
+            entry = self._urls.get(target)
+        return (entry['frame'], entry['url']) if entry else None
+
+    def learn_url(self, target, frame_name, url):
+        entry = {'frame': frame_name, 'url': blank_query(url)}
+        with self._lock:
+            if self._urls.get(target) == entry:
+                return
+            known = target in self._urls
+            self._urls[target] = entry
+        if not known:
+            log.info("🧭 Learned: %s -> %s in '%s'", target, entry['url'], frame_name)
+
+    def forget_url(self, target):
+        with self._lock:
+            if self._urls.pop(target, None) is None:
+                return
+        log.info("🧭 Forgot the URL of %s", target)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._frames)
+
+
+def blank_query(url):
+    """url with every query value emptied - the parameter names are all that is kept"""
+    parts = urlsplit(url)
+    query = [(name, '') for name, _ in parse_qsl(parts.query, keep_blank_values=True)]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def rebuild_url(recorded, current_urls):
+    """
+    recorded with every query parameter set to its value in current_urls
+    (the session's page and frame URLs) - the portal passes its session
+    tokens along that way. None if any parameter is missing from them
+    """
+    current = {}
+    for url in current_urls:
+        for name, value in parse_qsl(urlsplit(url or '').query, keep_blank_values=True):
+            current.setdefault(name, value)
+
+    parts = urlsplit(recorded)
+    names = [name for name, _ in parse_qsl(parts.query, keep_blank_values=True)]
+    if any(name not in current for name in names):
+        return None
+    query = [(name, current[name]) for name in names]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def switch_to(driver, frame_name):
+    """Switch to a frame by name, or to the top-level document for MAIN_CONTENT"""
+    driver.switch_to.default_content()
+    if frame_name is not MAIN_CONTENT:
+        driver.switch_to.frame(frame_name)
+
+
+frame_memory = FrameMemory(os.environ.get('FRAME_MEMORY_PATH', DEFAULT_MEMORY_PATH))
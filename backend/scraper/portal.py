@@ -0,0 +1,64 @@
+"""
+Constants describing the IMS NSIT portal
+"""
+import os
+import re
+
+# Overridable so benchmarks can point the scraper at benchmarks/mock_portal.py
+IMS_URL = os.environ.get("IMS_URL", "https://www.imsnsit.org/imsnsit/")
+
+# A normal desktop Chrome, so plain HTTP requests look like the browser flow
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/144.0.0.0 Safari/537.36")
+
+# Roll numbers as the portal prints them (2023UIT3082)
+ROLL_NO_RE = re.compile(r'\b\d{4}[A-Z]{2,4}\d{3,4}\b', re.IGNORECASE)
+
+# Passed instead of a list of (year, semester) pairs to read every semester option
+ALL_SEMESTERS = 'all'
+
+# Login failures, returned as result['error_type'] next to the message
+BAD_CAPTCHA = 'bad_captcha'
+BAD_PASSWORD = 'bad_password'
+ACCOUNT_LOCKED = 'locked'
+
+LOGIN_ERRORS = {
+    BAD_CAPTCHA: 'Wrong CAPTCHA - enter the new one',
+    BAD_PASSWORD: 'Wrong roll number or password',
+    ACCOUNT_LOCKED: 'Account locked by the portal - try again later',
+}
+
+# Checked in this order - "locked after too many wrong passwords" is a lock
+LOGIN_ERROR_KEYWORDS = [
+    (ACCOUNT_LOCKED, ['locked', 'blocked', 'too many', 'suspended', 'disabled']),
+    (BAD_CAPTCHA, ['captcha', 'security code', 'verification code', 'image code']),
+    (BAD_PASSWORD, ['password', 'invalid user', 'invalid login', 'invalid credential', 'incorrect',
+                    'not registered', 'does not exist']),
+]
+
+
+def login_message(before_lines, text):
+    """Text lines that appeared on the login page after submitting it"""
+    before = set(before_lines)
+    return ' '.join(line.strip() for line in text.splitlines()
+                    if line.strip() and line.strip() not in before)
+
+
+def classify_login_error(message):
+    """error_type for a portal error message or alert text, None if it is not recognised"""
+    message = (message or '').lower()
+    for error_type, keywords in LOGIN_ERROR_KEYWORDS:
+        if any(keyword in message for keyword in keywords):
+            return error_type
+    return None
+
+
+def text_lines(text):
+    """Stripped, non-empty lines - the baseline login_message compares against"""
+    return [line.strip() for line in (text or '').splitlines() if line.strip()]
+
+
+def foreign_roll_numbers(text, roll_no):
+    """Roll numbers in text other than roll_no - a page showing one belongs to another student"""
+    own = roll_no.strip().upper()
+    return {match.upper() for match in ROLL_NO_RE.findall(text or '')} - {own}
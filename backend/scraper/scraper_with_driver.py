@@ -0,0 +1,569 @@
+"""
+Final working scraper - combines all successful fixes
+"""
+import logging
+import weakref
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from .utils import (find_and_expand_tree_node, find_and_click_link, extract_attendance_table_enhanced,
+                    combine_semester_results)
+from .portal import ALL_SEMESTERS, LOGIN_ERRORS, classify_login_error, foreign_roll_numbers, text_lines
+from .dom import query_elements, query_attendance_table, select_by_index, frame_urls
+from .navigator import (frame_memory, rebuild_url, switch_to, MY_ACTIVITIES, MY_ATTENDANCE, SEMESTER_FORM,
+                        ATTENDANCE_TABLE)
+from .timing import (get_timing, wait_for, field_has_value, frame_with_element, selects_populated,
+                     attendance_table_present, login_outcome, BODY_TEXT_JS, MARK_SUBMITTED_JS)
+from .metrics import timed, error_outcome, found_outcome
+
+log = logging.getLogger(__name__)
+
+ACTIVITIES_FRAMES = ['top', 'contents', 'data', 'banner']
+FORM_FRAMES = ['data', 'contents', 'bottom', 'top']
+
+# Text of each browser's untouched login frame. On a retry the frame still
+# shows the last error, which must not count as part of the form.
+_login_baselines = weakref.WeakKeyDictionary()
+
+
+def _has_placeholder(options):
+    return bool(options) and (options[0]['value'] == "" or "select" in options[0]['text'].lower())
+
+
+def _select_option(driver, select, idx, label):
+    """Pick option idx of a collected <select>, skipping a blank placeholder"""
+    options = select['options']
+
+    # IMPORTANT: Check if first option is blank/placeholder
+    actual_idx = idx
+    if _has_placeholder(options):
+        actual_idx = idx + 1
+        log.info(f"  📌 First {label.lower()} option is blank, using index {actual_idx} instead of {idx}")
+
+    if actual_idx >= len(options):
+        log.warning(f"⚠️  {label} index {actual_idx} out of range (max: {len(options)-1})")
+        return False
+
+    text = select_by_index(driver, select['element'], actual_idx)
+    log.info(f"✅ {label} selected (index {actual_idx}): {text}")
+    return True
+
+
+def _login_failed(error, error_type=None):
+    failure = {'success': False, 'error': error}
+    if error_type:
+        failure['error_type'] = error_type
+    return failure
+
+
+@timed('login', outcome=error_outcome)
+def _login(driver, password, captcha, timing):
+    """
+    Steps 1-5: fill the login frame and wait for student.htm. Returns None,
+    or a failure result - with error_type when the portal said why
+    """
+    wait = wait_for(driver, timing)
+
+    # STEP 1: Ensure in login frame
+    try:
+        log.info("🔄 Switching to login frame...")
+        driver.switch_to.default_content()
+        wait.until(EC.frame_to_be_available_and_switch_to_it(0))
+        log.info("✅ In login frame")
+
+        uid_field = driver.find_element(By.ID, "uid")
+        log.info(f"✅ UID: {uid_field.get_attribute('value')[:3]}***")
+
+    except Exception as e:
+        return _login_failed(f'Frame error: {str(e)}')
+
+    # STEP 2: Fill password
+    try:
+        log.info("📝 Filling password...")
+        pwd_input = wait.until(EC.presence_of_element_located((By.ID, "pwd")))
+        pwd_input.clear()
+        pwd_input.send_keys(password)
+        wait.until(field_has_value(pwd_input, password))
+        log.info(f"✅ Password entered ({len(password)} chars)")
+
+    except Exception as e:
+        return _login_failed(f'Password error: {str(e)}')
+
+    # STEP 3: Fill CAPTCHA
+    try:
+        log.info(f"🔤 Filling CAPTCHA: {captcha}")
+        captcha_input = driver.find_element(By.ID, "cap")
+        captcha_input.clear()
+        captcha_input.send_keys(captcha)
+        wait.until(field_has_value(captcha_input, captcha))
+        log.info("✅ CAPTCHA entered")
+
+    except Exception as e:
+        return _login_failed(f'CAPTCHA error: {str(e)}')
+
+    # STEP 4: Submit form
+    try:
+        log.info("🚀 Submitting form...")
+        baseline = _login_baselines.get(driver)
+        if baseline is None:
+            baseline = _login_baselines[driver] = text_lines(driver.execute_script(BODY_TEXT_JS))
+        driver.execute_script(MARK_SUBMITTED_JS)
+        submit_btn = driver.find_element(By.NAME, "login")
+        submit_btn.click()
+        log.info("✅ Submitted, waiting...")
+
+    except Exception as e:
+        return _login_failed(f'Submit error: {str(e)}')
+
+    # STEP 5: Verify login - student.htm or the portal's error, whichever comes first
+    log.info("🔍 Verifying login...")
+    driver.switch_to.default_content()
+
+    try:
+        outcome, detail = wait_for(driver, timing, 'login').until(login_outcome("student.htm", baseline))
+    except TimeoutException:
+        log.info(f"📍 URL: {driver.current_url}")
+        return _login_failed('Login failed - wrong page')
+
+    if outcome == 'error':
+        error_type = classify_login_error(detail)
+        log.warning(f"❌ Portal refused login ({error_type}): {detail}")
+        return _login_failed(LOGIN_ERRORS.get(error_type, f'Login failed: {detail}'), error_type)
+
+    log.info(f"📍 URL: {detail}")
+    log.info("✅ LOGIN SUCCESSFUL!")
+    return None
+
+
+def login_with_driver(driver, password, captcha, timing=None):
+    """
+    Steps 1-5 only - log in and stop on student.htm. Used by the hybrid
+    engine, which continues over HTTP. Returns None or a failure result.
+    """
+    log.info("🔐 Continuing login (hybrid)...")
+    try:
+        return _login(driver, password, captcha, get_timing(timing))
+    except Exception as e:
+        log.error(f"❌ Error: {e}")
+        return _login_failed(f'Error: {str(e)}')
+
+
+@timed('open_by_url', outcome=found_outcome)
+def _open_by_url(driver, timing, roll_no=None):
+    """
+    Load the recorded My Attendance URL straight into its frame. True once
+    the semester form is up and shows no roll number but roll_no; otherwise
+    the caller clicks its way there. Only tried when every query parameter
+    can be filled in from this session's own URLs
+    """
+    recorded = frame_memory.url(MY_ATTENDANCE)
+    if not recorded or not roll_no:
+        return False
+    frame_name, url = recorded
+
+    try:
+        driver.switch_to.default_content()
+        url = rebuild_url(url, frame_urls(driver).values())
+        if url is None:
+            log.info("🔗 This session's URLs lack a parameter of the My Attendance link - using the menus")
+            return False
+        driver.switch_to.frame(frame_name)
+        page = driver.find_element(By.TAG_NAME, "html")
+        log.info(f"🔗 Loading My Attendance directly in '{frame_name}'...")
+        driver.execute_script("location.replace(arguments[0]);", url)
+        wait = wait_for(driver, timing)
+        wait.until(EC.staleness_of(page))
+        wait.until(selects_populated([frame_name]))
+
+        switch_to(driver, frame_name)
+        others = foreign_roll_numbers(driver.execute_script("return document.body ? document.body.innerText : '';"),
+                                      roll_no)
+        if others:
+            log.warning("⚠️  Direct My Attendance link opened another student's form - using the menus")
+            frame_memory.forget_url(MY_ATTENDANCE)
+            return False
+        return True
+    except (TimeoutException, WebDriverException) as e:
+        log.warning(f"⚠️  Direct My Attendance link failed ({type(e).__name__}) - using the menus")
+        frame_memory.forget_url(MY_ATTENDANCE)
+        return False
+    finally:
+        driver.switch_to.default_content()
+
+
+def _remember_attendance_url(driver, frame_name):
+    """Record the URL the semester form was loaded from, for _open_by_url"""
+    try:
+        driver.switch_to.default_content()
+        url = frame_urls(driver).get(frame_name)
+    except WebDriverException:
+        return
+    if url:
+        frame_memory.learn_url(MY_ATTENDANCE, frame_name, url)
+
+
+@timed('open_my_attendance', outcome=error_outcome)
+def _open_my_attendance(driver, timing, report, roll_no=None):
+    """Steps 6-7: My Activities -> Attendance tree -> My Attendance; returns an error or None"""
+    if _open_by_url(driver, timing, roll_no):
+        report('activities_opened')
+        report('attendance_opened')
+        return None
+
+    wait = wait_for(driver, timing)
+
+    # STEP 6: Navigate to My Activities
+    log.info("📚 Navigating to My Activities...")
+
+    # Wait for the frameset to render the My Activities link
+    activities_xpath = ("//a[contains(translate(., 'ACTIVT', 'activt'), 'activit')]")
+    try:
+        frame_name = wait.until(frame_with_element(
+            frame_memory.order(MY_ACTIVITIES, ACTIVITIES_FRAMES), By.XPATH, activities_xpath))
+        link = driver.find_element(By.XPATH, activities_xpath)
+        log.info(f"✅ Found My Activities in '{frame_name}'")
+        link.click()
+        frame_memory.learn(MY_ACTIVITIES, frame_name)
+    except TimeoutException:
+        return 'Could not find My Activities'
+    report('activities_opened')
+
+    driver.switch_to.default_content()
+
+    # STEP 7: Navigate to Attendance
+    log.info("📖 Looking for Attendance...")
+    find_and_expand_tree_node(driver, ['Attendance'], timing=timing)
+
+    if not find_and_click_link(driver, ['My Attendance'], exact_match=True, timing=timing,
+                               target=MY_ATTENDANCE):
+        return 'Could not find My Attendance'
+
+    log.info("✅ Clicked My Attendance")
+    report('attendance_opened')
+    return None
+
+
+def _semester_form_frames(driver, timing):
+    """
+    (frames to search for the form, ready) - ready is False when the
+    dropdowns never populated, in which case every frame is still tried
+    """
+    # Year/semester dropdowns are the signal that the form has loaded
+    form_frames = frame_memory.order(SEMESTER_FORM, FORM_FRAMES)
+    try:
+        ready_frame = wait_for(driver, timing).until(selects_populated(form_frames))
+    except TimeoutException:
+        return form_frames, False
+    # Start with the frame that actually rendered the form
+    return [ready_frame] + [name for name in form_frames if name != ready_frame], True
+
+
+def _semester_select(selects):
+    """The semester dropdown - the first one not taken as the year"""
+    year = next((select for select in selects
+                 if any(k in (select['name'] or select['id']).lower()
+                        for k in ['year', 'yr', 'academic', 'session'])), None)
+    if year is None and selects:
+        year = selects[0]
+    return next((select for select in selects if select is not year), None)
+
+
+def _count_semesters(driver, form_frames):
+    """How many real options the semester dropdown offers (0 if not found)"""
+    for frame_name in form_frames:
+        try:
+            driver.switch_to.default_content()
+            driver.switch_to.frame(frame_name)
+            select = _semester_select(query_elements(driver, "select"))
+            if select is not None:
+                options = select['options']
+                return len(options) - 1 if _has_placeholder(options) else len(options)
+        except Exception:
+            continue
+    return 0
+
+
+@timed('select_semester', outcome=error_outcome)
+def _submit_semester(driver, form_frames, year_idx, semester_idx, timing):
+    """Step 8: select year and semester and click the real submit button; returns an error or None"""
+    log.info(f"📅 Selecting Year (index {year_idx}) and Semester (index {semester_idx})...")
+
+    year_selected = False
+    semester_selected = False
+    submit_clicked = False
+
+    for frame_name in form_frames:
+        try:
+            driver.switch_to.default_content()
+            driver.switch_to.frame(frame_name)
+
+            # One script call returns every dropdown with its options
+            selects = query_elements(driver, "select")
+            log.info(f"🔍 Found {len(selects)} dropdowns in '{frame_name}' frame")
+
+            for idx, select in enumerate(selects):
+                try:
+                    select_name = (select['name'] or select['id']).lower()
+
+                    log.info(f"  Dropdown {idx}: name='{select_name}', options={len(select['options'])}")
+
+                    # Try to select Year - by name, or the first dropdown
+                    if not year_selected:
+                        if (any(k in select_name for k in ['year', 'yr', 'academic', 'session'])
+                                or (idx == 0 and not semester_selected)):
+                            year_selected = _select_option(driver, select, year_idx, "Year")
+
+                    # Try to select Semester - by name, or the dropdown after Year
+                    elif not semester_selected:
+                        semester_selected = _select_option(driver, select, semester_idx, "Semester")
+                except Exception as e:
+                    log.warning(f"⚠️  Error with dropdown {idx}: {e}")
+                    continue
+
+            if year_selected and semester_selected:
+                # Find submit button - SKIP PDF buttons!
+                log.info("🔍 Looking for submit button...")
+                for button in query_elements(driver, "input", "button"):
+                    button_type = button['type']
+                    button_value = button['value'].lower()
+                    button_name = button['name'].lower()
+
+                    # CRITICAL: Skip PDF/Download buttons
+                    if any(skip in button_value for skip in ['pdf', 'download', 'export', 'print']):
+                        log.info(f"  ⏭️  Skipping: {button_value}")
+                        continue
+
+                    if any(skip in button_name for skip in ['pdf', 'mpdfx', 'download']):
+                        log.info(f"  ⏭️  Skipping: name={button_name}")
+                        continue
+
+                    # Click ONLY submit buttons
+                    if button_type == "submit" and "submit" in button_name:
+                        log.info(f"✅ Clicking submit button: name='{button_name}'")
+                        page = driver.find_element(By.TAG_NAME, "html")
+                        button['element'].click()
+                        submit_clicked = True
+                        break
+
+                if submit_clicked:
+                    frame_memory.learn(SEMESTER_FORM, frame_name)
+                    # The previous semester's table is still on screen until the page reloads
+                    try:
+                        wait_for(driver, timing).until(EC.staleness_of(page))
+                    except TimeoutException:
+                        pass
+                    break
+                else:
+                    log.warning(f"⚠️  No valid submit button found in '{frame_name}'")
+
+        except Exception as e:
+            log.warning(f"⚠️  Error in frame '{frame_name}': {e}")
+            continue
+
+    if not year_selected:
+        log.error("❌ Year not selected!")
+    if not semester_selected:
+        log.error("❌ Semester not selected!")
+    if not submit_clicked:
+        log.warning("⚠️  WARNING: Submit button was not clicked!")
+
+    if not year_selected or not semester_selected:
+        return 'Could not select year/semester'
+    return None
+
+
+@timed('read_table', outcome=found_outcome)
+def _read_attendance(driver, timing):
+    """Step 9: extract attendance once the Overall rows have rendered"""
+    log.info("📊 Extracting attendance data...")
+
+    table_frames = frame_memory.order(ATTENDANCE_TABLE, FORM_FRAMES)
+    try:
+        wait_for(driver, timing).until(attendance_table_present(table_frames))
+    except TimeoutException:
+        log.warning("⚠️  Attendance table did not appear in time")
+
+    all_attendance = []
+
+    for frame_name in table_frames:
+        try:
+            driver.switch_to.default_content()
+            driver.switch_to.frame(frame_name)
+
+            # Only the header and Overall rows come back, already as cell text
+            try:
+                attendance_rows = extract_attendance_table_enhanced(query_attendance_table(driver))
+            except WebDriverException:
+                attendance_rows = []
+
+            if not attendance_rows:
+                html = driver.page_source
+                if 'attend' in html.lower() and len(html) > 500:
+                    # Production mode - debug disabled
+                    attendance_rows = extract_attendance_table_enhanced(html, debug=False)
+
+            if attendance_rows:
+                log.info(f"✅ Found data in '{frame_name}'")
+                all_attendance.extend(attendance_rows)
+                log.info(f"✅ Extracted {len(attendance_rows)} subjects")
+                # The table lives in one frame - stop once it has been read
+                frame_memory.learn(ATTENDANCE_TABLE, frame_name)
+                break
+        except:
+            continue
+
+    driver.switch_to.default_content()
+    return all_attendance
+
+
+def _fetch_semester(driver, year_idx, semester_idx, timing, report, reopen=False, remember_url=False,
+                    roll_no=None):
+    """
+    Steps 8-9 for one semester on an already opened My Attendance page.
+    reopen: click My Attendance again if the form is gone (later semesters)
+    remember_url: the form was just opened - record its URL for next time
+    roll_no: the logged-in student, needed to reopen the form by its URL
+    """
+    form_frames, ready = _semester_form_frames(driver, timing)
+    if not ready and reopen:
+        log.info("🔁 Semester form not on screen - reopening My Attendance")
+        if _open_by_url(driver, timing, roll_no):
+            form_frames, ready = _semester_form_frames(driver, timing)
+        else:
+            driver.switch_to.default_content()
+            if find_and_click_link(driver, ['My Attendance'], exact_match=True, timing=timing,
+                                   target=MY_ATTENDANCE):
+                form_frames, ready = _semester_form_frames(driver, timing)
+    if not ready:
+        log.warning("⚠️  Dropdowns did not populate in time")
+    elif remember_url:
+        _remember_attendance_url(driver, form_frames[0])
+
+    error = _submit_semester(driver, form_frames, year_idx, semester_idx, timing)
+    if error:
+        return {'success': False, 'error': error}
+    report('semester_selected')
+
+    all_attendance = _read_attendance(driver, timing)
+    if not all_attendance:
+        return {'success': False, 'error': 'No attendance data found'}
+
+    log.info(f"🎉 Success! {len(all_attendance)} subjects")
+    report('parsed')
+
+    return {
+        'success': True,
+        'data': all_attendance,
+        'total_subjects': len(all_attendance)
+    }
+
+
+def scrape_attendance_with_driver(driver, password, captcha, year_idx=0, semester_idx=0, timing=None,
+                                  on_progress=None, roll_no=None):
+    """
+    Continue scraping with existing driver session
+    timing: name of a TIMING_PROFILES entry ('fast', 'default', 'conservative')
+    on_progress: called with each stage name from jobs.STAGES as it completes
+    roll_no: the student logging in - without it My Attendance is always opened through the menus
+    """
+    report = on_progress or (lambda stage: None)
+    try:
+        log.info("🔐 Continuing login...")
+
+        timing = get_timing(timing)
+
+        failure = _login(driver, password, captcha, timing)
+        if failure:
+            return failure
+        report('logged_in')
+
+        error = _open_my_attendance(driver, timing, report, roll_no)
+        if error:
+            return {'success': False, 'error': error}
+
+        return _fetch_semester(driver, year_idx, semester_idx, timing, report, remember_url=True, roll_no=roll_no)
+
+    except Exception as e:
+        log.exception(f"❌ Error: {e}")
+
+        return {'success': False, 'error': f'Error: {str(e)}'}
+
+
+def _fetch_semesters(driver, semesters, year_idx, timing, report, reopen_first=False, roll_no=None):
+    """Read each (year_idx, semester_idx) pair, or every semester for ALL_SEMESTERS"""
+    if semesters == ALL_SEMESTERS:
+        form_frames, _ = _semester_form_frames(driver, timing)
+        count = _count_semesters(driver, form_frames)
+        log.info(f"📚 {count} semesters available for year index {year_idx}")
+        semesters = [(year_idx, semester_idx) for semester_idx in range(count)]
+        if not semesters:
+            return {'success': False, 'error': 'No semesters available'}
+
+    results = []
+    for n, (year, semester) in enumerate(semesters):
+        log.info(f"📆 Semester {n + 1}/{len(semesters)}: year {year}, semester {semester}")
+        try:
+            result = _fetch_semester(driver, year, semester, timing, report, reopen=reopen_first or n > 0,
+                                     remember_url=not reopen_first and n == 0, roll_no=roll_no)
+        except Exception as e:
+            log.error(f"❌ Error: {e}")
+            result = {'success': False, 'error': f'Error: {str(e)}'}
+        results.append({'year': year, 'semester': semester, **result})
+
+    return combine_semester_results(results)
+
+
+def scrape_semesters_with_driver(driver, password, captcha, semesters, year_idx=0, timing=None,
+                                 on_progress=None, roll_no=None):
+    """
+    Log in once and read several semesters in the same session
+    semesters: list of (year_idx, semester_idx) pairs, or ALL_SEMESTERS for
+    every semester option of year_idx
+    Returns combine_semester_results() - one entry per semester, partial
+    when some of them failed
+    """
+    report = on_progress or (lambda stage: None)
+    try:
+        log.info("🔐 Continuing login (multi-semester)...")
+
+        timing = get_timing(timing)
+
+        failure = _login(driver, password, captcha, timing)
+        if failure:
+            return failure
+        report('logged_in')
+
+        error = _open_my_attendance(driver, timing, report, roll_no)
+        if error:
+            return {'success': False, 'error': error}
+
+        return _fetch_semesters(driver, semesters, year_idx, timing, report, roll_no=roll_no)
+
+    except Exception as e:
+        log.exception(f"❌ Error: {e}")
+
+        return {'success': False, 'error': f'Error: {str(e)}'}
+
+
+def refresh_attendance_with_driver(driver, year_idx=0, semester_idx=0, semesters=None, timing=None, roll_no=None):
+    """
+    Read attendance again on a browser that is still logged in - no captcha,
+    no login form. Falls back to clicking My Attendance if the form is gone.
+    """
+    report = lambda stage: None
+    try:
+        timing = get_timing(timing)
+
+        driver.switch_to.default_content()
+        if "student.htm" not in driver.current_url:
+            return {'success': False, 'error': 'Portal session expired', 'login_required': True}
+
+        log.info("♻️  Reusing logged-in browser...")
+        if semesters is not None:
+            return _fetch_semesters(driver, semesters, year_idx, timing, report, reopen_first=True,
+                                    roll_no=roll_no)
+        return _fetch_semester(driver, year_idx, semester_idx, timing, report, reopen=True, roll_no=roll_no)
+
+    except Exception as e:
+        log.error(f"❌ Error: {e}")
+        return {'success': False, 'error': f'Error: {str(e)}'}
@@ -0,0 +1,169 @@
+"""
+Timing profiles and readiness conditions used instead of fixed sleeps
+
+Every step waits for something concrete (URL change, frame, table, populated
+select). The profile only sets how long we are willing to wait before giving up.
+Selenium is imported inside the conditions that need it, so the http engine can
+share the profiles and poll_until without loading it.
+"""
+import time
+from .portal import login_message, classify_login_error
+
+TIMING_PROFILES = {
+    # Portal is quick - fail fast
+    'fast': {'page_load': 8, 'login': 8, 'step': 5, 'poll': 0.1},
+    'default': {'page_load': 15, 'login': 20, 'step': 10, 'poll': 0.2},
+    # Exam-season portal - same conditions, more patience
+    'conservative': {'page_load': 30, 'login': 40, 'step': 25, 'poll': 0.5},
+}
+
+DEFAULT_PROFILE = 'default'
+
+
+def get_timing(profile=None):
+    """Resolve a profile name (or an already resolved dict) to its timeouts"""
+    if isinstance(profile, dict):
+        return profile
+    return TIMING_PROFILES.get(profile or DEFAULT_PROFILE, TIMING_PROFILES[DEFAULT_PROFILE])
+
+
+def wait_for(driver, timing, key='step'):
+    """WebDriverWait configured from a timing profile"""
+    from selenium.webdriver.support.ui import WebDriverWait
+    timing = get_timing(timing)
+    return WebDriverWait(driver, timing[key], poll_frequency=timing['poll'])
+
+
+def poll_until(check, timing, key='step'):
+    """
+    Call check() until it returns something truthy or the profile timeout runs out.
+    Exceptions from check() count as "not ready yet".
+    """
+    timing = get_timing(timing)
+    deadline = time.monotonic() + timing[key]
+    while True:
+        try:
+            result = check()
+            if result:
+                return result
+        except Exception:
+            pass
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(timing['poll'])
+
+
+# --- Readiness conditions (usable with WebDriverWait.until) ---
+
+def url_contains_any(*fragments):
+    """Top-level URL contains one of the fragments"""
+    def condition(driver):
+        url = driver.current_url
+        return url if any(fragment in url for fragment in fragments) else False
+    return condition
+
+
+BODY_TEXT_JS = "return document.body ? document.body.innerText : '';"
+
+# Set on the login frame right before submitting; a page without it is the portal's answer
+MARK_SUBMITTED_JS = "window.__attendxSubmitted = true;"
+ANSWER_TEXT_JS = "return window.__attendxSubmitted || !document.body ? null : document.body.innerText;"
+
+
+def login_outcome(success_fragment, baseline_lines):
+    """
+    Races the post-login redirect against the portal's complaint. Returns
+    ('ok', url) once the top URL contains success_fragment, or
+    ('error', message) for an alert, or for text in the reloaded login frame
+    that is not in baseline_lines (the untouched form) and reads like an error.
+    """
+    from selenium.common.exceptions import NoAlertPresentException
+
+    def condition(driver):
+        try:
+            alert = driver.switch_to.alert
+            message = alert.text
+            alert.accept()
+            return ('error', message)
+        except NoAlertPresentException:
+            pass
+
+        # Mid-navigation the frame may be gone or an alert may pop up - just poll again
+        try:
+            driver.switch_to.default_content()
+            url = driver.current_url
+            if success_fragment in url:
+                return ('ok', url)
+
+            driver.switch_to.frame(0)
+            text = driver.execute_script(ANSWER_TEXT_JS)
+            driver.switch_to.default_content()
+        except Exception:
+            return False
+        if text is None:
+            return False
+        message = login_message(baseline_lines, text)
+        return ('error', message) if classify_login_error(message) else False
+    return condition
+
+
+def field_has_value(element, value):
+    """send_keys has landed - the input holds exactly the typed value"""
+    def condition(driver):
+        return (element.get_attribute('value') or '') == value
+    return condition
+
+
+def image_loaded(element):
+    """<img> finished downloading and has real pixels"""
+    def condition(driver):
+        return driver.execute_script(
+            "return arguments[0].complete && arguments[0].naturalWidth > 0;", element)
+    return condition
+
+
+def frame_with_element(frame_names, by, value):
+    """
+    Name of the first frame that contains the element; the driver is left
+    switched into that frame
+    """
+    def condition(driver):
+        for frame_name in frame_names:
+            try:
+                driver.switch_to.default_content()
+                driver.switch_to.frame(frame_name)
+                if driver.find_elements(by, value):
+                    return frame_name
+            except Exception:
+                continue
+        driver.switch_to.default_content()
+        return False
+    return condition
+
+
+def selects_populated(frame_names, minimum=2):
+    """A frame holds at least `minimum` <select>s and every one has options"""
+    def condition(driver):
+        for frame_name in frame_names:
+            try:
+                driver.switch_to.default_content()
+                driver.switch_to.frame(frame_name)
+                counts = driver.execute_script(
+                    "return Array.from(document.querySelectorAll('select'), s => s.options.length);")
+                if len(counts) >= minimum and all(counts):
+                    return frame_name
+            except Exception:
+                continue
+        driver.switch_to.default_content()
+        return False
+    return condition
+
+
+ATTENDANCE_TABLE_XPATH = ("//td[contains(translate(normalize-space(.), 'OVERAL', 'overal'), 'overall')]"
+                          "|//th[contains(translate(normalize-space(.), 'OVERAL', 'overal'), 'overall')]")
+
+
+def attendance_table_present(frame_names):
+    """The submitted semester form has rendered its Overall rows"""
+    from selenium.webdriver.common.by import By
+    return frame_with_element(frame_names, By.XPATH, ATTENDANCE_TABLE_XPATH)
@@ -1,130 +1,180 @@
 """
 Utility functions for web scraping attendance data
 """
-import time
+import logging
 import re
 from bs4 import BeautifulSoup
-from selenium.webdriver.common.by import By
+from .timing import poll_until
+from .attendance_parser import extract_attendance_table_fast, attendance_from_tables
+from .dom import query_elements, query_tree_hitareas
+from .navigator import frame_memory, switch_to, MAIN_CONTENT, ATTENDANCE_TREE
+from .metrics import timed, found_outcome
 
+log = logging.getLogger(__name__)
 
-def find_and_expand_tree_node(driver, text_keywords, frame_names=['data', 'top', 'contents', 'bottom', 'banner']):
-    """Find a tree node and click its expandable hitarea to expand it"""
-    print(f"🔍 Looking for expandable tree node containing: {text_keywords}")
-    
+
+def _click_hitarea(hitarea, timing):
+    """Click a tree hitarea and wait for its expandable/collapsable class to flip"""
+    # Only the browser engine clicks; the http engine imports this module for the parser
+    from selenium.common.exceptions import ElementNotInteractableException
+    before = hitarea.get_attribute("class") or ""
+    try:
+        hitarea.click()
+    except ElementNotInteractableException:
+        # Without the tree stylesheet (lean browser profile) the hitarea has no size
+        hitarea.parent.execute_script("arguments[0].click();", hitarea)
+    poll_until(lambda: (hitarea.get_attribute("class") or "") != before, timing)
+
+
+def _expand_tree_node_once(driver, text_keywords, frame_names, timing):
+    """Name of the frame whose tree node was expanded, or None"""
     for frame_name in frame_names:
         try:
-            driver.switch_to.default_content()
-            driver.switch_to.frame(frame_name)
+            switch_to(driver, frame_name)
             
-            # Strategy 1: Find by looking for text near hitarea
-            elements = driver.find_elements(By.XPATH, "//*[contains(text(), 'Attendance') or contains(text(), 'ATTENDANCE')]")
+            # One script call collects every hitarea with its class and label text
+            tree = query_tree_hitareas(driver)
             
-            for elem in elements:
-                try:
-                    parent = elem.find_element(By.XPATH, "./..")
-                    hitareas = parent.find_elements(By.CLASS_NAME, "hitarea")
-                    
-                    for hitarea in hitareas:
-                        classes = hitarea.get_attribute("class") or ""
-                        if "expandable-hitarea" in classes or "collapsable-hitarea" in classes:
-                            print(f"✅ Found expandable tree node in '{frame_name}' frame!")
-                            hitarea.click()
-                            time.sleep(2)
-                            driver.switch_to.default_content()
-                            return True
-                except:
-                    continue
+            # Strategy 1: hitarea next to an "Attendance" label
+            for hitarea in tree['near']:
+                classes = hitarea['cls']
+                if "expandable-hitarea" in classes or "collapsable-hitarea" in classes:
+                    log.info("✅ Found expandable tree node in '%s' frame!", frame_name)
+                    _click_hitarea(hitarea['element'], timing)
+                    driver.switch_to.default_content()
+                    return frame_name
             
-            # Strategy 2: Find all hitareas and click the expandable ones
-            hitareas = driver.find_elements(By.CLASS_NAME, "hitarea")
-            
-            for hitarea in hitareas:
-                classes = hitarea.get_attribute("class") or ""
-                
-                if "expandable-hitarea" in classes:
-                    try:
-                        parent = hitarea.find_element(By.XPATH, "./..")
-                        text = parent.text.strip()
-                        
-                        if any(keyword.lower() in text.lower() for keyword in text_keywords):
-                            print(f"✅ Found expandable '{text}' in '{frame_name}' frame!")
-                            hitarea.click()
-                            time.sleep(2)
-                            driver.switch_to.default_content()
-                            return True
-                    except:
-                        continue
+            # Strategy 2: any expandable hitarea whose node text matches
+            for hitarea in tree['all']:
+                if "expandable-hitarea" not in hitarea['cls']:
+                    continue
+                text = hitarea['parent_text']
+                if any(keyword.lower() in text.lower() for keyword in text_keywords):
+                    log.info("✅ Found expandable '%s' in '%s' frame!", text, frame_name)
+                    _click_hitarea(hitarea['element'], timing)
+                    driver.switch_to.default_content()
+                    return frame_name
                         
-        except Exception as e:
+        except Exception:
             continue
     
     driver.switch_to.default_content()
-    return False
+    return None
 
 
-def find_and_click_link(driver, keywords, frame_names=['data', 'top', 'contents', 'bottom', 'banner'], exact_match=False):
-    """Helper to find and click a link across multiple frames"""
-    try:
-        driver.switch_to.default_content()
-        links = driver.find_elements(By.TAG_NAME, "a")
-        for link in links:
-            link_text = link.text.strip()
-            link_html = link.get_attribute('innerHTML') or ""
-            
-            if exact_match:
-                if link_text in keywords or any(keyword in link_html for keyword in keywords):
-                    print(f"✅ Found '{link.text}' in main content!")
-                    link.click()
-                    return True
-            else:
-                if any(keyword.lower() in link_text.lower() for keyword in keywords):
-                    print(f"✅ Found '{link.text}' in main content!")
-                    link.click()
-                    return True
-    except Exception as e:
-        pass
+@timed('expand_tree', outcome=found_outcome)
+def find_and_expand_tree_node(driver, text_keywords, frame_names=['data', 'top', 'contents', 'bottom', 'banner'], timing=None,
+                              target=ATTENDANCE_TREE):
+    """Find a tree node and click its expandable hitarea to expand it"""
+    log.info("🔍 Looking for expandable tree node containing: %s", text_keywords)
+    
+    # Learned frame first; the rest only if it misses
+    frame_names = frame_memory.order(target, frame_names)
     
+    # The tree renders after My Activities loads - keep scanning until it shows up
+    frame_name = poll_until(lambda: _expand_tree_node_once(driver, text_keywords, frame_names, timing), timing)
+    driver.switch_to.default_content()
+    if frame_name:
+        frame_memory.learn(target, frame_name)
+    return bool(frame_name)
+
+
+def _link_matches(link, keywords, exact_match):
+    link_text = link['text']
+    
+    if exact_match:
+        return link_text in keywords or any(keyword in link['html'] for keyword in keywords)
+    return any(keyword.lower() in link_text.lower() for keyword in keywords)
+
+
+def _click_matching_link(driver, keywords, exact_match, where):
+    # innerHTML is only needed for exact matching
+    for link in query_elements(driver, "a", with_html=exact_match):
+        if _link_matches(link, keywords, exact_match):
+            log.info("✅ Found '%s' in %s!", link['text'], where)
+            link['element'].click()
+            return True
+    return False
+
+
+def _click_link_once(driver, keywords, frame_names, exact_match):
+    """Frame the link was clicked in - MAIN_CONTENT for the top document - or False"""
     for frame_name in frame_names:
         try:
-            driver.switch_to.default_content()
-            driver.switch_to.frame(frame_name)
-            
-            links = driver.find_elements(By.TAG_NAME, "a")
-            for link in links:
-                link_text = link.text.strip()
-                link_html = link.get_attribute('innerHTML') or ""
-                
-                if exact_match:
-                    if link_text in keywords or any(keyword in link_html for keyword in keywords):
-                        print(f"✅ Found '{link.text}' in {frame_name}!")
-                        link.click()
-                        return True
-                else:
-                    if any(keyword.lower() in link_text.lower() for keyword in keywords):
-                        print(f"✅ Found '{link.text}' in {frame_name}!")
-                        link.click()
-                        return True
-        except Exception as e:
+            switch_to(driver, frame_name)
+            where = frame_name if frame_name is not MAIN_CONTENT else "main content"
+            if _click_matching_link(driver, keywords, exact_match, where):
+                return (frame_name,)
+        except Exception:
             continue
     return False
 
 
+@timed('click_link', outcome=found_outcome)
+def find_and_click_link(driver, keywords, frame_names=['data', 'top', 'contents', 'bottom', 'banner'], exact_match=False, timing=None,
+                        target=None):
+    """Helper to find and click a link across multiple frames"""
+    # Main content is probed first unless memory says the link lives in a frame
+    frame_names = [MAIN_CONTENT] + list(frame_names)
+    if target:
+        frame_names = frame_memory.order(target, frame_names)
+    
+    # Links appear once the frame has loaded - retry the scan until the profile timeout
+    found = poll_until(lambda: _click_link_once(driver, keywords, frame_names, exact_match), timing)
+    if found and target:
+        frame_memory.learn(target, found[0])
+    return bool(found)
+
+
+@timed('parse_table', outcome=found_outcome)
 def extract_attendance_table_enhanced(html, debug=False):
     """
     Enhanced attendance table parser
     Handles the specific HTML format from NSIT IMS portal
+    Uses the single-pass parser; debug=True runs the verbose BeautifulSoup one.
+    Also accepts the compact {'tables', 'names'} of dom.query_attendance_table
+    """
+    if isinstance(html, dict):
+        return attendance_from_tables(html.get('tables') or [], html.get('names') or {})
+    if debug:
+        return extract_attendance_table_bs4(html, debug=True)
+    return extract_attendance_table_fast(html)
+
+
+def combine_semester_results(results):
+    """
+    Overall result of a multi-semester fetch. results holds one
+    {'year', 'semester', 'success', ...} dict per semester; the fetch
+    succeeds if any semester did and is marked partial if some failed.
+    """
+    succeeded = sum(1 for result in results if result.get('success'))
+    combined = {
+        'success': succeeded > 0,
+        'partial': 0 < succeeded < len(results),
+        'semesters': results,
+        'total_semesters': len(results)
+    }
+    if not succeeded:
+        combined['error'] = 'No attendance data found for any semester'
+    return combined
+
+
+def extract_attendance_table_bs4(html, debug=False):
+    """
+    Reference BeautifulSoup implementation of extract_attendance_table_enhanced
+    Kept for debug output and as the baseline in benchmarks/bench_parser.py
     """
     soup = BeautifulSoup(html, 'html.parser')
     
     if debug:
-        print("\n" + "="*80)
-        print("🔍 DEBUG: Analyzing HTML structure")
-        print("="*80)
+        log.info("\n" + "="*80)
+        log.info("🔍 DEBUG: Analyzing HTML structure")
+        log.info("="*80)
     
     # Find all tables
     tables = soup.find_all('table')
     if debug:
-        print(f"\n📊 Found {len(tables)} table(s) in HTML")
+        log.info("📊 Found %d table(s) in HTML", len(tables))
     
     attendance_data = []
     
@@ -153,11 +203,11 @@ def extract_attendance_table_enhanced(html, debug=False):
                     name = match.group(2).strip()
                     subject_names_map[code] = name
                     if debug:
-                        print(f"📚 Mapped: {code} -> {name}")
+                        log.info("📚 Mapped: %s -> %s", code, name)
     
     for table_idx, table in enumerate(tables):
         if debug:
-            print(f"\n--- Analyzing Table {table_idx + 1} ---")
+            log.info("--- Analyzing Table %d ---", table_idx + 1)
         
         rows = table.find_all('tr')
         
@@ -171,7 +221,7 @@ def extract_attendance_table_enhanced(html, debug=False):
             
             # Debug: Print first few rows
             if debug and row_idx < 3:
-                print(f"  Row {row_idx}: {cell_texts}")
+                log.info("  Row %d: %s", row_idx, cell_texts)
             
             # Look for row with subject codes (pattern: ITITC601, DNCS0603, etc.)
             # Pattern: 2-5 uppercase letters + 3-4 digits
@@ -188,12 +238,12 @@ def extract_attendance_table_enhanced(html, debug=False):
                         subject_codes.append(cell_text)
                 
                 if debug:
-                    print(f"✅ Found subject codes at row {row_idx}: {subject_codes}")
+                    log.info("✅ Found subject codes at row %d: %s", row_idx, subject_codes)
                 break
         
         if not subject_codes:
             if debug:
-                print("⚠️ No subject codes found in this table")
+                log.warning("⚠️ No subject codes found in this table")
             continue
         
         # Now find the "Overall" rows
@@ -213,24 +263,24 @@ def extract_attendance_table_enhanced(html, debug=False):
             if 'overall class' in first_cell or ('overall' in first_cell and 'class' in first_cell):
                 overall_class_row = [cell.get_text(strip=True) for cell in cells]
                 if debug:
-                    print(f"✅ Found 'Overall Class' row")
+                    log.info("✅ Found 'Overall Class' row")
             elif 'overall' in first_cell and 'absent' in first_cell:
                 overall_absent_row = [cell.get_text(strip=True) for cell in cells]
                 if debug:
-                    print(f"✅ Found 'Overall Absent' row")
+                    log.info("✅ Found 'Overall Absent' row")
             elif 'overall' in first_cell and 'present' in first_cell:
                 overall_present_row = [cell.get_text(strip=True) for cell in cells]
                 if debug:
-                    print(f"✅ Found 'Overall Present' row")
+                    log.info("✅ Found 'Overall Present' row")
             elif ('overall' in first_cell and '%' in first_cell) or 'overall (%)' in first_cell:
                 overall_percent_row = [cell.get_text(strip=True) for cell in cells]
                 if debug:
-                    print(f"✅ Found 'Overall (%)' row")
+                    log.info("✅ Found 'Overall (%)' row")
         
         # Extract data for each subject
         if overall_class_row and overall_absent_row and overall_present_row:
             if debug:
-                print(f"\n✅ Extracting attendance data...")
+                log.info("✅ Extracting attendance data...")
             
             for idx, subject_code in enumerate(subject_codes):
                 try:
@@ -264,14 +314,14 @@ def extract_attendance_table_enhanced(html, debug=False):
                     })
                     
                     if debug:
-                        print(f"  {subject_code}: {present}/{total_classes} ({percentage}%) - {subject_name}")
+                        log.info("  %s: %s/%s (%s%%) - %s", subject_code, present, total_classes, percentage, subject_name)
                 
                 except (ValueError, IndexError) as e:
                     if debug:
-                        print(f"⚠️ Error parsing {subject_code}: {e}")
+                        log.warning("⚠️ Error parsing %s: %s", subject_code, e)
                     continue
     
     if debug:
-        print(f"\n✅ Total extracted: {len(attendance_data)} subjects")
+        log.info("✅ Total extracted: %d subjects", len(attendance_data))
     
     return attendance_data
\ No newline at end of file
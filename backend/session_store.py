@@ -0,0 +1,262 @@
+"""
+Thread-safe store for captcha/login sessions
+
+- Expiry is ordered by deadline in a heap; a reaper thread sleeps until the
+  next deadline, so sessions are closed within moments of expiring.
+- Every session carries its own lock so two requests can't drive the same
+  browser at once.
+- Live browsers are capped. Callers reserve a slot before launching one and
+  get a Retry-After hint when the cap is reached.
+- Sessions that are still logged in can be parked for reuse. Parked
+  sessions are capped separately, and the least recently used one is closed
+  first when the cap is hit or when a new login needs its browser.
+"""
+import heapq
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# How long an expired-but-busy session is given before the reaper looks again
+BUSY_GRACE = 30
+
+
+class SessionStore:
+
+    def __init__(self, ttl, max_browsers=8, max_parked=4, on_expire=None):
+        """
+        ttl: timedelta a session lives after creation (or its last touch)
+        on_expire: called with the session dict after the store removes it
+        (expired or evicted)
+        """
+        self.ttl = ttl.total_seconds()
+        self.max_browsers = max_browsers
+        self.max_parked = max_parked
+        self.on_expire = on_expire
+
+        self._sessions = {}
+        self._deadlines = []
+        self._reserved = 0
+        self._browsers = 0
+        self._cond = threading.Condition()
+        self._thread = None
+
+    # --- admission control ---
+
+    def try_reserve_browser(self):
+        """Claim a browser slot before launching one; False when at the cap"""
+        with self._cond:
+            if self._browsers + self._reserved >= self.max_browsers:
+                return False
+            self._reserved += 1
+            return True
+
+    def cancel_reservation(self):
+        """Give back a slot whose browser never became a session"""
+        with self._cond:
+            self._reserved = max(0, self._reserved - 1)
+
+    def retry_after(self):
+        """Seconds until the next session expires - a hint for Retry-After"""
+        with self._cond:
+            while self._deadlines and self._deadlines[0][1] not in self._sessions:
+                heapq.heappop(self._deadlines)
+            if not self._deadlines:
+                return 1
+            return max(1, min(60, int(self._deadlines[0][0] - time.monotonic()) + 1))
+
+    # --- sessions ---
+
+    def add(self, session_id, session, browser=False):
+        """
+        Store a session. browser=True turns an earlier try_reserve_browser()
+        into a live slot that is freed when the session goes away.
+        """
+        deadline = time.monotonic() + self.ttl
+        session['lock'] = threading.Lock()
+        session['holds_browser'] = browser
+        session['deadline'] = deadline
+        with self._cond:
+            if browser:
+                self._reserved = max(0, self._reserved - 1)
+                self._browsers += 1
+            self._sessions[session_id] = session
+            heapq.heappush(self._deadlines, (deadline, session_id))
+            self._cond.notify()
+        return session
+
+    def get(self, session_id):
+        with self._cond:
+            session = self._sessions.get(session_id)
+            if session is not None and session['deadline'] <= time.monotonic():
+                return None
+            return session
+
+    def touch(self, session_id, ttl=None):
+        """Push a session's deadline back (defaults to the store ttl)"""
+        with self._cond:
+            return self._touch(session_id, ttl)
+
+    def _touch(self, session_id, ttl):
+        session = self._sessions.get(session_id)
+        if session is None:
+            return False
+        session['deadline'] = time.monotonic() + (ttl.total_seconds() if ttl else self.ttl)
+        heapq.heappush(self._deadlines, (session['deadline'], session_id))
+        self._cond.notify()
+        return True
+
+    # --- logged-in sessions kept for reuse ---
+
+    def park(self, session_id, idle_ttl):
+        """
+        Keep a logged-in session for idle_ttl after its last use. Parking
+        past max_parked closes the least recently used parked session.
+        """
+        with self._cond:
+            if not self._touch(session_id, idle_ttl):
+                return False
+            self._sessions[session_id]['parked'] = True
+            excess = self._parked_count() - self.max_parked
+            victims = self._take_parked(excess, exclude=session_id) if excess > 0 else []
+        self._close(victims, "Evicted (parked cap)")
+        return True
+
+    def evict_parked(self, browser=False):
+        """
+        Close the least recently used idle parked session to free its slot
+        (browser=True: only one that holds a browser). True if one was closed.
+        """
+        with self._cond:
+            victims = self._take_parked(1, browser_only=browser)
+        self._close(victims, "Evicted (slot needed)")
+        return bool(victims)
+
+    def _parked_count(self):
+        return sum(1 for session in self._sessions.values() if session.get('parked'))
+
+    def _take_parked(self, count, exclude=None, browser_only=False):
+        """Remove up to count idle parked sessions, earliest deadline (least recently used) first"""
+        candidates = sorted(
+            (session['deadline'], session_id) for session_id, session in self._sessions.items()
+            if session.get('parked') and session_id != exclude
+            and (session['holds_browser'] or not browser_only))
+        victims = []
+        for _, session_id in candidates:
+            if len(victims) >= count:
+                break
+            session = self._sessions[session_id]
+            # In use right now - not idle
+            if not session['lock'].acquire(blocking=False):
+                continue
+            del self._sessions[session_id]
+            if session['holds_browser']:
+                self._browsers -= 1
+            victims.append((session_id, session))
+        return victims
+
+    def release_browser(self, session_id):
+        """The session quit its browser early (hybrid engine) - free the slot, keep the session"""
+        with self._cond:
+            session = self._sessions.get(session_id)
+            if session is None or not session['holds_browser']:
+                return False
+            session['holds_browser'] = False
+            self._browsers -= 1
+            self._cond.notify()
+            return True
+
+    def pop(self, session_id):
+        """Remove and return a session (None if it is already gone)"""
+        with self._cond:
+            session = self._sessions.pop(session_id, None)
+            if session is not None and session['holds_browser']:
+                self._browsers -= 1
+            return session
+
+    def __len__(self):
+        with self._cond:
+            return len(self._sessions)
+
+    def __contains__(self, session_id):
+        return self.get(session_id) is not None
+
+    def browsers(self):
+        """(session_id, driver) for every session holding a browser"""
+        with self._cond:
+            return [(session_id, session['driver']) for session_id, session in self._sessions.items()
+                    if session.get('driver')]
+
+    def stats(self):
+        with self._cond:
+            return {
+                'live': len(self._sessions),
+                'parked': self._parked_count(),
+                'max_parked': self.max_parked,
+                'browsers': self._browsers,
+                'reserved': self._reserved,
+                'max_browsers': self.max_browsers,
+            }
+
+    # --- expiry ---
+
+    def start(self):
+        """Start the reaper thread (idempotent)"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._reap_forever, daemon=True)
+            self._thread.start()
+
+    def _next_expired(self):
+        """Pop the next due session, or wait until one is due"""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._deadlines:
+                    deadline, session_id = self._deadlines[0]
+                    session = self._sessions.get(session_id)
+                    # Stale heap entry: session gone or its deadline was moved
+                    if session is None or session['deadline'] != deadline:
+                        heapq.heappop(self._deadlines)
+                        continue
+                    break
+
+                if not self._deadlines:
+                    self._cond.wait()
+                    continue
+
+                deadline, session_id = self._deadlines[0]
+                if deadline > now:
+                    self._cond.wait(deadline - now)
+                    continue
+
+                heapq.heappop(self._deadlines)
+                session = self._sessions[session_id]
+                # Mid-request: look again shortly instead of pulling the browser away
+                if not session['lock'].acquire(blocking=False):
+                    session['deadline'] = now + BUSY_GRACE
+                    heapq.heappush(self._deadlines, (session['deadline'], session_id))
+                    continue
+
+                del self._sessions[session_id]
+                if session['holds_browser']:
+                    self._browsers -= 1
+                return session_id, session
+
+    def _close(self, victims, reason):
+        """Hand removed (and locked) sessions to on_expire, outside the store lock"""
+        for session_id, session in victims:
+            try:
+                if self.on_expire:
+                    self.on_expire(session)
+                log.info(f"🧹 {reason}: {session_id[:8]}...")
+            except Exception as e:
+                log.warning(f"⚠️  Failed to close session {session_id[:8]}: {e}")
+            finally:
+                session['lock'].release()
+
+    def _reap_forever(self):
+        while True:
+            self._close([self._next_expired()], "Expired")
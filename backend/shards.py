@@ -0,0 +1,49 @@
+"""
+Shard identity for the multi-process deployment (see router.py)
+
+Every worker process owns the browsers of its own sessions. Session and job
+ids start with the owning shard ("s2-<uuid>"), so router.py can send
+follow-up requests to the worker that holds the browser. Workers talk to the
+router over a Unix socket each.
+
+SHARD_ID      set by router.py on each worker; unset for a plain single-process app.py
+SHARD_SOCKET  the Unix socket the worker serves on
+"""
+import http.client
+import os
+import re
+import socket
+
+SHARD_ID = os.environ.get("SHARD_ID")
+SHARD_SOCKET = os.environ.get("SHARD_SOCKET")
+
+SHARD_ID_RE = re.compile(r'^s(\d+)-')
+
+
+def id_prefix(shard_id=SHARD_ID):
+    """Prefix for the ids this process hands out - '' outside a sharded deployment"""
+    return f"s{shard_id}-" if shard_id is not None else ''
+
+
+def shard_of(identifier):
+    """Owning shard of a session or job id, or None for ids without one"""
+    match = SHARD_ID_RE.match(identifier or '') if isinstance(identifier, str) else None
+    return int(match.group(1)) if match else None
+
+
+def socket_path(directory, shard_id):
+    return os.path.join(directory, f"shard-{shard_id}.sock")
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """http.client over a Unix socket - the router's link to a worker"""
+
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
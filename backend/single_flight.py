@@ -0,0 +1,84 @@
+"""
+Request coalescing: one call per key at a time
+
+A double-click or a client retry sends the same request twice. Instead of
+launching a second Chrome (captcha) or driving one browser from two threads
+(attendance), callers that arrive while a call for the same key is running
+wait for it and get its result, or its exception.
+"""
+import threading
+import time
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    With window > 0 a result is also handed to callers arriving up to window
+    seconds after the call finished, as long as still_valid(result) holds -
+    a retry that lands just after the first response still gets the same
+    session. Failed calls and None results are never reused.
+    """
+
+    def __init__(self, window=0):
+        self.window = window
+        self._flights = {}
+        self._recent = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key, call, still_valid=None):
+        """(result, shared) - shared is True when another caller's call produced it"""
+        with self._lock:
+            recent = self._recent.get(key)
+            if recent is not None:
+                result, finished_at = recent
+                if time.monotonic() - finished_at < self.window and (still_valid is None or still_valid(result)):
+                    self.shared += 1
+                    return result, True
+                del self._recent[key]
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+                self.shared += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = call()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                now = time.monotonic()
+                if self.window and flight.error is None and flight.result is not None:
+                    self._recent[key] = (flight.result, now)
+                for stale in [k for k, (_, at) in self._recent.items() if now - at >= self.window]:
+                    del self._recent[stale]
+            flight.done.set()
+        return flight.result, False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._flights),
+                'waiting': sum(flight.waiters for flight in self._flights.values()),
+                'shared': self.shared,
+                'window_seconds': self.window,
+            }
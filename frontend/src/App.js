@@ -4,6 +4,7 @@ import React, { useState } from "react";
 import "./App.css";
 import LoginForm from "./components/LoginForm";
 import Dashboard from "./components/Dashboard";
+import { refreshAttendance, logoutSession } from "./services/api";
 
 function App() {
   // STATE - Controls what the app shows and stores data
@@ -14,23 +15,51 @@ function App() {
   // Attendance data from backend (array of subjects)
   const [attendanceData, setAttendanceData] = useState([]);
 
+  // How old the data is when it came from the backend cache (seconds), else null
+  const [cachedAge, setCachedAge] = useState(null);
+
+  // Backend session kept logged in ("Keep me logged in"), else null
+  const [session, setSession] = useState(null);
+
   // FUNCTION 1: Called when login is successful
-  const handleLoginSuccess = (data) => {
+  const handleLoginSuccess = (data, meta = {}) => {
     console.log("Login successful! Received data:", data);
 
     // Store the attendance data in state
     setAttendanceData(data);
+    setCachedAge(meta.cachedAge ?? null);
+    setSession(meta.session ?? null);
 
     // Switch to logged-in mode
     setIsLoggedIn(true);
   };
 
-  // FUNCTION 2: Called when user clicks logout
+  // FUNCTION 2: Re-read attendance on the kept session (no CAPTCHA)
+  const handleRefresh = async () => {
+    const response = await refreshAttendance(session);
+
+    if (response.success) {
+      setAttendanceData(response.data);
+      setCachedAge(null);
+    } else if (response.login_required) {
+      // Backend let the session go - the next refresh needs a new login
+      setSession(null);
+    }
+    return response;
+  };
+
+  // FUNCTION 3: Called when user clicks logout
   const handleLogout = () => {
     console.log("Logging out...");
 
+    if (session) {
+      logoutSession(session.sessionId);
+    }
+
     // Clear the data
     setAttendanceData([]);
+    setCachedAge(null);
+    setSession(null);
 
     // Go back to login screen
     setIsLoggedIn(false);
@@ -45,7 +74,12 @@ function App() {
         <LoginForm onLoginSuccess={handleLoginSuccess} />
       ) : (
         // Logged in → Show Dashboard
-        <Dashboard attendanceData={attendanceData} onLogout={handleLogout} />
+        <Dashboard
+          attendanceData={attendanceData}
+          cachedAge={cachedAge}
+          onRefresh={session ? handleRefresh : null}
+          onLogout={handleLogout}
+        />
       )}
     </div>
   );
@@ -1,8 +1,31 @@
 // src/components/Dashboard.js
 
-import React from "react";
+import React, { useState } from "react";
+
+function Dashboard({ attendanceData, cachedAge, onRefresh, onLogout }) {
+  const [refreshing, setRefreshing] = useState(false);
+  const [refreshError, setRefreshError] = useState("");
+
+  // Only offered while the backend keeps the login ("Keep me logged in")
+  const handleRefresh = async () => {
+    setRefreshing(true);
+    setRefreshError("");
+    try {
+      const response = await onRefresh();
+      if (!response.success) {
+        setRefreshError(
+          response.login_required
+            ? "Login expired - log out and log in again to refresh."
+            : response.error || "Refresh failed"
+        );
+      }
+    } catch (err) {
+      setRefreshError("Network error. Check backend and try again.");
+    } finally {
+      setRefreshing(false);
+    }
+  };
 
-function Dashboard({ attendanceData, onLogout }) {
   // Calculate overall statistics
   const calculateStats = () => {
     if (!attendanceData || attendanceData.length === 0) {
@@ -54,11 +77,32 @@ function Dashboard({ attendanceData, onLogout }) {
       {/* Header with Logout */}
       <div style={styles.header}>
         <h1>📊 Your Attendance Dashboard</h1>
-        <button onClick={onLogout} style={styles.logoutButton}>
-          🚪 Logout
-        </button>
+        <div>
+          {onRefresh && (
+            <button
+              onClick={handleRefresh}
+              disabled={refreshing}
+              style={styles.refreshButton}
+            >
+              {refreshing ? "Refreshing..." : "🔄 Refresh"}
+            </button>
+          )}
+          <button onClick={onLogout} style={styles.logoutButton}>
+            🚪 Logout
+          </button>
+        </div>
       </div>
 
+      {refreshError && <div style={styles.cachedNotice}>⚠️ {refreshError}</div>}
+
+      {/* Cached snapshot notice */}
+      {cachedAge !== null && cachedAge !== undefined && (
+        <div style={styles.cachedNotice}>
+          ⚡ Saved result from {Math.max(1, Math.round(cachedAge / 60))} min
+          ago. Tick "Force refresh from portal" on login for live data.
+        </div>
+      )}
+
       {/* Statistics Cards */}
       <div style={styles.statsContainer}>
         <div style={styles.statCard}>
@@ -168,6 +212,16 @@ const styles = {
     alignItems: "center",
     marginBottom: "30px",
   },
+  refreshButton: {
+    padding: "10px 20px",
+    marginRight: "10px",
+    backgroundColor: "#007bff",
+    color: "white",
+    border: "none",
+    borderRadius: "4px",
+    cursor: "pointer",
+    fontSize: "16px",
+  },
   logoutButton: {
     padding: "10px 20px",
     backgroundColor: "#dc3545",
@@ -177,6 +231,14 @@ const styles = {
     cursor: "pointer",
     fontSize: "16px",
   },
+  cachedNotice: {
+    padding: "10px",
+    marginBottom: "20px",
+    backgroundColor: "#fff3cd",
+    color: "#856404",
+    border: "1px solid #ffeeba",
+    borderRadius: "4px",
+  },
   statsContainer: {
     display: "grid",
     gridTemplateColumns: "repeat(3, 1fr)",
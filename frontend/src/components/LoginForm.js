@@ -1,7 +1,23 @@
 // src/components/LoginForm.js
 
 import React, { useState } from "react";
-import { fetchCaptcha, fetchAttendance } from "../services/api";
+import {
+  fetchCaptcha,
+  captchaImageUrl,
+  refreshCaptcha,
+  fetchCachedAttendance,
+  startAttendanceJob,
+  watchAttendanceJob,
+} from "../services/api";
+
+// Human-readable labels for the backend job stages
+const STAGE_LABELS = {
+  logged_in: "Logged in",
+  activities_opened: "Opened My Activities",
+  attendance_opened: "Opened My Attendance",
+  semester_selected: "Selected year and semester",
+  parsed: "Read attendance table",
+};
 
 function LoginForm({ onLoginSuccess }) {
   // STATE - Data that can change
@@ -14,6 +30,9 @@ function LoginForm({ onLoginSuccess }) {
   const [semester, setSemester] = useState(0);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState("");
+  const [progress, setProgress] = useState(null);
+  const [forceRefresh, setForceRefresh] = useState(false);
+  const [keepLoggedIn, setKeepLoggedIn] = useState(false);
 
   // FUNCTION 1: Get CAPTCHA when user clicks button
   const handleGetCaptcha = async () => {
@@ -27,10 +46,24 @@ function LoginForm({ onLoginSuccess }) {
     setError("");
 
     try {
+      // A recent result for the same student skips captcha and login entirely
+      if (password && !forceRefresh) {
+        const cached = await fetchCachedAttendance({
+          rollNo,
+          password,
+          year,
+          semester,
+        });
+        if (cached.success) {
+          onLoginSuccess(cached.data, { cachedAge: cached.age_seconds });
+          return;
+        }
+      }
+
       const response = await fetchCaptcha(rollNo);
 
       if (response.success) {
-        setCaptchaImage(response.captcha_base64);
+        setCaptchaImage(captchaImageUrl(response.captcha_url));
         setSessionId(response.session_id);
         setError("");
       } else {
@@ -43,6 +76,27 @@ function LoginForm({ onLoginSuccess }) {
     }
   };
 
+  // Same session, new image - for when the CAPTCHA is unreadable or was mistyped
+  const handleRefreshCaptcha = async () => {
+    setLoading(true);
+    setError("");
+
+    try {
+      const response = await refreshCaptcha(sessionId);
+
+      if (response.success) {
+        setCaptchaImage(captchaImageUrl(response.captcha_url));
+        setCaptchaText("");
+      } else {
+        setError(response.error || "Failed to refresh CAPTCHA");
+      }
+    } catch (err) {
+      setError("Network error. Is the backend running?");
+    } finally {
+      setLoading(false);
+    }
+  };
+
   // FUNCTION 2: Submit the form
   const handleSubmit = async (e) => {
     e.preventDefault();
@@ -55,27 +109,48 @@ function LoginForm({ onLoginSuccess }) {
 
     setLoading(true);
     setError("");
+    setProgress(null);
 
     try {
-      const response = await fetchAttendance({
+      const job = await startAttendanceJob({
         sessionId: sessionId,
         rollNo,
         password,
         captcha: captchaText,
         year: year,
         semester: semester,
+        keepLoggedIn,
       });
 
+      if (!job.success) {
+        setError(job.error || "Failed to fetch attendance");
+        return;
+      }
+
+      // Show each stage as the backend reports it
+      const response = await watchAttendanceJob(job.job_id, setProgress);
+
       if (response.success) {
-        // Pass data to parent component (App.js)
-        onLoginSuccess(response.data);
+        // Pass data to parent component (App.js); a kept session can refresh later
+        onLoginSuccess(
+          response.data,
+          response.logged_in_for
+            ? { session: { sessionId, password, year, semester } }
+            : {}
+        );
       } else {
         setError(response.error || "Failed to fetch attendance");
+        // Wrong CAPTCHA: the session is still open with a new one to type
+        if (response.captcha_url) {
+          setCaptchaImage(captchaImageUrl(response.captcha_url));
+          setCaptchaText("");
+        }
       }
     } catch (err) {
       setError("Network error. Check backend and try again.");
     } finally {
       setLoading(false);
+      setProgress(null);
     }
   };
 
@@ -114,6 +189,28 @@ function LoginForm({ onLoginSuccess }) {
           />
         </div>
 
+        {/* Skip the saved result */}
+        <label style={styles.checkboxLabel}>
+          <input
+            type="checkbox"
+            checked={forceRefresh}
+            onChange={(e) => setForceRefresh(e.target.checked)}
+            disabled={loading}
+          />
+          Force refresh from portal
+        </label>
+
+        {/* Park the login on the backend so the dashboard can refresh */}
+        <label style={styles.checkboxLabel}>
+          <input
+            type="checkbox"
+            checked={keepLoggedIn}
+            onChange={(e) => setKeepLoggedIn(e.target.checked)}
+            disabled={loading}
+          />
+          Keep me logged in (refresh without CAPTCHA)
+        </label>
+
         {/* Get CAPTCHA Button */}
         <button
           type="button"
@@ -132,6 +229,14 @@ function LoginForm({ onLoginSuccess }) {
         {captchaImage && (
           <div style={styles.captchaContainer}>
             <img src={captchaImage} alt="CAPTCHA" style={styles.captchaImage} />
+            <button
+              type="button"
+              onClick={handleRefreshCaptcha}
+              disabled={loading}
+              style={styles.newCaptchaButton}
+            >
+              ↻ New CAPTCHA
+            </button>
           </div>
         )}
 
@@ -206,6 +311,25 @@ function LoginForm({ onLoginSuccess }) {
           {loading ? "Loading..." : "📊 Get Attendance"}
         </button>
 
+        {/* Job progress */}
+        {progress && (
+          <div style={styles.progress}>
+            <div style={styles.progressTrack}>
+              <div
+                style={{
+                  ...styles.progressBar,
+                  width: `${(progress.progress / progress.total_stages) * 100}%`,
+                }}
+              />
+            </div>
+            <small style={styles.smallText}>
+              {progress.stage
+                ? `${STAGE_LABELS[progress.stage] || progress.stage} (${progress.progress}/${progress.total_stages})`
+                : "Waiting for a free worker..."}
+            </small>
+          </div>
+        )}
+
         {/* Helper text */}
         {captchaImage && (
           <div style={styles.helperText}>
@@ -272,6 +396,17 @@ const styles = {
     maxWidth: "100%",
     height: "auto",
   },
+  newCaptchaButton: {
+    display: "block",
+    margin: "8px auto 0",
+    padding: "4px 10px",
+    fontSize: "13px",
+    backgroundColor: "transparent",
+    color: "#007bff",
+    border: "1px solid #007bff",
+    borderRadius: "4px",
+    cursor: "pointer",
+  },
   submitButton: {
     padding: "12px",
     fontSize: "18px",
@@ -302,6 +437,29 @@ const styles = {
     color: "#888",
     marginTop: "4px",
   },
+  checkboxLabel: {
+    display: "flex",
+    alignItems: "center",
+    gap: "8px",
+    fontSize: "14px",
+    color: "#555",
+  },
+  progress: {
+    display: "flex",
+    flexDirection: "column",
+    gap: "4px",
+  },
+  progressTrack: {
+    height: "8px",
+    backgroundColor: "#e9ecef",
+    borderRadius: "4px",
+    overflow: "hidden",
+  },
+  progressBar: {
+    height: "100%",
+    backgroundColor: "#28a745",
+    transition: "width 0.3s",
+  },
 };
 
 export default LoginForm;
@@ -13,13 +13,32 @@ export const fetchCaptcha = async (rollNo) => {
     });
 
     const data = await response.json();
-    return data; // Now includes session_id
+    return data; // session_id + captcha_url
   } catch (error) {
     console.error("Error fetching CAPTCHA:", error);
     throw error;
   }
 };
 
+// captcha_url from the backend is a path; the image is served as plain bytes
+export const captchaImageUrl = (path) => `${API_BASE_URL}${path}`;
+
+// New CAPTCHA on the same session (after a typo); resolves to { captcha_url }
+export const refreshCaptcha = async (sessionId) => {
+  try {
+    const response = await fetch(
+      `${API_BASE_URL}/api/captcha/${sessionId}/refresh`,
+      { method: "POST" }
+    );
+
+    const data = await response.json();
+    return data;
+  } catch (error) {
+    console.error("Error refreshing CAPTCHA:", error);
+    throw error;
+  }
+};
+
 export const fetchAttendance = async (credentials) => {
   try {
     const response = await fetch(`${API_BASE_URL}/api/attendance`, {
@@ -33,6 +52,7 @@ export const fetchAttendance = async (credentials) => {
         captcha: credentials.captcha,
         year: credentials.year || 0,
         semester: credentials.semester || 0,
+        semesters: credentials.semesters,
       }),
     });
 
@@ -43,3 +63,119 @@ export const fetchAttendance = async (credentials) => {
     throw error;
   }
 };
+
+// Last result fetched for this roll/year/semester, if the backend still has it
+export const fetchCachedAttendance = async (credentials) => {
+  try {
+    const response = await fetch(`${API_BASE_URL}/api/attendance/cached`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({
+        roll_no: credentials.rollNo,
+        password: credentials.password,
+        year: credentials.year || 0,
+        semester: credentials.semester || 0,
+        force_refresh: credentials.forceRefresh || false,
+      }),
+    });
+
+    const data = await response.json();
+    return data;
+  } catch (error) {
+    console.error("Error fetching cached attendance:", error);
+    throw error;
+  }
+};
+
+// Starts attendance scraping in the background; resolves to { job_id }
+export const startAttendanceJob = async (credentials) => {
+  try {
+    const response = await fetch(`${API_BASE_URL}/api/attendance/jobs`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({
+        session_id: credentials.sessionId,
+        password: credentials.password,
+        captcha: credentials.captcha,
+        year: credentials.year || 0,
+        semester: credentials.semester || 0,
+        // Optional: "all" or [{ year, semester }, ...] - read on one login
+        semesters: credentials.semesters,
+        keep_logged_in: credentials.keepLoggedIn || false,
+      }),
+    });
+
+    const data = await response.json();
+    return data;
+  } catch (error) {
+    console.error("Error starting attendance job:", error);
+    throw error;
+  }
+};
+
+// Re-reads attendance on a session kept with keepLoggedIn - no CAPTCHA
+export const refreshAttendance = async (credentials) => {
+  try {
+    const response = await fetch(`${API_BASE_URL}/api/attendance/refresh`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({
+        session_id: credentials.sessionId,
+        password: credentials.password,
+        year: credentials.year || 0,
+        semester: credentials.semester || 0,
+      }),
+    });
+
+    const data = await response.json();
+    return data; // login_required: true when a new login is needed
+  } catch (error) {
+    console.error("Error refreshing attendance:", error);
+    throw error;
+  }
+};
+
+// Closes a kept session on the backend
+export const logoutSession = async (sessionId) => {
+  try {
+    await fetch(`${API_BASE_URL}/api/logout`, {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({ session_id: sessionId }),
+    });
+  } catch (error) {
+    console.error("Error logging out:", error);
+  }
+};
+
+// Streams job progress (Server-Sent Events) and resolves with the final result
+export const watchAttendanceJob = (jobId, onProgress) =>
+  new Promise((resolve, reject) => {
+    const source = new EventSource(
+      `${API_BASE_URL}/api/attendance/jobs/${jobId}/events`
+    );
+
+    source.addEventListener("progress", (event) => {
+      onProgress(JSON.parse(event.data));
+    });
+
+    source.addEventListener("done", (event) => {
+      source.close();
+      const job = JSON.parse(event.data);
+      onProgress(job);
+      resolve(job.result);
+    });
+
+    source.onerror = () => {
+      source.close();
+      reject(new Error("Lost connection to progress stream"));
+    };
+  });